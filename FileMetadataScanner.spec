@@ -1,34 +1,85 @@
 # -*- mode: python ; coding: utf-8 -*-
+#
+# pyinstaller FileMetadataScanner.spec               — один exe (dist/FileMetadataScanner)
+# pyinstaller FileMetadataScanner.spec -- --onedir   — каталог dist/FileMetadataScanner-onedir:
+#     запускается быстрее, т.к. onefile при каждом старте распаковывает Qt во временный каталог
+#
+# Сборка без неиспользуемых модулей Qt, плагинов Pillow (нужны только pil_plugins.PIL_PLUGINS)
+# и переводов Qt; без UPX — сжатые библиотеки Qt распаковываются при каждой загрузке.
+# Время до первой отрисовки окна: python -m benchmarks.gui_startup --exe <путь к exe>
+
+import os
+import sys
+import pkgutil
+import argparse
+
+import PIL
+
+sys.path.insert(0, SPECPATH)
+from pil_plugins import PIL_PLUGINS
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--onedir", action="store_true")
+options = parser.parse_args()
+
+NAME = 'FileMetadataScanner'
+
+# Приложению нужны только QtCore, QtGui и QtWidgets
+QT_EXCLUDES = [
+    f'PySide6.{m}' for m in (
+        'Qt3DAnimation', 'Qt3DCore', 'Qt3DExtras', 'Qt3DInput', 'Qt3DLogic', 'Qt3DRender',
+        'QtBluetooth', 'QtCharts', 'QtConcurrent', 'QtDataVisualization', 'QtDBus', 'QtDesigner', 'QtGraphs',
+        'QtHelp', 'QtHttpServer', 'QtLocation', 'QtMultimedia', 'QtMultimediaWidgets', 'QtNetwork', 'QtNetworkAuth',
+        'QtNfc', 'QtOpenGL', 'QtOpenGLWidgets', 'QtPdf', 'QtPdfWidgets', 'QtPositioning', 'QtPrintSupport',
+        'QtQml', 'QtQuick', 'QtQuick3D', 'QtQuickControls2', 'QtQuickWidgets', 'QtRemoteObjects', 'QtScxml',
+        'QtSensors', 'QtSerialBus', 'QtSerialPort', 'QtSpatialAudio', 'QtSql', 'QtStateMachine', 'QtSvg',
+        'QtSvgWidgets', 'QtTest', 'QtTextToSpeech', 'QtUiTools', 'QtWebChannel', 'QtWebEngineCore',
+        'QtWebEngineQuick', 'QtWebEngineWidgets', 'QtWebSockets', 'QtXml',
+    )
+]
+PIL_EXCLUDES = [
+    f'PIL.{m.name}' for m in pkgutil.iter_modules(PIL.__path__)
+    if m.name.endswith('ImagePlugin') and m.name not in PIL_PLUGINS
+] + ['PIL.ImageQt', 'PIL.ImageTk', 'PIL.ImageShow', 'PIL.ImageGrab']
+STDLIB_EXCLUDES = ['tkinter', 'unittest', 'pydoc', 'doctest', 'test', 'lib2to3', 'distutils']
+# Каталоги данных Qt, которые окну не нужны: переводы, qml, плагины не-виджетных модулей
+QT_DATA_EXCLUDES = ('translations', 'qml', 'sqldrivers', 'multimedia', 'position', 'sensors', 'networkinformation',
+                    'tls', 'qmltooling', 'designer', 'webview')
+
+
+def _keep(entry):
+    parts = entry[0].replace('\\', '/').split('/')
+    if 'PySide6' not in parts:
+        return True
+    # программный OpenGL для Windows без драйвера — виджетам не нужен
+    if parts[-1].startswith('opengl32sw'):
+        return False
+    return not any(p in QT_DATA_EXCLUDES for p in parts)
 
 
 a = Analysis(
     ['main.py'],
-    pathex=[],
+    pathex=[SPECPATH],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=[f'PIL.{m}' for m in PIL_PLUGINS],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=QT_EXCLUDES + PIL_EXCLUDES + STDLIB_EXCLUDES,
     noarchive=False,
     optimize=0,
 )
+a.binaries = [b for b in a.binaries if _keep(b)]
+a.datas = [d for d in a.datas if _keep(d)]
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='FileMetadataScanner',
+exe_options = dict(
+    name=NAME,
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +87,9 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+if options.onedir:
+    exe = EXE(pyz, a.scripts, [], exclude_binaries=True, **exe_options)
+    coll = COLLECT(exe, a.binaries, a.datas, strip=False, upx=False, upx_exclude=[], name=f'{NAME}-onedir')
+else:
+    exe = EXE(pyz, a.scripts, a.binaries, a.datas, [], upx_exclude=[], runtime_tmpdir=None, **exe_options)
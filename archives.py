@@ -0,0 +1,139 @@
+"""
+Изображения внутри архивов ZIP и TAR (в т.ч. .tar.gz/.tgz, .tar.bz2, .tar.xz) без распаковки на диск.
+
+Файл архива адресуется виртуальным путём «архив!/путь/в/архиве» (bundle.zip!/a/b.jpg).
+iter_members идёт по архиву в порядке хранения членов и отбрасывает не-изображения
+по имени, не читая их данных; у каждого члена читается только начало (read_head),
+остальное — по требованию (read_all). Сжатые tar читаются одним потоком, несжатые tar
+и ZIP — с переходом сразу к нужному члену.
+"""
+import io
+import os
+import tarfile
+import zipfile
+import zlib
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+ARCHIVE_SEP = "!/"
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz", ".tbz2", ".tar.xz", ".txz")
+ARCHIVE_SUFFIXES = ZIP_SUFFIXES + TAR_SUFFIXES
+HEADER_BYTES = 256 * 1024
+
+# Ошибки чтения повреждённого архива или его члена
+ARCHIVE_ERRORS = (OSError, EOFError, RuntimeError, ValueError, zlib.error, zipfile.BadZipFile, tarfile.TarError)
+
+
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def member_path(archive: str, name: str) -> str:
+    return f"{archive}{ARCHIVE_SEP}{name}"
+
+
+def split_path(path: str) -> Tuple[str, Optional[str]]:
+    """'bundle.zip!/a/b.jpg' -> ('bundle.zip', 'a/b.jpg'); обычный путь -> (путь, None)."""
+    i = path.find(ARCHIVE_SEP)
+    while i != -1:
+        if is_archive(path[:i]):
+            return path[:i], path[i + len(ARCHIVE_SEP):]
+        i = path.find(ARCHIVE_SEP, i + 1)
+    return path, None
+
+
+def is_virtual(path: str) -> bool:
+    return ARCHIVE_SEP in path and split_path(path)[1] is not None
+
+
+def stat_path(path: str) -> os.stat_result:
+    """os.stat файла; для члена архива — самого архива (меняется вместе с содержимым)."""
+    return os.stat(split_path(path)[0])
+
+
+def open_member(path: str) -> BinaryIO:
+    """
+    Содержимое члена архива по виртуальному пути в BytesIO (для предпросмотра и
+    повторной инспекции одного файла). Член сжатого tar ищется распаковкой потока до него.
+    """
+    archive, name = split_path(path)
+    if name is None:
+        raise ValueError(f"not an archive member path: {path!r}")
+    try:
+        if archive.lower().endswith(ZIP_SUFFIXES):
+            with zipfile.ZipFile(archive) as zf:
+                return io.BytesIO(zf.read(name))
+        with tarfile.open(archive, "r:*") as tf:
+            f = tf.extractfile(name)
+            if f is None:
+                raise KeyError(name)
+            return io.BytesIO(f.read())
+    except KeyError:
+        raise FileNotFoundError(f"no member {name!r} in archive {archive!r}") from None
+
+
+class ArchiveMember:
+    """
+    Член архива, отданный iter_members: виртуальный путь, размер и поток данных,
+    читаемый только вперёд и действительный до перехода к следующему члену.
+    error — член не читается (например, зашифрован).
+    """
+    def __init__(self, path: str, size: int, stream=None, error: Optional[str] = None):
+        self.path = path
+        self.size = size
+        self.error = error
+        self._stream = stream
+        self._data = b""
+
+    def read_head(self, n: int = HEADER_BYTES) -> bytes:
+        """Первые n байт (ограниченное чтение заголовка)."""
+        if len(self._data) < n:
+            self._data += self._stream.read(n - len(self._data))
+        return self._data[:n]
+
+    def read_all(self) -> bytes:
+        self._data += self._stream.read()
+        return self._data
+
+    @property
+    def complete(self) -> bool:
+        """Прочитан ли член целиком."""
+        return len(self._data) >= self.size
+
+
+def _wanted(name: str, exts) -> bool:
+    return os.path.splitext(name)[1].lower() in exts
+
+
+def _iter_zip(archive: str, exts) -> Iterator[ArchiveMember]:
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not _wanted(info.filename, exts):
+                continue
+            path = member_path(archive, info.filename)
+            if info.flag_bits & 0x1:
+                yield ArchiveMember(path, info.file_size, error="encrypted archive member")
+                continue
+            with zf.open(info) as f:
+                yield ArchiveMember(path, info.file_size, f)
+
+
+def _iter_tar(archive: str, exts) -> Iterator[ArchiveMember]:
+    # несжатый tar — с произвольным доступом (данные ненужных членов пропускаются seek-ом),
+    # сжатый — потоком: распаковать его всё равно придётся подряд
+    mode = "r:" if archive.lower().endswith(".tar") else "r|*"
+    with tarfile.open(archive, mode) as tf:
+        for info in tf:
+            if not info.isfile() or not _wanted(info.name, exts):
+                continue
+            yield ArchiveMember(member_path(archive, info.name), info.size, tf.extractfile(info))
+
+
+def iter_members(archive: str, exts) -> Iterator[ArchiveMember]:
+    """
+    Члены-изображения архива (по расширению из exts) в порядке хранения.
+    Ошибки повреждённого архива (ARCHIVE_ERRORS) поднимаются из итерации.
+    """
+    if archive.lower().endswith(ZIP_SUFFIXES):
+        return _iter_zip(archive, exts)
+    return _iter_tar(archive, exts)
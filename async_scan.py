@@ -0,0 +1,122 @@
+"""
+asyncio-интерфейс сканирования — для встраивания в асинхронные сервисы (aiohttp и т.п.):
+
+    async for result in ascan_folder("/data/photos", level="standard"):
+        ...
+    async for results in ascan_batches("/data/photos"):  # пачками: всё, что готово к этому моменту
+        ...
+
+В отличие от scan_folder (поток сканирования и callback-и ScanEmitter), своего потока
+у сканирования нет: обход каталогов идёт пачками по WALK_BATCH путей в default executor
+цикла событий, инспекция — в общем ограниченном пуле (default_executor() или переданный
+executor, в т.ч. ProcessPoolExecutor), который делят все одновременные сканирования.
+Каждое сканирование держит в пуле не больше max_in_flight задач и отправляет новые,
+только когда потребитель забирает результаты, так что медленный потребитель
+приостанавливает и инспекцию, и обход. Отмена — обычная отмена задачи или выход
+из async for (генератор закрывается через aclose(), например contextlib.aclosing):
+ещё не начатые задачи снимаются с пула, обход останавливается.
+"""
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from scanner import IMAGE_EXTS, inspect_chunk, iter_image_files
+from formats_info import LEVELS, DEEP
+from archives import is_archive
+
+ASYNC_WORKERS = 8
+ASYNC_IN_FLIGHT = 16
+WALK_BATCH = 256
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def default_executor() -> ThreadPoolExecutor:
+    """Общий пул инспекции (ASYNC_WORKERS потоков) для сканирований без своего executor."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="ascan")
+        return _executor
+
+
+def _take(files, n: int) -> List[str]:
+    return [p for p, _ in islice(files, n)]
+
+
+async def ascan_batches(path: str, executor: Optional[Executor] = None, max_in_flight: int = ASYNC_IN_FLIGHT,
+                        chunk_size: int = 1, exts=IMAGE_EXTS, level: str = DEEP, archives: bool = False,
+                        shard=None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Сканировать папку path и отдавать списки результатов inspect_image по мере готовности
+    (в списке — все задачи, завершившиеся к этому моменту, в порядке отправки).
+    executor — пул инспекции (по умолчанию default_executor()); max_in_flight — сколько
+    задач этого сканирования одновременно в пуле; chunk_size — файлов в задаче
+    (для ProcessPoolExecutor — как scanner.PROCESS_CHUNK_SIZE). exts, level, archives
+    и shard — как у scanner.scan_folder; кэш сканирования не используется.
+    """
+    if level not in LEVELS:
+        raise ValueError(f"Unknown inspection level: {level!r}, expected one of {LEVELS}")
+    loop = asyncio.get_running_loop()
+    if executor is None:
+        executor = default_executor()
+    stopped = threading.Event()
+    files = iter_image_files(path, exts, stop=stopped.is_set, archives=archives, shard=shard)
+    archive_exts = exts if archives else None
+    # найденные, но ещё не отправленные пути; обход идёт впрок не дальше окна задач
+    found = deque()
+    walk = loop.run_in_executor(None, _take, files, WALK_BATCH)
+    in_flight: Dict[asyncio.Future, List[str]] = {}
+
+    try:
+        while walk is not None or found or in_flight:
+            while found and len(in_flight) < max_in_flight:
+                chunk = [found.popleft()]
+                # архив — отдельной задачей, как в scan_folder
+                if not (archives and is_archive(chunk[0])):
+                    while found and len(chunk) < chunk_size and not (archives and is_archive(found[0])):
+                        chunk.append(found.popleft())
+                future = loop.run_in_executor(executor, inspect_chunk, chunk, False, False, level, archive_exts)
+                in_flight[future] = chunk
+            waiting = set(in_flight)
+            if walk is not None and len(found) < max_in_flight * chunk_size:
+                waiting.add(walk)
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if walk in done:
+                batch = walk.result()
+                found.extend(batch)
+                walk = loop.run_in_executor(None, _take, files, WALK_BATCH) if len(batch) == WALK_BATCH else None
+            results = []
+            for future in [f for f in in_flight if f in done]:
+                chunk = in_flight.pop(future)
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    results.extend({"path": p, "error": str(e)} for p in chunk)
+            if results:
+                yield results
+    finally:
+        stopped.set()
+        for future in in_flight:
+            future.cancel()
+        if walk is not None:
+            walk.cancel()
+
+
+async def ascan_folder(path: str, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Результаты inspect_image по одному, по мере готовности (см. ascan_batches —
+    те же аргументы).
+    """
+    batches = ascan_batches(path, **kwargs)
+    try:
+        async for results in batches:
+            for result in results:
+                yield result
+    finally:
+        await batches.aclose()
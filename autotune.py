@@ -0,0 +1,198 @@
+"""
+Автоподбор числа worker-ов во время сканирования.
+
+ConcurrencyTuner меряет пропускную способность (файлов/с) и задержку на файл окнами
+по времени и подбирает число одновременно выполняемых задач восхождением к вершине:
+сначала грубо (×2 / ÷2, пока это даёт прирост; ×4, пока прирост почти линейный), затем периодическими пробами ±25%
+вокруг выбранного уровня — чтобы следовать за изменением условий (нагрузка на NFS,
+page cache). scanner.scan_folder(..., tuner=...) ограничивает число одновременно
+выполняемых задач уровнем tuner.level: у потоков — через ConcurrencyGate (очередь задач
+при этом остаётся, worker-ы не простаивают), у процессов — числом задач в работе.
+"""
+import os
+import time
+import threading
+from typing import Optional, List, Dict, Any
+
+TUNE_INTERVAL = 0.1    # минимальная длина окна измерения, секунды
+TUNE_MIN_TASKS = 16    # и минимум завершённых задач в окне
+TUNE_GAIN = 0.05       # проба принимается, если быстрее на 5% и больше
+TUNE_PROBE_EVERY = 6   # окон на выбранном уровне между пробами
+TUNE_FINE_WINDOW = 3   # после грубой фазы окна в столько раз длиннее (меньше шума от смены файлов)
+THREAD_MAX_WORKERS = 128
+
+
+class ConcurrencyGate:
+    """Семафор с изменяемым пределом: не больше limit одновременно вошедших."""
+    def __init__(self, limit: int):
+        self._cond = threading.Condition()
+        self._limit = limit
+        self._active = 0
+
+    def set_limit(self, limit: int):
+        with self._cond:
+            self._limit = limit
+            self._cond.notify_all()
+
+    def __enter__(self):
+        with self._cond:
+            while self._active >= self._limit:
+                self._cond.wait()
+            self._active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+
+class ConcurrencyTuner:
+    """
+    Подбор уровня параллелизма в пределах [min_workers, max_workers].
+    Сканер вызывает record() на каждую завершённую задачу и update() после пачки
+    завершений; update() возвращает текущий уровень. best_level — принятый уровень
+    (level может временно отличаться на время пробы), trace — история окон,
+    gate — ConcurrencyGate, пределом которого всегда служит level.
+    """
+    def __init__(self, min_workers: int = 1, max_workers: int = THREAD_MAX_WORKERS,
+                 start: Optional[int] = None, interval: float = TUNE_INTERVAL,
+                 gain: float = TUNE_GAIN, probe_every: int = TUNE_PROBE_EVERY):
+        if min_workers < 1 or max_workers < min_workers:
+            raise ValueError(f"Некорректные пределы worker-ов: {min_workers}..{max_workers}")
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.interval = interval
+        self.gain = gain
+        self.probe_every = probe_every
+        if start is None:
+            start = os.cpu_count() or 4
+        self.level = self._clamp(start)
+        self.gate = ConcurrencyGate(self.level)
+        self.best_level = self.level
+        self.trace: List[Dict[str, Any]] = []
+        self._started = time.monotonic()
+        self._base_tput = None
+        self._probing = False
+        self._coarse = True    # грубая фаза: шаг ×2 / ÷2
+        self._moved = False    # грубая фаза уже сдвинула уровень
+        self._direction = 1
+        self._factor = 2       # шаг роста в грубой фазе
+        self._windows = 0
+        self._skip = 0
+        self._reset_window()
+
+    def _clamp(self, n: int) -> int:
+        return max(self.min_workers, min(self.max_workers, n))
+
+    def _reset_window(self):
+        self._window_start = time.monotonic()
+        self._files = 0
+        self._tasks = 0
+        self._latency = 0.0
+
+    def _set_level(self, n: int):
+        # задачи, запущенные до смены уровня, в новое окно не попадают
+        self._skip = max(self.level, n)
+        self.level = n
+        self.gate.set_limit(n)
+        self._reset_window()
+
+    def record(self, files: int, latency_s: float):
+        """Завершена задача из files файлов, выполнявшаяся latency_s секунд."""
+        if self._skip:
+            self._skip -= 1
+            if not self._skip:
+                self._reset_window()
+            return
+        self._files += files
+        self._tasks += 1
+        self._latency += latency_s
+
+    def update(self) -> int:
+        """Закрыть окно, если данных достаточно, и при необходимости сменить уровень."""
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        scale = 1 if self._coarse else TUNE_FINE_WINDOW
+        if (self._skip or elapsed < self.interval * scale
+                or self._tasks < max(TUNE_MIN_TASKS, 4 * self.level) * scale):
+            return self.level
+        tput = self._files / elapsed
+        self.trace.append({"t": round(now - self._started, 3), "level": self.level,
+                           "files_per_s": round(tput, 1),
+                           "latency_ms": round(self._latency * 1000 / max(self._files, 1), 2)})
+        self._judge(tput)
+        self._reset_window()
+        return self.level
+
+    def _judge(self, tput: float):
+        if not self._probing:
+            # окно на выбранном уровне: сглаженная оценка для сравнения с пробами
+            self._base_tput = tput if self._base_tput is None else (self._base_tput + tput) / 2
+            self._windows += 1
+            if self._coarse or self._windows >= self.probe_every:
+                self._probe()
+            return
+        # шаг ×2 должен дать заметный прирост, иначе грубая фаза уходит в шум
+        gain = self.gain * 2 if self._coarse else self.gain
+        if tput > self._base_tput * (1 + gain):
+            # проба лучше — принимаем и идём дальше в ту же сторону; если прирост почти
+            # пропорционален уровню (упор в задержку, а не в CPU), следующий шаг больше
+            step = self.level / self.best_level
+            self._factor = 4 if step > 1 and tput / self._base_tput >= 0.8 * step else 2
+            self.best_level, self._base_tput = self.level, tput
+            self._moved = True
+            self._probe()
+            return
+        self._probing = False
+        self._windows = 0
+        self._set_level(self.best_level)
+        self._turn()
+
+    def _turn(self):
+        if self._coarse and self._direction > 0 and not self._moved:
+            self._direction = -1   # рост не помог с самого начала — пробуем меньше
+        else:
+            self._coarse = False
+            self._direction = -self._direction
+
+    def _next_level(self) -> int:
+        base = self.best_level
+        if self._coarse:
+            target = base * self._factor if self._direction > 0 else base // 2
+        else:
+            target = base + self._direction * max(1, base // 4)
+        return self._clamp(target)
+
+    def _probe(self):
+        for _ in range(3):
+            target = self._next_level()
+            if target != self.best_level:
+                self._probing = True
+                self._set_level(target)
+                return
+            self._turn()  # упёрлись в границу
+        self._probing = False
+
+    @property
+    def best_files_per_s(self) -> float:
+        """Оценка скорости на выбранном уровне (0, пока нет ни одного окна)."""
+        return self._base_tput or 0.0
+
+    def summary(self) -> str:
+        return (f"автоподбор: {self.best_level} worker-ов (пределы {self.min_workers}–{self.max_workers}, "
+                f"{self.best_files_per_s:.0f} файлов/с)")
+
+
+def default_tuner(engine: str = "thread", max_workers: Optional[int] = None,
+                  min_workers: int = 1) -> ConcurrencyTuner:
+    """
+    Тюнер с пределами по умолчанию для движка: потокам — до THREAD_MAX_WORKERS
+    (медленные сетевые ФС выигрывают от десятков одновременных открытий),
+    процессам — до числа CPU.
+    """
+    cpus = os.cpu_count() or 4
+    if max_workers is None:
+        max_workers = cpus if engine == "process" else THREAD_MAX_WORKERS
+    max_workers = max(max_workers, min_workers)
+    return ConcurrencyTuner(min_workers, max_workers, start=max(cpus, 4))
@@ -0,0 +1 @@
+"""Бенчмарки сканера; запускаются как `python -m benchmarks.<имя>` из корня репозитория."""
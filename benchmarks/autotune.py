@@ -0,0 +1,142 @@
+"""
+Автоподбор worker-ов (autotune.ConcurrencyTuner) против фиксированных настроек.
+
+Два сценария на синтетическом корпусе (benchmarks.corpus), размноженном жёсткими
+ссылками до --files файлов:
+  local — обычное чтение с локального диска (упор в CPU/GIL);
+  slow  — к каждому файлу добавляется задержка --latency-ms (time.sleep, как ожидание
+          сетевой ФС), лучший уровень параллелизма — десятки потоков.
+Для каждого сценария меряется скорость scan_folder при каждом фиксированном числе
+worker-ов и с автоподбором; код выхода 1, если автоподбор медленнее --min-ratio
+(по умолчанию 90%) от лучшей фиксированной настройки.
+
+    python -m benchmarks.autotune
+    python -m benchmarks.autotune --scenarios slow --latency-ms 20 --files 6000
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import statistics
+import argparse
+import tempfile
+import warnings
+from typing import Dict, Any, List
+
+from benchmarks.common import ROOT  # noqa: F401 — корень репозитория в sys.path
+from benchmarks.corpus import ensure_corpus
+
+import scanner
+from scanner import ScanEmitter, scan_folder
+from autotune import default_tuner
+
+SCENARIOS = ("local", "slow")
+DEFAULT_LEVELS = {"local": (1, 2, 4, 8, 16, 32), "slow": (8, 16, 32, 64, 128)}
+DEFAULT_MIN_RATIO = 0.9
+_MARKER = ".replicated"
+
+
+def replicate(corpus: str, target: str, files: int) -> int:
+    """Каталог target с копиями (жёсткими ссылками) файлов корпуса, всего не меньше files."""
+    originals = []
+    for d, _, names in os.walk(corpus):
+        originals += [os.path.join(d, n) for n in names if n != "manifest.json"]
+    copies = max(1, -(-files // len(originals)))
+    marker = os.path.join(target, _MARKER)
+    try:
+        with open(marker) as f:
+            if int(f.read()) == copies * len(originals):
+                return copies * len(originals)
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(target, ignore_errors=True)
+    for c in range(copies):
+        for src in originals:
+            dst = os.path.join(target, f"c{c:03d}", os.path.relpath(src, corpus))
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copyfile(src, dst)
+    with open(marker, "w") as f:
+        f.write(str(copies * len(originals)))
+    return copies * len(originals)
+
+
+def _scan(root: str, **kw) -> float:
+    """Файлов/с одного сканирования."""
+    emitter = ScanEmitter()
+    count = [0]
+    emitter.on_items = lambda items: count.__setitem__(0, count[0] + len(items))
+    t = time.perf_counter()
+    scan_folder(root, emitter, **kw)
+    return count[0] / (time.perf_counter() - t)
+
+
+def run_scenario(root: str, levels: List[int], repeats: int) -> Dict[str, Any]:
+    """Медиана repeats прогонов; фиксированные уровни и автоподбор чередуются в каждом круге."""
+    runs = {w: [] for w in levels}
+    autos = []
+    for _ in range(repeats):
+        for w in levels:
+            runs[w].append(_scan(root, max_workers=w))
+        tuner = default_tuner("thread")
+        autos.append((_scan(root, tuner=tuner), tuner.best_level, tuner.trace))
+    fixed = {w: statistics.median(v) for w, v in runs.items()}
+    auto, chosen, trace = sorted(autos, key=lambda r: r[0])[len(autos) // 2]
+    for w in levels:
+        print(f"  {w:>4} worker-ов: {fixed[w]:8.1f} файлов/с", file=sys.stderr)
+    best_w = max(fixed, key=fixed.get)
+    print(f"  автоподбор:   {auto:8.1f} файлов/с, выбрано {chosen} worker-ов "
+          f"({auto / fixed[best_w] * 100:.0f}% от лучшего фиксированного, {best_w})",
+          file=sys.stderr, flush=True)
+    return {"fixed": {str(w): round(v, 1) for w, v in fixed.items()}, "best_fixed_workers": best_w,
+            "best_fixed_files_per_s": round(fixed[best_w], 1), "auto_files_per_s": round(auto, 1),
+            "auto_workers": chosen, "ratio": round(auto / fixed[best_w], 3), "trace": trace}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "image-inspector-bench"),
+                        help="каталог корпуса (создаётся при отсутствии)")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--files", type=int, default=16000, help="файлов в размноженном корпусе")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="задержка на файл в сценарии slow")
+    parser.add_argument("--repeats", type=int, default=3, help="повторов, берётся медиана")
+    parser.add_argument("--scenarios", type=lambda s: [e for e in s.split(",") if e], default=list(SCENARIOS))
+    parser.add_argument("--min-ratio", type=float, default=DEFAULT_MIN_RATIO)
+    args = parser.parse_args(argv)
+    warnings.simplefilter("ignore")
+
+    ensure_corpus(args.corpus, args.scale, args.seed)
+    root = args.corpus.rstrip(os.sep) + "-autotune"
+    files = replicate(args.corpus, root, args.files)
+    print(f"Корпус: {files} файлов в {root}", file=sys.stderr)
+
+    inspect_image = scanner.inspect_image
+    result = {"files": files, "latency_ms": args.latency_ms, "cpu_count": os.cpu_count()}
+    ok = True
+    for name in args.scenarios:
+        print(f"[{name}]", file=sys.stderr, flush=True)
+        if name == "slow":
+            delay = args.latency_ms / 1000
+
+            def slow_inspect(path, *a, **kw):
+                time.sleep(delay)  # ожидание ответа сетевой ФС, GIL отпущен
+                return inspect_image(path, *a, **kw)
+            scanner.inspect_image = slow_inspect
+        try:
+            r = run_scenario(root, list(DEFAULT_LEVELS[name]), args.repeats)
+        finally:
+            scanner.inspect_image = inspect_image
+        ok = ok and r["ratio"] >= args.min_ratio
+        result[name] = r
+    result["ok"] = ok
+    print(json.dumps(result))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Время холодного старта консольного режима (`python -m scanner` на пустой папке)
+и проверка, что PySide6 при этом не импортируется. Код выхода 1, если медиана
+превышает бюджет или Qt всё-таки загружен.
+
+    python -m benchmarks.cli_startup --runs 10 --budget 0.5
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from benchmarks.common import ROOT
+
+DEFAULT_BUDGET_S = 0.5
+
+
+def _run(folder: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-m", "scanner", folder]
+    return subprocess.run(cmd, cwd=ROOT, check=True, capture_output=True, text=True)
+
+
+def measure(runs: int) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        _run(folder)  # прогрев файлового кэша ОС и __pycache__
+        times = []
+        for _ in range(runs):
+            t = time.perf_counter()
+            _run(folder)
+            times.append(time.perf_counter() - t)
+        # строки -X importtime: "import time: self | cumulative | имя модуля"
+        imported = [line.rsplit("|", 1)[-1].strip()
+                    for line in _run(folder, importtime=True).stderr.splitlines() if "|" in line]
+    return {
+        "runs": runs,
+        "median_s": round(statistics.median(times), 4),
+        "min_s": round(min(times), 4),
+        "max_s": round(max(times), 4),
+        "modules": len(imported),
+        "qt_modules": sorted({m for m in imported if m.startswith("PySide6")}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_S, help="бюджет медианы, секунды")
+    args = parser.parse_args(argv)
+    r = measure(args.runs)
+    r["budget_s"] = args.budget
+    print(f"python -m scanner: median {r['median_s'] * 1000:.0f} ms (min {r['min_s'] * 1000:.0f}, "
+          f"max {r['max_s'] * 1000:.0f}), modules {r['modules']}, budget {args.budget * 1000:.0f} ms")
+    ok = r["median_s"] <= args.budget and not r["qt_modules"]
+    if r["qt_modules"]:
+        print("PySide6 импортирован:", ", ".join(r["qt_modules"]))
+    print(json.dumps(r))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import subprocess
+from typing import Dict, Any, List
+
+# Корень репозитория — чтобы бенчмарки импортировали модули приложения при запуске из любого места
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def current_rss() -> int:
+    """Текущий RSS процесса в байтах (Linux /proc, иначе пиковый ru_maxrss)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+def peak_rss() -> int:
+    """Пиковый RSS процесса в байтах."""
+    try:
+        import resource
+    except ImportError:
+        return current_rss()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_isolated(module: str, args: List[str]) -> Dict[str, Any]:
+    """Запустить `python -m module args` в отдельном процессе и разобрать JSON из stdout."""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    out = subprocess.run([sys.executable, "-m", module] + args, cwd=ROOT, env=env,
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def synthetic_result(i: int) -> Dict[str, Any]:
+    """Правдоподобный результат inspect_image для JPEG с EXIF (без чтения файлов)."""
+    return {
+        "path": f"/data/archive/{i // 1000:04d}/{i % 1000:03d}/IMG_{i:08d}.jpg",
+        "filename": f"IMG_{i:08d}.jpg",
+        "format": "JPEG",
+        "width": 4000 + i % 7,
+        "height": 3000 - i % 5,
+        "dpi_x": 300.0,
+        "dpi_y": 300.0,
+        "depth": 24,
+        "mode": "RGB",
+        "compression": "JPEG (baseline)" if i % 3 else "JPEG (progressive)",
+        "additional": {
+            "exif_keys_count": 12,
+            "exif_sample": {"271": "Canon", "272": "Canon EOS 5D", "274": "1",
+                            "282": "72.0", "306": f"2020:01:01 00:{i % 60:02d}:00"},
+            "jpeg_quant_tables": {0: 64, 1: 64},
+        },
+    }
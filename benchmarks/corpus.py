@@ -0,0 +1,207 @@
+"""
+Генератор детерминированного тестового корпуса изображений (Pillow).
+
+Все шесть форматов в разных режимах, многокадровые GIF, многостраничные и сжатые
+TIFF, JPEG с большим EXIF, заголовки с огромными размерами, обрезанные и битые
+файлы, имя не из UTF-8 (где ФС его допускает), глубокое дерево каталогов.
+Одинаковые seed и scale дают тот же набор файлов (для одной версии Pillow);
+manifest.json описывает корпус.
+
+    python -m benchmarks.corpus /tmp/bench_corpus --scale 4 --seed 0
+"""
+import io
+import os
+import sys
+import json
+import zlib
+import random
+import struct
+import argparse
+from typing import Dict, Any, List
+
+from PIL import Image, ImageDraw, TiffImagePlugin
+
+import benchmarks.common  # noqa: F401 — корень репозитория в sys.path
+
+MANIFEST = "manifest.json"
+CORPUS_VERSION = 2
+TREE_DEPTH = 12
+# имя не из UTF-8: os.scandir отдаёт его с суррогатами (surrogateescape)
+NON_UTF8_NAME = b"png_name_\xff.png".decode("utf-8", "surrogateescape")
+
+
+def _picture(rng: random.Random, mode: str, size) -> Image.Image:
+    """Картинка с линиями и шумом, чтобы сжатие не вырождалось."""
+    im = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    d = ImageDraw.Draw(im)
+    for _ in range(8):
+        xy = [rng.randrange(size[0]), rng.randrange(size[1]), rng.randrange(size[0]), rng.randrange(size[1])]
+        d.line(xy, fill=tuple(rng.randrange(256) for _ in range(3)), width=3)
+    if mode == "P":
+        return im.quantize(64)
+    return im.convert(mode)
+
+
+def _heavy_exif(rng: random.Random, i: int) -> Image.Exif:
+    exif = Image.Exif()
+    exif[0x010F] = "Canon"
+    exif[0x0110] = f"Canon EOS {rng.randrange(1, 90)}D"
+    exif[0x0112] = rng.choice((1, 3, 6, 8))
+    exif[0x011A] = 300.0
+    exif[0x011B] = 300.0
+    exif[0x0128] = 2
+    exif[0x0131] = "benchmarks.corpus"
+    exif[0x0132] = f"2020:01:{1 + i % 28:02d} 12:00:00"
+    exif[0x013B] = "Bench"
+    exif[0x8298] = "(c) nobody"
+    exif[0x010E] = "x" * 2000  # ImageDescription — длинная строка
+    ifd = exif.get_ifd(0x8769)
+    ifd[0x829A] = TiffImagePlugin.IFDRational(1, 250)
+    ifd[0x829D] = TiffImagePlugin.IFDRational(28, 10)
+    ifd[0x8827] = 400
+    ifd[0x9003] = f"2020:01:{1 + i % 28:02d} 12:00:00"
+    ifd[0x920A] = TiffImagePlugin.IFDRational(50, 1)
+    ifd[0x927C] = bytes(rng.randrange(256) for _ in range(4000))  # MakerNote
+    return exif
+
+
+def _huge_png(rng: random.Random) -> bytes:
+    """PNG с IHDR 100000×100000 (данных — на маленькую картинку)."""
+    bio = io.BytesIO()
+    _picture(rng, "RGB", (16, 16)).save(bio, "PNG")
+    d = bytearray(bio.getvalue())
+    d[16:24] = struct.pack(">II", 100000, 100000)
+    d[29:33] = struct.pack(">I", zlib.crc32(bytes(d[12:29])))
+    return bytes(d)
+
+
+def _huge_bmp(rng: random.Random) -> bytes:
+    bio = io.BytesIO()
+    _picture(rng, "RGB", (16, 16)).save(bio, "BMP")
+    d = bytearray(bio.getvalue())
+    d[18:26] = struct.pack("<ii", 60000, 60000)
+    return bytes(d)
+
+
+def _encode(im: Image.Image, fmt: str, **kw) -> bytes:
+    bio = io.BytesIO()
+    im.save(bio, fmt, **kw)
+    return bio.getvalue()
+
+
+def _variants(rng: random.Random, i: int) -> List[tuple]:
+    """Один «комплект» файлов: (имя, вид, байты)."""
+    size = (rng.randrange(200, 900), rng.randrange(150, 700))
+    out = []
+    for mode in ("L", "RGB", "CMYK"):
+        im = _picture(rng, mode, size)
+        out.append((f"jpeg_{mode}.jpg", "jpeg", _encode(im, "JPEG", quality=85)))
+        out.append((f"jpeg_{mode}_prog.jpg", "jpeg_progressive", _encode(im, "JPEG", progressive=True)))
+    rgb = _picture(rng, "RGB", size)
+    out.append(("jpeg_exif.jpg", "jpeg_exif_heavy", _encode(rgb, "JPEG", exif=_heavy_exif(rng, i), dpi=(300, 300))))
+    for mode in ("1", "L", "P", "RGB", "RGBA", "I;16"):
+        out.append((f"png_{mode.replace(';', '')}.png", "png", _encode(_picture(rng, mode, size), "PNG")))
+    out.append((NON_UTF8_NAME, "non_utf8_name", _encode(rgb, "PNG")))
+    out.append(("png_exif.png", "png_exif", _encode(rgb, "PNG", exif=_heavy_exif(rng, i), dpi=(72, 72))))
+    for mode in ("L", "P", "RGB"):
+        out.append((f"gif_{mode}.gif", "gif", _encode(_picture(rng, mode, size), "GIF")))
+    frames = [_picture(rng, "RGB", (160, 120)).quantize(32) for _ in range(12)]
+    out.append(("gif_anim.gif", "gif_multiframe",
+                _encode(frames[0], "GIF", save_all=True, append_images=frames[1:], duration=80, loop=0)))
+    for comp in (None, "tiff_lzw", "tiff_deflate", "packbits", "jpeg"):
+        kw = {"compression": comp} if comp else {}
+        out.append((f"tiff_{comp or 'raw'}.tif", "tiff_compressed" if comp else "tiff",
+                    _encode(rgb, "TIFF", dpi=(300, 300), **kw)))
+    out.append(("tiff_g4.tif", "tiff_compressed", _encode(_picture(rng, "1", size), "TIFF", compression="group4")))
+    pages = [_picture(rng, "RGB", (320, 240)) for _ in range(6)]
+    out.append(("tiff_pages.tif", "tiff_multipage",
+                _encode(pages[0], "TIFF", save_all=True, append_images=pages[1:], compression="tiff_lzw")))
+    out.append(("tiff_exif.tif", "tiff_exif", _encode(rgb, "TIFF", exif=_heavy_exif(rng, i))))
+    for mode in ("1", "L", "P", "RGB"):
+        out.append((f"bmp_{mode}.bmp", "bmp", _encode(_picture(rng, mode, size), "BMP")))
+        out.append((f"pcx_{mode}.pcx", "pcx", _encode(_picture(rng, mode, size), "PCX")))
+    # заголовки-«бомбы» и повреждённые файлы
+    out.append(("huge.png", "huge_header", _huge_png(rng)))
+    out.append(("huge.bmp", "huge_header", _huge_bmp(rng)))
+    by_name = {name: data for name, _, data in out}
+    jpeg = by_name["jpeg_RGB.jpg"]
+    out.append(("trunc.jpg", "truncated", jpeg[:len(jpeg) // 3]))
+    png = by_name["png_RGB.png"]
+    out.append(("trunc.png", "truncated", png[:64]))
+    out.append(("junk.gif", "corrupt", b"GIF89a" + bytes(rng.randrange(256) for _ in range(200))))
+    out.append(("junk.tif", "corrupt", b"II*\x00" + bytes(rng.randrange(256) for _ in range(200))))
+    out.append(("empty.bmp", "corrupt", b""))
+    flipped = bytearray(jpeg)
+    flipped[len(flipped) // 2] ^= 0xFF
+    out.append(("flip.jpg", "corrupt", bytes(flipped)))
+    return out
+
+
+def _dir_for(root: str, rng: random.Random, i: int) -> str:
+    """Каталог для i-го комплекта: часть — плоско, часть — в глубоком дереве."""
+    if i % 3 == 0:
+        return root
+    depth = rng.randrange(1, TREE_DEPTH + 1)
+    parts = [f"d{rng.randrange(4)}" for _ in range(depth)]
+    return os.path.join(root, *parts)
+
+
+def generate_corpus(root: str, scale: int = 1, seed: int = 0) -> Dict[str, Any]:
+    """Сгенерировать корпус в root (scale комплектов файлов) и вернуть манифест."""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    files = []
+    for i in range(scale):
+        d = _dir_for(root, rng, i)
+        os.makedirs(d, exist_ok=True)
+        for name, kind, data in _variants(rng, i):
+            path = os.path.join(d, f"{i:04d}_{name}")
+            try:
+                with open(path, "wb") as f:
+                    f.write(data)
+            except (OSError, UnicodeError):
+                if kind != "non_utf8_name":
+                    raise
+                continue  # ФС не допускает имён не из UTF-8 (macOS, Windows)
+            files.append({"path": os.path.relpath(path, root), "kind": kind, "bytes": len(data)})
+    manifest = {"version": CORPUS_VERSION, "seed": seed, "scale": scale,
+                "pillow": Image.__version__, "files": files}
+    with open(os.path.join(root, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def ensure_corpus(root: str, scale: int = 1, seed: int = 0) -> Dict[str, Any]:
+    """Манифест готового корпуса с теми же параметрами или новый корпус."""
+    try:
+        with open(os.path.join(root, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if (manifest.get("version"), manifest.get("seed"), manifest.get("scale"),
+                manifest.get("pillow")) == (CORPUS_VERSION, seed, scale, Image.__version__):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    if os.path.isdir(root) and os.listdir(root) and not os.path.exists(os.path.join(root, MANIFEST)):
+        raise ValueError(f"{root} не пуст и не является корпусом бенчмарков")
+    if os.path.isdir(root):
+        import shutil
+        shutil.rmtree(root)
+    return generate_corpus(root, scale, seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root")
+    parser.add_argument("--scale", type=int, default=1, help="число комплектов файлов")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    m = generate_corpus(args.root, args.scale, args.seed)
+    kinds = {}
+    for f in m["files"]:
+        kinds[f["kind"]] = kinds.get(f["kind"], 0) + 1
+    print(f"{len(m['files'])} файлов в {args.root}: " + ", ".join(f"{k} {v}" for k, v in sorted(kinds.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
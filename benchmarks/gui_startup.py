@@ -0,0 +1,99 @@
+"""
+Время старта GUI до первой отрисовки окна: `python main.py` (или собранный
+PyInstaller-ом exe, --exe) запускается с переменной IMAGE_INSPECTOR_STARTUP_PROBE,
+окно после первой отрисовки записывает отметки времени и закрывается (main.StartupProbe).
+Печатает медианы от запуска процесса до загрузки модулей, создания QApplication,
+построения окна и отрисовки; first_s — первый запуск (холодный файловый кэш ОС
+и __pycache__, для onefile-сборки — с распаковкой во временный каталог). Для
+main.py также проверяется, что Pillow и сканер до отрисовки не импортируются.
+Код выхода 1, если медиана paint превышает бюджет или они всё-таки импортированы.
+
+    python -m benchmarks.gui_startup --runs 10
+    python -m benchmarks.gui_startup --exe dist/FileMetadataScanner/FileMetadataScanner --budget 1.5
+    python -m benchmarks.gui_startup --offscreen   # без дисплея
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.common import ROOT
+
+DEFAULT_BUDGET_S = 1.0
+PROBE_ENV = "IMAGE_INSPECTOR_STARTUP_PROBE"  # main.STARTUP_PROBE_ENV; main здесь не импортируется (PySide6)
+MARKS = ("imported", "app", "window", "paint")
+EAGER_FORBIDDEN = ("PIL", "scanner", "formats_info", "thumbnails")
+RUN_TIMEOUT_S = 60
+
+
+def _command(exe: Optional[str], importtime: bool = False) -> List[str]:
+    if exe:
+        return [os.path.abspath(exe)]
+    return [sys.executable] + (["-X", "importtime"] if importtime else []) + [os.path.join(ROOT, "main.py")]
+
+
+def _run(cmd: List[str], offscreen: bool) -> Tuple[Dict[str, float], str]:
+    """Один запуск: отметки относительно старта процесса (секунды) и stderr."""
+    fd, probe = tempfile.mkstemp(prefix="gui-startup-", suffix=".json")
+    os.close(fd)
+    env = dict(os.environ)
+    env[PROBE_ENV] = probe
+    if offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    try:
+        start = time.time()
+        proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, timeout=RUN_TIMEOUT_S)
+        if proc.returncode:
+            raise RuntimeError(f"{' '.join(cmd)}: exit {proc.returncode}\n{proc.stderr}")
+        with open(probe, encoding="utf-8") as f:
+            marks = json.load(f)
+    finally:
+        os.remove(probe)
+    return {k: marks[k] - start for k in MARKS if k in marks}, proc.stderr
+
+
+def measure(runs: int, exe: Optional[str], offscreen: bool) -> dict:
+    cmd = _command(exe)
+    first, _ = _run(cmd, offscreen)
+    samples = [_run(cmd, offscreen)[0] for _ in range(runs)]
+    report = {"target": exe or "main.py", "runs": runs, "first_s": round(first["paint"], 4)}
+    for k in MARKS:
+        values = [s[k] for s in samples if k in s]
+        if values:
+            report[f"{k}_s"] = round(statistics.median(values), 4)
+    report["max_paint_s"] = round(max(s["paint"] for s in samples), 4)
+    if not exe:
+        # строки -X importtime: "import time: self | cumulative | имя модуля"
+        _, stderr = _run(_command(None, importtime=True), offscreen)
+        imported = [line.rsplit("|", 1)[-1].strip() for line in stderr.splitlines() if "|" in line]
+        report["modules"] = len(imported)
+        report["eager"] = sorted({m for m in imported if m.split(".")[0] in EAGER_FORBIDDEN})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_S, help="бюджет медианы paint, секунды")
+    parser.add_argument("--exe", help="собранное приложение вместо python main.py")
+    parser.add_argument("--offscreen", action="store_true", help="QT_QPA_PLATFORM=offscreen (без дисплея)")
+    args = parser.parse_args(argv)
+    r = measure(args.runs, args.exe, args.offscreen)
+    r["budget_s"] = args.budget
+    print(f"{r['target']}: first paint median {r['paint_s'] * 1000:.0f} ms (first run {r['first_s'] * 1000:.0f}, "
+          f"max {r['max_paint_s'] * 1000:.0f}); imports {r['imported_s'] * 1000:.0f} ms, "
+          f"QApplication {r['app_s'] * 1000:.0f} ms, window {r['window_s'] * 1000:.0f} ms; "
+          f"budget {args.budget * 1000:.0f} ms")
+    if r.get("eager"):
+        print("До первой отрисовки импортированы:", ", ".join(r["eager"]))
+    print(json.dumps(r, ensure_ascii=False))
+    return 0 if r["paint_s"] <= args.budget and not r.get("eager") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
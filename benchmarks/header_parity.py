@@ -0,0 +1,68 @@
+"""
+Проверка быстрого разбора заголовков (fast_headers): для каждого файла корпуса
+(benchmarks.corpus) и каждого уровня inspect_image(p, fast=True, level=L) должен
+совпадать с inspect_image(p, fast=False, level=L) — путём через Pillow. Печатает
+расхождения (файл, уровень, поле: fast / Pillow); код выхода 1, если они есть.
+
+    python -m benchmarks.header_parity
+    python -m benchmarks.header_parity --scale 4 --seed 1 --corpus /tmp/parity_corpus
+"""
+import os
+import sys
+import json
+import math
+import argparse
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.corpus import ensure_corpus
+
+from formats_info import inspect_image, LEVELS
+
+MAX_SHOWN = 20
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    # тип тоже должен совпадать: 300 и 300.0 в DPI — разные результаты для экспорта
+    return type(a) is type(b) and a == b
+
+
+def compare(path: str, level: str) -> List[Dict[str, Any]]:
+    """Расхождения по полям результата для одного файла и уровня."""
+    fast, slow = inspect_image(path, fast=True, level=level), inspect_image(path, fast=False, level=level)
+    return [{"path": path, "level": level, "field": k, "fast": fast.get(k), "pillow": slow.get(k)}
+            for k in sorted(set(fast) | set(slow)) if not _same(fast.get(k), slow.get(k))]
+
+
+def run(root: str, manifest: Dict[str, Any]) -> Dict[str, Any]:
+    diffs = []
+    for f in manifest["files"]:
+        path = os.path.join(root, f["path"])
+        for level in LEVELS:
+            diffs.extend(compare(path, level))
+    return {"files": len(manifest["files"]), "levels": list(LEVELS), "mismatches": len(diffs),
+            "files_with_mismatches": len({d["path"] for d in diffs}), "diffs": diffs}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=2, help="число комплектов файлов корпуса")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "parity_corpus"))
+    args = parser.parse_args(argv)
+    manifest = ensure_corpus(args.corpus, args.scale, args.seed)
+    r = run(args.corpus, manifest)
+    print(f"{r['files']} файлов × {len(r['levels'])} уровней: расхождений {r['mismatches']} "
+          f"в {r['files_with_mismatches']} файлах")
+    for d in r["diffs"][:MAX_SHOWN]:
+        print(f"  {os.path.relpath(d['path'], args.corpus)} [{d['level']}] {d['field']}: "
+              f"{d['fast']!r} / {d['pillow']!r}")
+    r.pop("diffs")
+    print(json.dumps(r, ensure_ascii=False))
+    return 0 if not r["mismatches"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Память и скорость сортировки табличной модели: прежний QStandardItemModel
+(8 QStandardItem на строку + словарь в UserRole+1) против колоночного ResultsModel.
+
+    python -m benchmarks.model_memory --rows 200000
+"""
+import sys
+import json
+import time
+import argparse
+
+from benchmarks.common import current_rss, run_isolated, synthetic_result
+
+VARIANTS = ("standard", "columnar")
+
+
+def _fill_standard(items):
+    from PySide6.QtGui import QStandardItemModel, QStandardItem
+    from PySide6.QtCore import Qt
+    from results_model import safe_str, safe_float
+    model = QStandardItemModel(0, 8)
+    # так строки добавлял MainWindow._on_item_received до перехода на ResultsModel
+    for item in items:
+        w, h = item.get("width"), item.get("height")
+        dx, dy = item.get("dpi_x"), item.get("dpi_y")
+        add = item.get("additional", {})
+        row = [
+            QStandardItem(item.get("filename", item.get("path", ""))),
+            QStandardItem(safe_str(item.get("format"))),
+            QStandardItem(f"{safe_str(w)}×{safe_str(h)}" if w and h else ""),
+            QStandardItem(f"{safe_float(dx)}×{safe_float(dy)}" if dx and dy else ""),
+            QStandardItem(safe_str(item.get("depth"))),
+            QStandardItem(safe_str(item.get("compression"))),
+            QStandardItem(item.get("error", "")),
+            QStandardItem(", ".join(f"{k}:{v}" for k, v in list(add.items())[:3]) if add else ""),
+        ]
+        model.appendRow(row)
+        model.item(model.rowCount() - 1, 0).setData(item, Qt.UserRole + 1)
+    return model, lambda: model.sort(2)
+
+
+def _fill_columnar(items, batch=500):
+    from results_model import ResultsModel
+    model = ResultsModel()
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == batch:
+            model.append_items(chunk)
+            chunk = []
+    model.append_items(chunk)
+    return model, lambda: model.sort(2)
+
+
+def measure(variant: str, rows: int):
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    base = current_rss()
+    t = time.perf_counter()
+    # результаты генерируются по одному, поэтому в памяти остаётся только то, что держит модель
+    fill = _fill_standard if variant == "standard" else _fill_columnar
+    model, sort = fill(synthetic_result(i) for i in range(rows))
+    fill_s = time.perf_counter() - t
+    rss = current_rss() - base
+    t = time.perf_counter()
+    sort()
+    sort_s = time.perf_counter() - t
+    return {"variant": variant, "rows": rows, "rss_bytes": rss, "bytes_per_row": rss / max(rows, 1),
+            "fill_s": round(fill_s, 3), "sort_s": round(sort_s, 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--variant", choices=VARIANTS, help="измерить один вариант в текущем процессе")
+    args = parser.parse_args(argv)
+    if args.variant:
+        print(json.dumps(measure(args.variant, args.rows)))
+        return 0
+    results = [run_isolated("benchmarks.model_memory", ["--variant", v, "--rows", str(args.rows)])
+               for v in VARIANTS]
+    for r in results:
+        print(f"{r['variant']:>9}: {r['rss_bytes'] / 2**20:8.1f} MiB  {r['bytes_per_row']:7.0f} B/row  "
+              f"fill {r['fill_s']:6.2f}s  sort {r['sort_s']:6.2f}s")
+    print(json.dumps(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Шардированное сканирование на одной машине: N процессов `python -m scanner --shard i/N`
+параллельно по корпусу (benchmarks.corpus, размноженному жёсткими ссылками до --files
+файлов в подпапках c000, c001, ...), слияние их .jsonl.gz через result_merge и сравнение
+с одним сканированием всего дерева. Печатает время обоих вариантов, слияния и разброс
+файлов по шардам; код выхода 1, если слитый результат отличается от одиночного.
+
+    python -m benchmarks.shards
+    python -m benchmarks.shards --shards 8 --files 20000 --level standard --shard-depth 2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, Any, List
+
+from benchmarks.common import ROOT
+from benchmarks.corpus import ensure_corpus
+from benchmarks.autotune import replicate
+
+from formats_info import LEVELS, BASIC
+from result_merge import iter_results, merge_results
+
+
+def _scanner(tree: str, output: str, args: List[str]) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return subprocess.Popen([sys.executable, "-m", "scanner", tree, "-o", output] + args, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+
+def _wait(procs: List[subprocess.Popen]):
+    for proc in procs:
+        _, err = proc.communicate()
+        if proc.returncode:
+            raise RuntimeError(f"{' '.join(proc.args)}: exit {proc.returncode}\n{err}")
+
+
+def _records(path: str) -> Dict[str, Dict[str, Any]]:
+    return {item["path"]: item for item in iter_results(path)}
+
+
+def run(tree: str, work: str, shards: int, depth: int, level: str, workers: str) -> Dict[str, Any]:
+    common = ["--level", level, "-w", workers]
+    t = time.perf_counter()
+    _wait([_scanner(tree, os.path.join(work, "single.jsonl"), common)])
+    single_s = time.perf_counter() - t
+
+    outputs = [os.path.join(work, f"shard-{i:03d}.jsonl.gz") for i in range(1, shards + 1)]
+    t = time.perf_counter()
+    _wait([_scanner(tree, out, common + ["--shard", f"{i}/{shards}", "--shard-depth", str(depth)])
+           for i, out in enumerate(outputs, 1)])
+    sharded_s = time.perf_counter() - t
+
+    merged = os.path.join(work, "merged.sqlite")
+    stats: Dict[str, int] = {}
+    t = time.perf_counter()
+    merge_results(outputs, merged, stats=stats)
+    merge_s = time.perf_counter() - t
+
+    counts = [sum(1 for _ in iter_results(out)) for out in outputs]
+    single, result = _records(os.path.join(work, "single.jsonl")), _records(merged)
+    return {
+        "files": len(single),
+        "shards": shards,
+        "single_s": round(single_s, 3),
+        "sharded_s": round(sharded_s, 3),
+        "merge_s": round(merge_s, 3),
+        "per_shard": counts,
+        "imbalance": round(max(counts) * shards / max(1, sum(counts)), 2),
+        "overlaps": stats["duplicates"],
+        "identical": single == result,
+    }
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--shards", type=int, default=4, help="число процессов-шардов")
+    p.add_argument("--shard-depth", type=int, default=1)
+    p.add_argument("--files", type=int, default=5000, help="не меньше стольких файлов в дереве")
+    p.add_argument("--level", choices=LEVELS, default=BASIC)
+    p.add_argument("--workers", default="4", help="worker-ов в каждом процессе (число или auto)")
+    p.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "bench_corpus"))
+    p.add_argument("--tree", default=os.path.join(tempfile.gettempdir(), "bench_shards"),
+                   help="каталог размноженного корпуса")
+    args = p.parse_args(argv)
+    ensure_corpus(args.corpus)
+    replicate(args.corpus, args.tree, args.files)
+    with tempfile.TemporaryDirectory() as work:
+        report = run(args.tree, work, args.shards, args.shard_depth, args.level, args.workers)
+    print(json.dumps(report, ensure_ascii=False))
+    return 0 if report["identical"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
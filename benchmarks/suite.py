@@ -0,0 +1,214 @@
+"""
+Воспроизводимый набор бенчмарков на синтетическом корпусе (benchmarks.corpus).
+
+Измеряет задержку inspect_image по форматам (p50/p99), скорость scan_folder
+(файлов/с) для разного числа worker-ов, скорость приёма результатов таблицей GUI
+(ResultsModel.append_items — то, что делает MainWindow._on_items_received)
+и пиковый RSS каждого раздела. Каждый раздел идёт в отдельном процессе.
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --output current.json --compare baseline.json
+    python -m benchmarks.suite --compare baseline.json --current current.json --threshold 0.15
+
+В режиме сравнения код выхода 1, если есть регрессии сверх порога.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import warnings
+from typing import Dict, Any, List
+
+from benchmarks.common import peak_rss, run_isolated
+from benchmarks.corpus import ensure_corpus
+
+SUITE_VERSION = 1
+SECTIONS = ("inspect", "scan", "ingest")
+DEFAULT_WORKERS = (1, 2, 4, 8)
+DEFAULT_THRESHOLD = 0.10
+FORMAT_BY_EXT = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".gif": "GIF",
+                 ".tif": "TIFF", ".tiff": "TIFF", ".bmp": "BMP", ".pcx": "PCX"}
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    s = sorted(values)
+    if not s:
+        return 0.0
+    k = max(0, min(len(s) - 1, int(round(p / 100.0 * len(s) + 0.5)) - 1))
+    return s[k]
+
+
+def bench_inspect(root: str, manifest: Dict[str, Any], repeats: int) -> Dict[str, float]:
+    from formats_info import inspect_image
+    by_format: Dict[str, List[float]] = {}
+    for f in manifest["files"]:
+        path = os.path.join(root, f["path"])
+        fmt = FORMAT_BY_EXT[os.path.splitext(path)[1].lower()]
+        inspect_image(path)  # прогрев: файл в page cache, модули Pillow загружены
+        for _ in range(repeats):
+            t = time.perf_counter()
+            inspect_image(path)
+            by_format.setdefault(fmt, []).append((time.perf_counter() - t) * 1e6)
+    metrics = {}
+    for fmt, values in sorted(by_format.items()):
+        metrics[f"inspect.{fmt}.p50_us"] = round(percentile(values, 50), 1)
+        metrics[f"inspect.{fmt}.p99_us"] = round(percentile(values, 99), 1)
+    everything = [v for values in by_format.values() for v in values]
+    metrics["inspect.all.p50_us"] = round(percentile(everything, 50), 1)
+    metrics["inspect.all.p99_us"] = round(percentile(everything, 99), 1)
+    return metrics
+
+
+def bench_scan(root: str, manifest: Dict[str, Any], repeats: int, workers, engines) -> Dict[str, float]:
+    from scanner import ScanEmitter, scan_folder
+    metrics = {}
+    for engine in engines:
+        for w in workers:
+            best = None
+            for _ in range(repeats):
+                emitter = ScanEmitter()
+                count = [0]
+                emitter.on_items = lambda items: count.__setitem__(0, count[0] + len(items))
+                t = time.perf_counter()
+                scan_folder(root, emitter, w, engine=engine)
+                dt = time.perf_counter() - t
+                best = dt if best is None else min(best, dt)
+            metrics[f"scan.{engine}.w{w}.files_per_s"] = round(count[0] / best, 1)
+    return metrics
+
+
+def bench_ingest(root: str, manifest: Dict[str, Any], rows: int, batch: int = 500) -> Dict[str, float]:
+    from formats_info import inspect_image
+    from PySide6.QtWidgets import QApplication
+    from results_model import ResultsModel
+    app = QApplication.instance() or QApplication([])
+    sample = [inspect_image(os.path.join(root, f["path"])) for f in manifest["files"]]
+    items = [dict(sample[i % len(sample)]) for i in range(rows)]
+    model = ResultsModel()
+    t = time.perf_counter()
+    for i in range(0, rows, batch):
+        model.append_items(items[i:i + batch])
+        app.processEvents()
+    dt = time.perf_counter() - t
+    return {"ingest.rows_per_s": round(rows / dt, 1)}
+
+
+def run_section(section: str, args) -> Dict[str, Any]:
+    warnings.simplefilter("ignore")
+    manifest = ensure_corpus(args.corpus, args.scale, args.seed)
+    if section == "inspect":
+        metrics = bench_inspect(args.corpus, manifest, args.repeats)
+    elif section == "scan":
+        metrics = bench_scan(args.corpus, manifest, args.repeats, args.workers, args.engines)
+    else:
+        metrics = bench_ingest(args.corpus, manifest, args.ingest_rows)
+    metrics[f"rss.{section}.peak_bytes"] = peak_rss()
+    return metrics
+
+
+def run_suite(args) -> Dict[str, Any]:
+    manifest = ensure_corpus(args.corpus, args.scale, args.seed)
+    common = ["--corpus", args.corpus, "--scale", str(args.scale), "--seed", str(args.seed),
+              "--repeats", str(args.repeats), "--workers", ",".join(map(str, args.workers)),
+              "--engines", ",".join(args.engines), "--ingest-rows", str(args.ingest_rows)]
+    metrics = {}
+    for section in args.sections:
+        print(f"[{section}]...", file=sys.stderr, flush=True)
+        metrics.update(run_isolated("benchmarks.suite", ["--section", section] + common))
+    from PIL import Image
+    return {
+        "suite_version": SUITE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "env": {"python": platform.python_version(), "pillow": Image.__version__,
+                "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "corpus": {"seed": args.seed, "scale": args.scale, "files": len(manifest["files"]),
+                   "bytes": sum(f["bytes"] for f in manifest["files"])},
+        "params": {"repeats": args.repeats, "workers": args.workers, "engines": args.engines,
+                   "ingest_rows": args.ingest_rows},
+        "metrics": metrics,
+    }
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_s")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Сравнить метрики; regression=True, если изменение хуже порога threshold (доля)."""
+    rows = []
+    base, cur = baseline["metrics"], current["metrics"]
+    for name in sorted(set(base) & set(cur)):
+        b, c = base[name], cur[name]
+        if not b:
+            continue
+        change = (c - b) / b
+        worse = -change if higher_is_better(name) else change
+        rows.append({"metric": name, "baseline": b, "current": c, "change": round(change, 4),
+                     "regression": worse > threshold, "improvement": -worse > threshold})
+    return rows
+
+
+def _print_comparison(rows, threshold):
+    for r in rows:
+        mark = "REGRESSION" if r["regression"] else ("improved" if r["improvement"] else "")
+        print(f"{r['metric']:<36} {r['baseline']:>14,.1f} -> {r['current']:>14,.1f} "
+              f"{r['change'] * 100:+7.1f}%  {mark}")
+    bad = [r for r in rows if r["regression"]]
+    print(f"Регрессий (порог {threshold * 100:.0f}%): {len(bad)}")
+
+
+def _int_list(text):
+    return [int(x) for x in text.split(",") if x]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "image-inspector-bench"),
+                        help="каталог корпуса (создаётся при отсутствии)")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", type=_int_list, default=list(DEFAULT_WORKERS))
+    parser.add_argument("--engines", type=lambda s: [e for e in s.split(",") if e], default=["thread"])
+    parser.add_argument("--ingest-rows", type=int, default=100_000)
+    parser.add_argument("--sections", type=lambda s: [e for e in s.split(",") if e], default=list(SECTIONS))
+    parser.add_argument("--section", choices=SECTIONS, help="один раздел в текущем процессе (внутреннее)")
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="сравнить с сохранёнными результатами")
+    parser.add_argument("--current", help="с --compare: взять текущие результаты из файла, а не запускать")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое ухудшение, доля (по умолчанию 0.10)")
+    args = parser.parse_args(argv)
+
+    if args.section:
+        print(json.dumps(run_section(args.section, args)))
+        return 0
+
+    if args.current:
+        with open(args.current, encoding="utf-8") as f:
+            result = json.load(f)
+    else:
+        result = run_suite(args)
+        for name, value in sorted(result["metrics"].items()):
+            print(f"{name:<36} {value:>14,.1f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=1)
+    if not args.compare:
+        return 0
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("corpus") != result.get("corpus") or baseline.get("params") != result.get("params"):
+        print("Внимание: корпус или параметры отличаются от базовых, сравнение может быть некорректным",
+              file=sys.stderr)
+    rows = compare(baseline, result, args.threshold)
+    _print_comparison(rows, args.threshold)
+    return 1 if any(r["regression"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
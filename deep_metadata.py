@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Set
+from PySide6.QtCore import QObject, Signal
+from formats_info import inspect_image, DEEP
+
+DEFAULT_WORKERS = 2
+
+
+class DeepMetadataService(QObject):
+    """
+    Фоновое дочитывание deep-метаданных (EXIF, таблицы квантования, кадры GIF)
+    для строк, просканированных на уровне basic/standard.
+    request(строка хранилища, путь) ставит файл в очередь (повторный запрос той же
+    строки, пока она в работе, игнорируется); готовая запись приходит сигналом
+    ready(строка, запись) в потоке GUI. reset() отбрасывает результаты, запрошенные
+    до очистки таблицы.
+    """
+    # запись — object: строки в dict сигнала Qt превратил бы в QString и потерял бы суррогаты
+    ready = Signal(int, object)
+    _done = Signal(int, int, object)  # (поколение, строка, запись) из worker-потока
+
+    def __init__(self, parent=None, workers: int = DEFAULT_WORKERS):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending: Set[int] = set()
+        self._generation = 0
+        self._done.connect(self._on_done)
+
+    def request(self, row: int, path: str):
+        if row in self._pending:
+            return
+        self._pending.add(row)
+        generation = self._generation
+        future = self._executor.submit(inspect_image, path, level=DEEP)
+        future.add_done_callback(
+            lambda f: None if f.cancelled() else self._done.emit(generation, row, f.result()))
+
+    def pending(self, row: int) -> bool:
+        return row in self._pending
+
+    def reset(self):
+        self._generation += 1
+        self._pending.clear()
+
+    def shutdown(self):
+        self.reset()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _on_done(self, generation: int, row: int, record: Dict[str, Any]):
+        if generation != self._generation:
+            return
+        self._pending.discard(row)
+        self.ready.emit(row, record)
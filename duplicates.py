@@ -0,0 +1,284 @@
+"""
+Поиск дубликатов среди результатов сканирования (scan_folder / ResultStore).
+
+Файлы сравниваются этапами по нарастающей стоимости; каждый этап читает только
+файлы, которые предыдущий не смог разделить:
+1. размер файла (поле size результата, иначе stat) вместе с форматом и размерами
+   изображения из inspect_image — файл не читается;
+2. хэш начала и конца файла (по PARTIAL_BYTES); файлы не больше 2 * PARTIAL_BYTES
+   при этом прочитаны целиком, и этот хэш для них окончательный;
+3. полный хэш — для файлов, совпавших на этапе 2.
+similar=True дополнительно ищет перекодированные и уменьшенные копии по dHash:
+изображение декодируется с уменьшением (Image.draft — для JPEG в масштабе до 1/8),
+хэш — 64 бита горизонтального градиента яркости; похожими считаются хэши на
+расстоянии Хэмминга не больше max_distance у изображений с близким соотношением
+сторон. Декодируются только файлы, у которых такие соседи по соотношению сторон есть.
+Члены архивов («архив!/файл», см. archives) читаются из архива — как и обычные файлы.
+"""
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from PIL import Image
+from pil_plugins import open_image
+from archives import ARCHIVE_ERRORS, is_virtual, open_member
+
+PARTIAL_BYTES = 64 * 1024
+HASH_CHUNK = 1 << 20
+HASH_WORKERS = 8
+DHASH_SIZE = 8             # 8×8 = 64 бита
+SIMILAR_DISTANCE = 6       # из 64 бит
+ASPECT_TOLERANCE = 0.02    # относительная разница соотношения сторон похожих изображений
+_CHUNK = 64                # файлов между проверками отмены и отчётами о прогрессе
+
+EXACT, SIMILAR = "exact", "similar"
+
+# Запись для поиска: (путь, формат, ширина, высота[, размер файла]) — поля результата inspect_image;
+# без размера (или с None) он берётся из stat
+Entry = Tuple[Any, ...]
+# Группа: (EXACT | SIMILAR, индексы записей по возрастанию пути)
+Group = Tuple[str, List[int]]
+
+
+def _open(path: str):
+    return open_member(path) if is_virtual(path) else open(path, "rb")
+
+
+def _file_size(path: str) -> Optional[int]:
+    try:
+        if is_virtual(path):
+            with open_member(path) as f:
+                return f.seek(0, os.SEEK_END)
+        return os.stat(path).st_size
+    except ARCHIVE_ERRORS:
+        return None
+
+
+def _entry_size(entry: Entry) -> Optional[int]:
+    size = entry[4] if len(entry) > 4 else None
+    return _file_size(entry[0]) if size is None or size < 0 else size
+
+
+def partial_hash(path: str, size: int) -> Optional[bytes]:
+    """Хэш первых и последних PARTIAL_BYTES файла (маленький файл — целиком)."""
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with _open(path) as f:
+            if size <= 2 * PARTIAL_BYTES:
+                h.update(f.read())
+            else:
+                h.update(f.read(PARTIAL_BYTES))
+                f.seek(size - PARTIAL_BYTES)
+                h.update(f.read(PARTIAL_BYTES))
+    except ARCHIVE_ERRORS:
+        return None
+    return h.digest()
+
+
+def full_hash(path: str) -> Optional[bytes]:
+    """Хэш всего содержимого файла; читается блоками HASH_CHUNK в один буфер."""
+    h = hashlib.blake2b(digest_size=32)
+    buf = bytearray(HASH_CHUNK)
+    view = memoryview(buf)
+    try:
+        with _open(path) as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                h.update(view[:n])
+    except ARCHIVE_ERRORS:
+        return None
+    return h.digest()
+
+
+def dhash(path: str) -> Optional[int]:
+    """Перцептивный хэш (dHash) изображения или None, если его не удалось декодировать."""
+    try:
+        with open_image(open_member(path) if is_virtual(path) else path) as img:
+            img.draft("L", (DHASH_SIZE * 8, DHASH_SIZE * 8))
+            small = img.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.BILINEAR, reducing_gap=2.0)
+    except Exception:
+        return None
+    px = small.tobytes()
+    bits = 0
+    for y in range(DHASH_SIZE):
+        row = y * (DHASH_SIZE + 1)
+        for x in range(row, row + DHASH_SIZE):
+            bits = bits << 1 | (px[x] > px[x + 1])
+    return bits
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class _Runner:
+    """Пул потоков для этапов с чтением файлов: отмена и прогресс между пачками."""
+    def __init__(self, max_workers: int, emitter):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.emitter = emitter
+
+    def map(self, fn, *columns) -> list:
+        total = len(columns[0])
+        out = []
+        for start in range(0, total, _CHUNK):
+            if self.emitter is not None and self.emitter.cancelled():
+                raise _Cancelled
+            out.extend(self.pool.map(fn, *(c[start:start + _CHUNK] for c in columns)))
+            if self.emitter is not None:
+                self.emitter.emit_progress(len(out), total)
+        return out
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def _split(groups: List[List[int]], key) -> List[List[int]]:
+    """Разбить каждую группу по key(индекс); индексы с ключом None и одиночки отбрасываются."""
+    out = []
+    for group in groups:
+        sub: Dict[Any, List[int]] = {}
+        for i in group:
+            k = key(i)
+            if k is not None:
+                sub.setdefault(k, []).append(i)
+        out.extend(g for g in sub.values() if len(g) > 1)
+    return out
+
+
+def _exact_groups(entries: Sequence[Entry], runner: _Runner, stats: Dict[str, int]) -> List[List[int]]:
+    paths = [e[0] for e in entries]
+    sizes = runner.map(_entry_size, entries)
+    groups = _split([range(len(entries))],
+                    lambda i: None if sizes[i] is None else (sizes[i],) + tuple(entries[i][1:4]))
+    # каждый этап — одним проходом пула по всем оставшимся кандидатам
+    todo = [i for g in groups for i in g]
+    stats["candidates"] = stats["partial"] = len(todo)
+    partial = dict(zip(todo, runner.map(partial_hash, [paths[i] for i in todo], [sizes[i] for i in todo])))
+    groups = _split(groups, partial.get)
+    # у маленьких файлов частичный хэш уже покрыл всё содержимое — группа окончательная
+    small = [g for g in groups if sizes[g[0]] <= 2 * PARTIAL_BYTES]
+    large = [g for g in groups if sizes[g[0]] > 2 * PARTIAL_BYTES]
+    todo = [i for g in large for i in g]
+    stats["full"] = len(todo)
+    full = dict(zip(todo, runner.map(full_hash, [paths[i] for i in todo])))
+    return small + _split(large, full.get)
+
+
+def _aspect(entry: Entry) -> Optional[float]:
+    w, h = entry[2], entry[3]
+    return w / h if w and h and w > 0 and h > 0 else None
+
+
+def _close_aspect(a: float, b: float) -> bool:
+    return abs(a - b) <= ASPECT_TOLERANCE * max(a, b)
+
+
+def _similar_groups(entries: Sequence[Entry], reps: List[int], max_distance: int,
+                    runner: _Runner, stats: Dict[str, int]) -> List[List[int]]:
+    """Компоненты похожих изображений среди reps (по одному представителю на группу точных копий)."""
+    # декодировать стоит только изображения, у которых есть сосед с близким соотношением сторон
+    by_aspect = sorted((a, i) for i, a in ((i, _aspect(entries[i])) for i in reps) if a is not None)
+    wanted = [i for k, (a, i) in enumerate(by_aspect)
+              if (k > 0 and _close_aspect(by_aspect[k - 1][0], a))
+              or (k + 1 < len(by_aspect) and _close_aspect(by_aspect[k + 1][0], a))]
+    stats["perceptual"] = len(wanted)
+    hashes = runner.map(dhash, [entries[i][0] for i in wanted])
+
+    parent = {i: i for i in wanted}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        if _close_aspect(_aspect(entries[i]), _aspect(entries[j])):
+            parent[find(i)] = find(j)
+
+    # одинаковые хэши сравниваются один раз; близкие ищутся по полосам хэша:
+    # при расстоянии <= d хотя бы одна из d + 1 полос совпадает целиком
+    by_hash: Dict[int, List[int]] = {}
+    for i, h in zip(wanted, hashes):
+        if h is not None:
+            by_hash.setdefault(h, []).append(i)
+    for same in by_hash.values():
+        for j in same[1:]:
+            union(same[0], j)
+    bits = DHASH_SIZE * DHASH_SIZE
+    n_bands = min(max_distance + 1, bits)
+    width = bits // n_bands
+    unique = list(by_hash)
+    for band in range(n_bands):
+        shift = band * width
+        mask = (1 << (bits - shift if band == n_bands - 1 else width)) - 1
+        buckets: Dict[int, List[int]] = {}
+        for h in unique:
+            buckets.setdefault(h >> shift & mask, []).append(h)
+        for bucket in buckets.values():
+            for a in range(len(bucket)):
+                for b in range(a + 1, len(bucket)):
+                    if (bucket[a] ^ bucket[b]).bit_count() <= max_distance:
+                        for i in by_hash[bucket[a]]:
+                            for j in by_hash[bucket[b]]:
+                                union(i, j)
+    components: Dict[int, List[int]] = {}
+    for i in wanted:
+        components.setdefault(find(i), []).append(i)
+    return [c for c in components.values() if len(c) > 1]
+
+
+def find_duplicates(entries: Sequence[Entry], similar: bool = False, max_distance: int = SIMILAR_DISTANCE,
+                    max_workers: int = HASH_WORKERS, emitter=None,
+                    stats: Optional[Dict[str, int]] = None) -> List[Group]:
+    """
+    Группы дубликатов среди entries — записей (путь, формат, ширина, высота[, размер файла]);
+    члены архивов сравниваются наравне с обычными файлами.
+    Возвращает список (EXACT | SIMILAR, индексы записей), группы и индексы в них —
+    по возрастанию пути. EXACT — побайтно одинаковые файлы; SIMILAR — компонента
+    похожих изображений (при similar=True), в неё целиком входят и точные копии её членов.
+    Файлы, которые не удалось прочитать, в группы не попадают.
+    emitter (scanner.ScanEmitter) получает on_progress(обработано, всего) по каждому этапу,
+    emitter.cancel() прерывает поиск — тогда возвращается пустой список.
+    Если передан словарь stats, в него пишется, сколько файлов дошло до каждого этапа:
+    files, candidates (совпали размер, формат и размеры), partial, full, perceptual.
+    """
+    if stats is None:
+        stats = {}
+    stats.update(files=len(entries), candidates=0, partial=0, full=0, perceptual=0)
+    runner = _Runner(max_workers, emitter)
+    try:
+        exact = _exact_groups(entries, runner, stats)
+        similar_groups = []
+        if similar:
+            members = {g[0]: g for g in exact}
+            grouped = {i for g in exact for i in g}
+            reps = [i for i in range(len(entries)) if i not in grouped] + list(members)
+            similar_groups = [sorted(i for r in c for i in members.get(r, (r,)))
+                              for c in _similar_groups(entries, reps, max_distance, runner, stats)]
+    except _Cancelled:
+        return []
+    finally:
+        runner.close()
+    merged = {i for g in similar_groups for i in g}
+    groups = [(SIMILAR, g) for g in similar_groups]
+    groups += [(EXACT, g) for g in exact if g[0] not in merged]
+    groups = [(kind, sorted(g, key=lambda i: entries[i][0])) for kind, g in groups]
+    groups.sort(key=lambda group: entries[group[1][0]][0])
+    return groups
+
+
+def find_duplicate_items(items: List[Dict[str, Any]], **kwargs) -> List[Group]:
+    """
+    find_duplicates для результатов inspect_image: каждому файлу из группы
+    добавляются поля duplicate_group (номер группы с 1) и duplicate_kind.
+    """
+    groups = find_duplicates([(item.get("path"), item.get("format"), item.get("width"), item.get("height"),
+                               item.get("size")) for item in items], **kwargs)
+    for n, (kind, rows) in enumerate(groups, 1):
+        for i in rows:
+            items[i]["duplicate_group"] = n
+            items[i]["duplicate_kind"] = kind
+    return groups
@@ -0,0 +1,534 @@
+"""
+Быстрый разбор заголовков JPEG/PNG/GIF/BMP/PCX/TIFF через struct, без PIL.Image.open.
+
+open_header(path) возвращает HeaderImage — объект с тем же подмножеством API Pillow,
+которое используют функции formats_info (format, size, mode, info, tag_v2, getexif(),
+quantization, getpalette(), n_frames) и сводкой кадров frames, либо None, если заголовок необычный или
+повреждён: тогда вызывающий код откатывается на Pillow.
+"""
+import re
+import math
+import contextlib
+import struct
+import zlib
+from typing import Dict, Any, Optional
+
+from PIL import Image, ImageMode, TiffImagePlugin
+
+from frame_walker import walk_gif, walk_tiff
+
+# Дальше этого размера заголовки не дочитываем: такие файлы разбирает Pillow
+MAX_SEGMENT = 16 * 1024 * 1024
+
+_JPEG_SOF = {0xFFC0, 0xFFC1, 0xFFC2, 0xFFC3, 0xFFC5, 0xFFC6, 0xFFC7,
+             0xFFC9, 0xFFCA, 0xFFCB, 0xFFCD, 0xFFCE, 0xFFCF}
+_JPEG_PROGRESSIVE = {0xFFC2, 0xFFC6, 0xFFCA, 0xFFCE}
+_JPEG_LAYERS = {1: "L", 3: "RGB", 4: "CMYK"}
+_XMP_ORIENTATION = re.compile(rb'tiff:Orientation(="|>)([0-9])')
+
+# (bit depth, colour type) -> mode; 16-битные серые варианты зависят от версии Pillow
+_PNG_MODES = {
+    (1, 0): "1", (2, 0): "L", (4, 0): "L", (8, 0): "L",
+    (8, 2): "RGB", (16, 2): "RGB",
+    (1, 3): "P", (2, 3): "P", (4, 3): "P", (8, 3): "P",
+    (8, 4): "LA",
+    (8, 6): "RGBA", (16, 6): "RGBA",
+}
+_PNG_FALLBACK_TEXT = {b"Raw profile type exif", b"XML:com.adobe.xmp"}
+
+_BMP_HEADER_SIZES = (12, 40, 52, 56, 64, 108, 124)
+_BMP_BIT2MODE = {1: "P", 4: "P", 8: "P", 16: "RGB", 24: "RGB", 32: "RGB"}
+
+# Размер одного значения для типов TIFF-тегов
+_TIFF_TYPE_SIZE = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+_TIFF_INT_TAGS = {256, 257, 259, 262, 266, 274, 277, 284, 296, 322, 323}
+_TIFF_TUPLE_TAGS = {258, 338, 339}
+_TIFF_RATIONAL_TAGS = {282, 283}
+_TIFF_PRESENCE_TAGS = {273, 320, 324, 700, 0xBC01}
+
+
+class HeaderImage:
+    """Результат разбора заголовка; повторяет используемую часть API PIL.Image."""
+    def __init__(self, fmt: str, size, mode: str, info: Dict[str, Any]):
+        self.format = fmt
+        self.size = size
+        self.mode = mode
+        self.info = info
+        self.n_frames = 1
+        self.frames = None  # frame_walker.walk_gif/walk_tiff, если кадры перечислялись
+        self._exif = None
+        self._palette = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def getbands(self):
+        return ImageMode.getmode(self.mode).bands
+
+    def getexif(self) -> Image.Exif:
+        if self._exif is None:
+            self._exif = Image.Exif()
+        return self._exif
+
+    def getpalette(self):
+        return list(self._palette) if self._palette is not None else None
+
+
+def _read(f, n: int) -> bytes:
+    if n < 0 or n > MAX_SEGMENT:
+        raise ValueError("segment too large")
+    data = f.read(n)
+    if len(data) != n:
+        raise EOFError("truncated header")
+    return data
+
+
+def _too_big(w: int, h: int) -> bool:
+    # Проверку decompression bomb (ошибка/предупреждение) оставляем Pillow
+    limit = Image.MAX_IMAGE_PIXELS
+    return w <= 0 or h <= 0 or (limit is not None and w * h > limit)
+
+
+def _parse_jpeg(f) -> Optional[HeaderImage]:
+    f.seek(2)
+    info = {}
+    quantization = {}
+    exif_data = None
+    size = mode = None
+    while True:
+        if f.read(1) != b"\xff":
+            return None
+        m = f.read(1)
+        while m == b"\xff":
+            m = f.read(1)
+        if not m:
+            return None
+        marker = 0xFF00 | m[0]
+        if marker == 0xFFDA:  # start of scan — дальше идут данные изображения
+            break
+        if marker < 0xFFC0 or 0xFFD0 <= marker <= 0xFFD9 or marker == 0xFFDE:
+            return None
+        n = struct.unpack(">H", _read(f, 2))[0] - 2
+        if marker in _JPEG_SOF:
+            s = _read(f, n)
+            if s[0] != 8 or s[5] not in _JPEG_LAYERS:
+                return None
+            size = struct.unpack_from(">H", s, 3)[0], struct.unpack_from(">H", s, 1)[0]
+            mode = _JPEG_LAYERS[s[5]]
+            if marker in _JPEG_PROGRESSIVE:
+                info["progressive"] = info["progression"] = 1
+        elif marker == 0xFFDB:
+            s = _read(f, n)
+            while s:
+                v = s[0]
+                precision = 1 if v // 16 == 0 else 2
+                qt_length = 1 + precision * 64
+                if len(s) < qt_length:
+                    return None
+                if precision == 1:
+                    quantization[v & 15] = list(s[1:qt_length])
+                else:
+                    quantization[v & 15] = list(struct.unpack_from(">64H", s, 1))
+                s = s[qt_length:]
+        elif marker == 0xFFE0:
+            s = _read(f, n)
+            if s.startswith(b"JFIF") and len(s) >= 12:
+                unit = s[7]
+                density = struct.unpack_from(">HH", s, 8)
+                if unit == 1:
+                    info["dpi"] = density
+                elif unit == 2:
+                    info["dpi"] = tuple(d * 2.54 for d in density)
+        elif marker == 0xFFE1:
+            s = _read(f, n)
+            if s.startswith(b"Exif\0\0"):
+                exif_data = s if exif_data is None else exif_data + s[6:]
+            elif s.startswith(b"http://ns.adobe.com/xap/1.0/\x00"):
+                info["xmp"] = s.split(b"\x00", 1)[1]
+        elif marker == 0xFFE2:
+            s = _read(f, n)
+            if s.startswith(b"MPF\x00"):  # MPO — отдельный формат в Pillow
+                return None
+        else:
+            f.seek(n, 1)
+    if size is None or _too_big(*size):
+        return None
+
+    img = HeaderImage("JPEG", size, mode, info)
+    img.quantization = quantization
+    exif = img.getexif()
+    if exif_data is not None:
+        exif.load(exif_data)
+    if 0x0112 not in exif and info.get("xmp"):
+        match = _XMP_ORIENTATION.search(info["xmp"])
+        if match:
+            exif[0x0112] = int(match[2])
+    if "dpi" not in info and exif_data is not None:
+        # то же, что JpegImageFile._read_dpi_from_exif
+        try:
+            resolution_unit = exif[0x0128]
+            x_resolution = exif[0x011A]
+            try:
+                dpi = float(x_resolution[0]) / x_resolution[1]
+            except TypeError:
+                dpi = x_resolution
+            if math.isnan(dpi):
+                raise ValueError("DPI is not a number")
+            if resolution_unit == 3:
+                dpi *= 2.54
+            info["dpi"] = dpi, dpi
+        except (struct.error, KeyError, SyntaxError, TypeError, ValueError, ZeroDivisionError):
+            info["dpi"] = 72, 72
+    return img
+
+
+def _parse_png(f) -> Optional[HeaderImage]:
+    f.seek(8)
+    info = {}
+    size = mode = None
+    exif_data = None
+    seen_idat = False
+    first = True
+    while True:
+        length, cid = struct.unpack(">I4s", _read(f, 8))
+        if first and cid != b"IHDR":
+            return None
+        first = False
+        if cid == b"IEND":
+            break
+        if cid == b"IDAT":
+            seen_idat = True
+        if cid in (b"IDAT", b"IEND") or (seen_idat and cid not in (b"eXIf", b"tEXt", b"zTXt", b"iTXt")):
+            f.seek(length + 4, 1)
+            continue
+        s = _read(f, length)
+        crc = _read(f, 4)
+        if not seen_idat and zlib.crc32(s, zlib.crc32(cid)) != struct.unpack(">I", crc)[0]:
+            return None
+        if cid == b"IHDR":
+            if length < 13 or s[11] or (s[8], s[9]) not in _PNG_MODES:
+                return None
+            size = struct.unpack_from(">II", s, 0)
+            mode = _PNG_MODES[(s[8], s[9])]
+        elif cid == b"pHYs" and not seen_idat:
+            if length < 9:
+                return None
+            px, py = struct.unpack_from(">II", s, 0)
+            if s[8] == 1:
+                info["dpi"] = px * 0.0254, py * 0.0254
+        elif cid == b"eXIf" and (not seen_idat or exif_data is None):
+            # после IDAT Pillow ищет eXIf, только если не нашёл его до IDAT
+            exif_data = b"Exif\x00\x00" + s
+        elif cid in (b"tEXt", b"zTXt", b"iTXt"):
+            if s.split(b"\0", 1)[0] in _PNG_FALLBACK_TEXT:
+                return None
+        elif cid in (b"acTL", b"fcTL", b"fdAT"):  # APNG разбирает Pillow
+            return None
+    if not seen_idat or _too_big(*size):
+        return None
+
+    img = HeaderImage("PNG", size, mode, info)
+    if exif_data is not None:
+        img.getexif().load(exif_data)
+    return img
+
+
+def _palette_needed(p: bytes) -> bool:
+    # Палитра — не тождественная шкала серого (как GifImageFile._is_palette_needed)
+    for i in range(0, len(p), 3):
+        if not (i // 3 == p[i] == p[i + 1] == p[i + 2]):
+            return True
+    return False
+
+
+def _skip_sub_blocks(f) -> bytes:
+    """Пропустить цепочку под-блоков GIF, вернуть первый под-блок."""
+    first = None
+    while True:
+        n = _read(f, 1)[0]
+        if n == 0:
+            return first or b""
+        if first is None:
+            first = _read(f, n)
+        else:
+            f.seek(n, 1)
+
+
+def _parse_gif(f, frames_needed: bool = True) -> Optional[HeaderImage]:
+    f.seek(0)
+    s = _read(f, 13)
+    width, height = struct.unpack_from("<HH", s, 6)
+    flags = s[10]
+    global_palette = None
+    if flags & 128:
+        p = _read(f, 3 << ((flags & 7) + 1))
+        if _palette_needed(p):
+            global_palette = p
+
+    frames = 0
+    frame_palette = None
+    while True:
+        b = f.read(1)
+        if not b:
+            return None  # нет завершающего ';' — файл обрезан
+        if b == b";":
+            break
+        if b == b"!":
+            label = _read(f, 1)[0]
+            block = _skip_sub_blocks(f)
+            if label == 255 and block.startswith(b"XMP Data"):
+                return None
+        elif b == b",":
+            d = _read(f, 9)
+            x0, y0, fw, fh = struct.unpack_from("<HHHH", d, 0)
+            lflags = d[8]
+            palette = None
+            if lflags & 128:
+                p = _read(f, 3 << ((lflags & 7) + 1))
+                palette = p if _palette_needed(p) else False
+            _read(f, 1)  # LZW minimum code size
+            _skip_sub_blocks(f)
+            if frames == 0:
+                width, height = max(x0 + fw, width), max(y0 + fh, height)
+                frame_palette = palette if palette is not None else global_palette
+            frames += 1
+            break  # остальные кадры перечисляет frame_walker
+        else:
+            return None
+    if frames == 0 or _too_big(width, height):
+        return None
+
+    img = HeaderImage("GIF", (width, height), "P" if frame_palette else "L", {})
+    if frames_needed:
+        walked = walk_gif(f)
+        if walked is None or walked["xmp"]:
+            return None  # обрезанный файл или XMP — как раньше, в Pillow
+        img.n_frames = walked["frames"]
+        img.frames = walked
+    if frame_palette:
+        img._palette = frame_palette
+    return img
+
+
+def _parse_bmp(f) -> Optional[HeaderImage]:
+    f.seek(14)
+    header_size = struct.unpack("<I", _read(f, 4))[0]
+    if header_size not in _BMP_HEADER_SIZES:
+        return None
+    h = _read(f, header_size - 4)
+    info = {}
+    if header_size == 12:
+        width, height, _, bits = struct.unpack_from("<HHHH", h, 0)
+        compression = 0
+        padding = 3
+        colors = 0
+    else:
+        width, height = struct.unpack_from("<II", h, 0)
+        if h[7] == 0xFF:
+            height = 2**32 - height
+        bits = struct.unpack_from("<H", h, 10)[0]
+        compression, _, ppm_x, ppm_y, colors = struct.unpack_from("<IIIII", h, 12)
+        padding = 4
+        info["dpi"] = (ppm_x / 39.3701, ppm_y / 39.3701)
+    # 0 = RAW, 1 = RLE8, 2 = RLE4; BITFIELDS и прочее отдаём Pillow
+    if compression not in (0, 1, 2) or bits not in _BMP_BIT2MODE:
+        return None
+    mode = _BMP_BIT2MODE[bits]
+    if not colors:
+        colors = 1 << bits
+    if mode == "P":
+        if not 0 < colors <= 256:
+            return None
+        palette = _read(f, padding * colors)
+        indices = (0, 255) if colors == 2 else range(colors)
+        grayscale = all(
+            palette[i * padding:i * padding + 3] == bytes((v, v, v)) for i, v in enumerate(indices)
+        )
+        if grayscale:
+            mode = "1" if colors == 2 else "L"
+    if _too_big(width, height):
+        return None
+    info["compression"] = compression
+    return HeaderImage("BMP", (width, height), mode, info)
+
+
+def _parse_pcx(f) -> Optional[HeaderImage]:
+    f.seek(0)
+    s = _read(f, 68)
+    xmin, ymin, xmax, ymax, hdpi, vdpi = struct.unpack_from("<HHHHHH", s, 4)
+    width, height = xmax + 1 - xmin, ymax + 1 - ymin
+    version, bits, planes = s[1], s[3], s[65]
+    if bits == 1 and planes == 1:
+        mode = "1"
+    elif bits == 1 and planes in (2, 4):
+        mode = "P"
+    elif version == 5 and bits == 8 and planes == 1:
+        mode = "L"
+        f.seek(-769, 2)
+        tail = f.read(769)
+        if len(tail) == 769 and tail[0] == 12:
+            for i in range(256):
+                if tail[i * 3 + 1:i * 3 + 4] != bytes((i, i, i)):
+                    mode = "P"
+                    break
+    elif version == 5 and bits == 8 and planes == 3:
+        mode = "RGB"
+    else:
+        return None
+    if _too_big(width, height):
+        return None
+    return HeaderImage("PCX", (width, height), mode, {"dpi": (hdpi, vdpi)})
+
+
+def _read_ifd(f, e: str, offset: int) -> Dict[int, Any]:
+    """Прочитать нужные теги одного IFD (значения как в tag_v2 у Pillow)."""
+    f.seek(offset)
+    (count,) = struct.unpack(e + "H", _read(f, 2))
+    entries = _read(f, 12 * count)
+    tags = {}
+    for i in range(count):
+        tag, typ, n, raw = struct.unpack_from(e + "HHL4s", entries, i * 12)
+        if tag in _TIFF_PRESENCE_TAGS:
+            tags[tag] = True
+            continue
+        if tag not in _TIFF_INT_TAGS and tag not in _TIFF_TUPLE_TAGS and tag not in _TIFF_RATIONAL_TAGS:
+            continue
+        if typ not in _TIFF_TYPE_SIZE or n == 0:
+            continue
+        size = _TIFF_TYPE_SIZE[typ] * n
+        if size > 4:
+            here = f.tell()
+            f.seek(struct.unpack(e + "L", raw)[0])
+            data = _read(f, size)
+            f.seek(here)
+        else:
+            data = raw[:size]
+        if tag in _TIFF_RATIONAL_TAGS:
+            if typ != 5:
+                raise ValueError("unexpected rational type")
+            num, den = struct.unpack_from(e + "LL", data, 0)
+            tags[tag] = TiffImagePlugin.IFDRational(num, den)
+            continue
+        if typ not in (3, 4):
+            raise ValueError("unexpected integer type")
+        values = struct.unpack(e + ("H" if typ == 3 else "L") * n, data)
+        tags[tag] = values if tag in _TIFF_TUPLE_TAGS else values[0]
+    return tags
+
+
+def _parse_tiff(f, frames_needed: bool = True) -> Optional[HeaderImage]:
+    f.seek(0)
+    head = _read(f, 8)
+    prefix = head[:2]
+    e = "<" if prefix == b"II" else ">"
+    if struct.unpack_from(e + "H", head, 2)[0] != 42:  # BigTIFF и прочее — в Pillow
+        return None
+    offset = struct.unpack_from(e + "L", head, 4)[0]
+    tags = _read_ifd(f, e, offset)
+    if 700 in tags or 0xBC01 in tags:
+        return None
+
+    code = tags.get(259, 1)
+    compression = TiffImagePlugin.COMPRESSION_INFO.get(code)
+    if compression is None or 256 not in tags or 257 not in tags:
+        return None
+    photo = 6 if compression == "tiff_jpeg" else tags.get(262, 0)
+    fillorder = tags.get(266, 1)
+    size = tags[256], tags[257]
+    if tags.get(274) in (5, 6, 7, 8):
+        size = size[1], size[0]
+
+    # Подбор режима — та же логика, что TiffImageFile._setup
+    sample_format = tags.get(339, (1,))
+    if len(sample_format) > 1 and max(sample_format) == min(sample_format):
+        sample_format = (sample_format[0],)
+    bps = tags.get(258, (1,))
+    extra = tags.get(338, ())
+    spp = tags.get(277, 3 if compression == "tiff_jpeg" and photo in (2, 6) else 1)
+    if tags.get(284, 1) == 2 and extra and max(extra) == 0:
+        bps = bps[:-len(extra)]
+        spp -= len(extra)
+        extra = ()
+    if spp > TiffImagePlugin.MAX_SAMPLESPERPIXEL:
+        return None
+    if spp < len(bps):
+        bps = bps[:spp]
+    elif spp > len(bps) and len(bps) == 1:
+        bps = bps * spp
+    if len(bps) != spp:
+        return None
+    key = (prefix, photo, sample_format, fillorder, bps, extra)
+    if key not in TiffImagePlugin.OPEN_INFO:
+        return None
+    if TiffImagePlugin.READ_LIBTIFF or compression != "raw":
+        if fillorder == 2:
+            key = key[:3] + (1,) + key[4:]
+            if key not in TiffImagePlugin.OPEN_INFO:
+                return None
+    elif 273 not in tags and (324 not in tags or 322 not in tags or 323 not in tags):
+        return None
+    mode = TiffImagePlugin.OPEN_INFO[key][0]
+    if mode in ("P", "PA") and 320 not in tags:
+        return None
+    if _too_big(*size):
+        return None
+
+    info = {"compression": compression}
+    xres = tags.get(282, 1)
+    yres = tags.get(283, 1)
+    if xres and yres:
+        resunit = tags.get(296)
+        if resunit == 2 or resunit is None:
+            info["dpi"] = (xres, yres)
+        elif resunit == 3:
+            info["dpi"] = (xres * 2.54, yres * 2.54)
+
+    img = HeaderImage("TIFF", size, mode, info)
+    img.tag_v2 = {t: tags[t] for t in (259, 282, 283, 296) if t in tags}
+    exif = img.getexif()
+    exif.bigtiff = False
+    exif.endian = e
+    exif.load_from_fp(f, offset)
+    if frames_needed:
+        img.frames = walk_tiff(f)
+        if img.frames is not None:
+            img.n_frames = img.frames["pages"]
+    return img
+
+
+def open_header(path: str, fp=None, frames: bool = True) -> Optional[HeaderImage]:
+    """
+    Разобрать заголовок файла без Pillow-декодеров.
+    Возвращает None, если формат не поддерживается быстрым путём
+    или заголовок необычный/повреждённый.
+    fp — уже открытый файл (читается с начала, не закрывается).
+    frames=False — не перечислять кадры GIF и страницы TIFF (n_frames остаётся 1,
+    файл не читается до конца); иначе их сводка — в HeaderImage.frames.
+    """
+    try:
+        if fp is not None:
+            fp.seek(0)
+        with (open(path, "rb") if fp is None else contextlib.nullcontext(fp)) as f:
+            head = f.read(16)
+            if head.startswith(b"\xff\xd8\xff"):
+                parser = _parse_jpeg
+            elif head.startswith(b"\x89PNG\r\n\x1a\n"):
+                parser = _parse_png
+            elif head[:6] in (b"GIF87a", b"GIF89a"):
+                parser = _parse_gif
+            elif head.startswith(b"BM"):
+                parser = _parse_bmp
+            elif head[:4] in (b"II*\x00", b"MM\x00*"):
+                parser = _parse_tiff
+            elif len(head) >= 2 and head[0] == 10 and head[1] in (0, 2, 3, 5):
+                parser = _parse_pcx
+            else:
+                return None
+            if parser in (_parse_gif, _parse_tiff):
+                return parser(f, frames)
+            return parser(f)
+    except Exception:
+        return None
@@ -0,0 +1,313 @@
+"""
+Режим слежения: после начального сканирования результаты следуют за изменениями папки.
+
+FolderWatcher хранит снимок файлов (путь -> размер, mtime) и узнаёт об изменениях
+через inotify (Linux, по наблюдению на каталог) или, если он недоступен, периодическим
+обходом папки. События копятся, пока не наступит пауза debounce (или не пройдёт
+max_delay с первого события — поток rsync на десятки тысяч файлов обрабатывается
+пачками), затем сверяются со снимком: созданные и изменённые файлы переинспектируются,
+удалённые отдаются списком путей.
+
+watch_folder — то же, что scanner.scan_folder, но после сканирования не завершается:
+новые результаты приходят в emitter.on_item/on_items (для уже известных путей — замена
+записи), удаления — в emitter.on_removed; emitter.cancel() прекращает слежение.
+"""
+import os
+import sys
+import stat
+import time
+import errno
+import select
+import struct
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Set
+
+from formats_info import inspect_image, LEVELS, DEEP
+from scanner import ScanEmitter, scan_folder, iter_image_files, IMAGE_EXTS
+
+WATCH_BACKENDS = ("auto", "inotify", "poll")
+DEBOUNCE = 0.5        # пауза без событий перед обработкой пачки, секунды
+MAX_DELAY = 5.0       # при непрерывном потоке событий — не реже чем раз в столько секунд
+POLL_INTERVAL = 2.0   # период обхода папки без inotify
+WATCH_WORKERS = 8
+_STEP = 0.1
+
+# inotify(7)
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE
+               | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR)
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; за ним имя len байт
+
+
+class _Inotify:
+    """inotify через ctypes: наблюдение на каждый каталог дерева, события — (путь, mask)."""
+    def __init__(self):
+        import ctypes  # только по требованию: не удлиняет старт консольного режима
+        self._ctypes = ctypes
+        libc = ctypes.CDLL(None, use_errno=True)  # символы процесса, libc в их числе
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        self._dirs: Dict[int, str] = {}
+
+    def add_tree(self, root: str):
+        """Наблюдать за root и всеми вложенными каталогами; ENOSPC (лимит наблюдений) — OSError."""
+        stack = [root]
+        while stack:
+            d = stack.pop()
+            wd = self._add_watch(self.fd, os.fsencode(d), _WATCH_MASK)
+            if wd < 0:
+                e = self._ctypes.get_errno()
+                if e in (errno.ENOSPC, errno.ENOMEM):
+                    raise OSError(e, f"inotify: {os.strerror(e)} ({d})")
+                continue  # каталог уже удалён или недоступен
+            self._dirs[wd] = d
+            try:
+                with os.scandir(d) as it:
+                    stack.extend(entry.path for entry in it if entry.is_dir(follow_symlinks=False))
+            except OSError:
+                pass
+
+    def read(self, timeout: float) -> List[Tuple[str, int]]:
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        events = []
+        i = 0
+        while i + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, i)
+            name = data[i + _EVENT.size:i + _EVENT.size + length].rstrip(b"\0")
+            i += _EVENT.size + length
+            if mask & _IN_Q_OVERFLOW:
+                events.append(("", mask))
+                continue
+            d = self._dirs.get(wd)
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if d is not None:
+                events.append((os.path.join(d, os.fsdecode(name)) if name else d, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Снимок файлов папки и источник изменений (inotify или обход раз в poll_interval).
+    start() включает наблюдение и снимает снимок — до начального сканирования, чтобы
+    изменения во время него не потерялись. backend — фактический способ ("inotify"/"poll").
+    """
+    def __init__(self, root: str, exts=IMAGE_EXTS, backend: str = "auto", debounce: float = DEBOUNCE,
+                 poll_interval: float = POLL_INTERVAL, max_delay: float = MAX_DELAY):
+        if backend not in WATCH_BACKENDS:
+            raise ValueError(f"Unknown watch backend: {backend!r}, expected one of {WATCH_BACKENDS}")
+        self.root = root  # как передан: пути событий совпадают с путями scan_folder
+        self.exts = exts
+        self.requested = backend
+        self.backend = None
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.max_delay = max_delay
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self._inotify = None
+
+    def start(self):
+        if self.requested != "poll" and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+                self._inotify.add_tree(self.root)
+            except (OSError, AttributeError) as e:
+                if self._inotify is not None:
+                    self._inotify.close()
+                    self._inotify = None
+                if self.requested == "inotify":
+                    raise OSError(f"inotify недоступен: {e}") from e
+        elif self.requested == "inotify":
+            raise OSError("inotify есть только в Linux")
+        self.backend = "poll" if self._inotify is None else "inotify"
+        self.files = self._snapshot()
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _snapshot(self, root: str = None) -> Dict[str, Tuple[int, int]]:
+        return {p: (st.st_size, st.st_mtime_ns)
+                for p, st in iter_image_files(root or self.root, self.exts, with_stat=True) if st is not None}
+
+    def wait_changes(self, stop) -> Optional[Tuple[Dict[str, os.stat_result], List[str]]]:
+        """
+        Дождаться пачки изменений: ({путь: stat} созданных/изменённых, [удалённые пути]).
+        None — stop() стал истинным.
+        """
+        while not stop():
+            if self._inotify is not None:
+                changes = self._wait_inotify(stop)
+            else:
+                changes = self._wait_poll(stop)
+            if changes is None:
+                return None
+            if changes[0] or changes[1]:
+                return changes
+        return None
+
+    def _wait_poll(self, stop):
+        deadline = time.monotonic() + self.poll_interval
+        while time.monotonic() < deadline:
+            if stop():
+                return None
+            time.sleep(min(_STEP, max(0.0, deadline - time.monotonic())))
+        return self._diff(self._snapshot(), set(self.files))
+
+    def _wait_inotify(self, stop):
+        dirty: Set[str] = set()
+        new_dirs: Set[str] = set()
+        gone_dirs: Set[str] = set()
+        rescan = False
+        first = last = None
+        while True:
+            if stop():
+                return None
+            events = self._inotify.read(_STEP)
+            now = time.monotonic()
+            for path, mask in events:
+                if mask & _IN_Q_OVERFLOW:
+                    rescan = True  # очередь ядра переполнена — события потеряны
+                elif mask & _IN_ISDIR:
+                    if mask & (_IN_CREATE | _IN_MOVED_TO):
+                        new_dirs.add(path)
+                    elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                        gone_dirs.add(path)
+                elif mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                    if path == self.root:
+                        gone_dirs.add(path)
+                elif os.path.splitext(path)[1].lower() in self.exts:
+                    dirty.add(path)
+            if events:
+                last = now
+                if first is None:
+                    first = now
+            if first is not None and (now - last >= self.debounce or now - first >= self.max_delay):
+                break
+
+        if rescan:
+            self._watch_tree(self.root)
+            return self._diff(self._snapshot(), set(self.files))
+        if gone_dirs:
+            prefixes = tuple(os.path.join(d, "") for d in gone_dirs)
+            dirty.update(p for p in self.files if p.startswith(prefixes))
+        for d in new_dirs:
+            # каталог, созданный или перемещённый внутрь: файлы в нём могли появиться до наблюдения
+            self._watch_tree(d)
+            dirty.update(p for p, _ in iter_image_files(d, self.exts))
+        current = {}
+        for p in dirty:
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                current[p] = (st.st_size, st.st_mtime_ns)
+        return self._diff(current, dirty)
+
+    def _watch_tree(self, d: str):
+        if self._inotify is None:
+            return
+        try:
+            self._inotify.add_tree(d)
+        except OSError:
+            # кончился лимит наблюдений (fs.inotify.max_user_watches) — дальше обходом
+            self.close()
+            self.backend = "poll"
+
+    def _diff(self, current: Dict[str, Tuple[int, int]], checked) -> Tuple[Dict[str, os.stat_result], List[str]]:
+        """Сверить состояние путей checked (current — те из них, что существуют) со снимком."""
+        changed = {}
+        removed = []
+        for p in checked:
+            if p not in current and self.files.pop(p, None) is not None:
+                removed.append(p)
+        for p, key in current.items():
+            if self.files.get(p) != key:
+                try:
+                    changed[p] = os.stat(p)
+                except OSError:
+                    if self.files.pop(p, None) is not None:
+                        removed.append(p)
+                    continue
+                self.files[p] = key
+        return changed, removed
+
+
+def watch_folder(path: str, emitter: ScanEmitter, max_workers: int = WATCH_WORKERS, cache=None,
+                 exts=IMAGE_EXTS, level: str = DEEP, backend: str = "auto", debounce: float = DEBOUNCE,
+                 poll_interval: float = POLL_INTERVAL, initial_scan: bool = True, **scan_kwargs):
+    """
+    Просканировать папку (scanner.scan_folder с теми же max_workers, cache, exts, level
+    и прочими scan_kwargs), затем следить за ней, пока не вызван emitter.cancel().
+    Перед слежением вызывается emitter.on_watching(backend); созданные и изменённые
+    файлы инспектируются в max_workers потоков и приходят в on_item/on_items, пути
+    удалённых — в on_removed. on_finished — после остановки слежения.
+    max_workers=0 (начальное сканирование с tuner) — изменения в WATCH_WORKERS потоков.
+    initial_scan=False — без начального сканирования (только изменения).
+    """
+    if level not in LEVELS:
+        raise ValueError(f"Unknown inspection level: {level!r}, expected one of {LEVELS}")
+    if scan_kwargs.get("shard") is not None:
+        raise ValueError("watch mode does not support shards: changes are watched for the whole tree")
+    watcher = FolderWatcher(path, exts, backend, debounce, poll_interval)
+    watcher.start()
+    pool = ThreadPoolExecutor(max_workers=max_workers or WATCH_WORKERS)
+    inspect = partial(inspect_image, level=level)
+    try:
+        if initial_scan:
+            scan_folder(path, emitter, max_workers, cache=cache, exts=exts, level=level,
+                        finish=False, **scan_kwargs)
+        if not emitter.cancelled():
+            emitter.emit_watching(watcher.backend)
+        while not emitter.cancelled():
+            changes = watcher.wait_changes(emitter.cancelled)
+            if changes is None:
+                break
+            changed, removed = changes
+            if removed:
+                if cache is not None:
+                    cache.forget(removed)
+                emitter.emit_removed(removed)
+            paths = list(changed)
+            for p, result in zip(paths, pool.map(inspect, paths)):
+                if emitter.cancelled():
+                    break
+                if cache is not None:
+                    result = cache.store(p, changed[p], result)
+                emitter.emit_item(result)
+            if cache is not None:
+                cache.commit()
+            emitter.flush()
+    finally:
+        watcher.close()
+        pool.shutdown(wait=False, cancel_futures=True)
+        emitter.emit_finished()
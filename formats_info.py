@@ -1,5 +1,14 @@
-from PIL import Image
+import os
+from PIL import Image, UnidentifiedImageError
 from typing import Tuple, Dict, Any, Optional
+from time import perf_counter_ns
+from fast_headers import open_header
+from frame_walker import walk_frames
+from scan_stats import CountingFile
+from archives import is_virtual, open_member
+from pil_plugins import open_image
+# уровни inspect_image: каждый следующий включает предыдущий
+from scan_levels import BASIC, STANDARD, DEEP, LEVELS, _LEVEL_RANK, level_covers
 
 def infer_color_depth(img: Image.Image) -> int:
     """Попытаться вывести глубину цвета в битах (total bits per pixel)."""
@@ -83,16 +92,19 @@ def get_compression_info(img: Image.Image) -> Optional[str]:
         return info.get("compression", "BMP (usually none)")
     return info.get("compression", None)
 
-def get_additional_info(img: Image.Image) -> Dict[str, Any]:
+def get_additional_info(img: Image.Image, timings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Возвращаем дополнительные полезные поля"""
     res = {}
     try:
         exif = {}
         raw_exif = {}
+        t = perf_counter_ns() if timings is not None else 0
         try:
             raw_exif = img.getexif() or {}
         except Exception:
             raw_exif = {}
+        if timings is not None:
+            timings["exif"] = perf_counter_ns() - t
         if raw_exif:
             for k, v in raw_exif.items():
                 exif[str(k)] = str(v)
@@ -108,6 +120,15 @@ def get_additional_info(img: Image.Image) -> Dict[str, Any]:
     except Exception:
         pass
 
+    # кадры GIF и страницы TIFF — обходом структуры файла, без перемотки кадров Pillow;
+    # до getpalette(), которая загружает кадр и у Pillow может закрыть файл
+    frames = None
+    try:
+        if img.format in ("GIF", "TIFF"):
+            frames = _walk_frames(img)
+    except Exception:
+        pass
+
     # GIF palette size (if palette mode)
     try:
         if img.format == "GIF":
@@ -117,30 +138,145 @@ def get_additional_info(img: Image.Image) -> Dict[str, Any]:
                     res["gif_palette_colors"] = int(len(pal) / 3)
                 else:
                     res["gif_palette_colors"] = None
-            # number of frames
-            try:
-                res["gif_frames"] = getattr(img, "n_frames", 1)
-            except Exception:
-                res["gif_frames"] = 1
     except Exception:
         pass
 
+    try:
+        if img.format == "GIF":
+            if frames is None:
+                res["gif_frames"] = getattr(img, "n_frames", 1)
+            else:
+                res["gif_frames"] = frames["frames"]
+                res["gif_frame_sizes"] = frames["frame_sizes"]
+                res["gif_delays_ms"] = frames["delays_ms"]
+                res["gif_loop"] = frames["loop"]
+                res["gif_duration_ms"] = frames["duration_ms"]
+        elif img.format == "TIFF" and frames is not None:
+            res["tiff_pages"] = frames["pages"]
+            res["tiff_page_sizes"] = frames["page_sizes"]
+    except Exception:
+        if img.format == "GIF":
+            res["gif_frames"] = 1
+
     return res
 
-def inspect_image(path: str) -> Dict[str, Any]:
-    """Основная функция: открыть файл и собрать метаданные."""
+def _walk_frames(img) -> Optional[Dict[str, Any]]:
+    """Сводка кадров: готовая от fast_headers или обходом файла, открытого Pillow."""
+    frames = getattr(img, "frames", None)
+    if frames is not None:
+        return frames
+    fp = getattr(img, "fp", None)
+    if fp is None:
+        return None
+    pos = fp.tell()
+    try:
+        return walk_frames(fp)
+    finally:
+        fp.seek(pos)
+
+def inspect_image(path: str, fast: bool = True, timings: Optional[Dict[str, Any]] = None,
+                  level: str = DEEP, fp=None) -> Dict[str, Any]:
+    """
+    Основная функция: открыть файл и собрать метаданные.
+    При fast=True сначала пробуется разбор заголовка (fast_headers), Pillow — только как запасной путь.
+    level — объём данных: "basic" (формат, размер, глубина, режим), "standard" (+ DPI и
+    сжатие), "deep" (+ additional: EXIF, таблицы квантования, палитра GIF, кадры GIF
+    с задержками и страницы TIFF — см. frame_walker);
+    уровень записывается в результат ключом "level", размер файла в байтах — ключом "size".
+    Если передан словарь timings, в него пишутся длительности этапов в нс (open, dpi,
+    compression, additional, exif, inspect), прочитанные байты (bytes) и fast — сработал
+    ли быстрый разбор; без timings измерения не выполняются.
+    fp — уже открытый файловый объект с содержимым файла (не закрывается), path тогда
+    только попадает в результат, а size не заполняется; путь члена архива
+    («архив!/файл», см. archives) без fp открывается из архива.
+    """
+    if level not in _LEVEL_RANK:
+        raise ValueError(f"Unknown inspection level: {level!r}, expected one of {LEVELS}")
+    if timings is not None:
+        return _inspect_timed(path, fast, timings, level, fp)
+    out = {"path": path, "filename": path.split("/")[-1]}
+    try:
+        if fp is None:
+            if is_virtual(path):
+                fp = open_member(path)
+                out["size"] = fp.seek(0, os.SEEK_END)
+                fp.seek(0)
+            else:
+                out["size"] = os.stat(path).st_size
+        img = open_header(path, fp, frames=level == DEEP) if fast else None
+        if img is None:
+            img = _pillow_open(path, fp)
+        with img:
+            out["format"] = img.format
+            out["width"], out["height"] = img.size
+            if level != BASIC:
+                dpi_x, dpi_y = get_dpi(img)
+                out["dpi_x"] = dpi_x
+                out["dpi_y"] = dpi_y
+            out["depth"] = infer_color_depth(img)
+            out["mode"] = img.mode
+            if level != BASIC:
+                out["compression"] = get_compression_info(img)
+            if level == DEEP:
+                out["additional"] = get_additional_info(img)
+            out["level"] = level
+    except Exception as e:
+        out["error"] = str(e)
+    return out
+
+def _pillow_open(path: str, fp) -> Image.Image:
+    if fp is None:
+        return open_image(path)
+    fp.seek(0)
+    try:
+        return open_image(fp)
+    except UnidentifiedImageError:
+        # то же сообщение, что у Image.open(path)
+        raise UnidentifiedImageError(f"cannot identify image file {path!r}") from None
+
+def _inspect_timed(path: str, fast: bool, timings: Dict[str, Any], level: str, fp=None) -> Dict[str, Any]:
+    """inspect_image с замером этапов; файл читается через CountingFile."""
     out = {"path": path, "filename": path.split("/")[-1]}
+    start = t = perf_counter_ns()
+    f = None
+    own = fp is None
     try:
-        with Image.open(path) as img:
+        if fp is None:
+            fp = open_member(path) if is_virtual(path) else open(path, "rb")
+            out["size"] = fp.seek(0, os.SEEK_END)
+            fp.seek(0)
+        f = CountingFile(fp)
+        img = open_header(path, f, frames=level == DEEP) if fast else None
+        timings["fast"] = img is not None
+        if img is None:
+            img = _pillow_open(path, f)
+        with img:
             out["format"] = img.format
             out["width"], out["height"] = img.size
-            dpi_x, dpi_y = get_dpi(img)
-            out["dpi_x"] = dpi_x
-            out["dpi_y"] = dpi_y
+            now = perf_counter_ns()
+            timings["open"], t = now - t, now
+            if level != BASIC:
+                dpi_x, dpi_y = get_dpi(img)
+                out["dpi_x"] = dpi_x
+                out["dpi_y"] = dpi_y
+                now = perf_counter_ns()
+                timings["dpi"], t = now - t, now
             out["depth"] = infer_color_depth(img)
             out["mode"] = img.mode
-            out["compression"] = get_compression_info(img)
-            out["additional"] = get_additional_info(img)
+            if level != BASIC:
+                out["compression"] = get_compression_info(img)
+                now = perf_counter_ns()
+                timings["compression"], t = now - t, now
+            if level == DEEP:
+                out["additional"] = get_additional_info(img, timings)
+                timings["additional"] = perf_counter_ns() - t
+            out["level"] = level
     except Exception as e:
         out["error"] = str(e)
+    finally:
+        if f is not None:
+            timings["bytes"] = f.bytes_read
+            if own:
+                f.close()
+        timings["inspect"] = perf_counter_ns() - start
     return out
@@ -0,0 +1,157 @@
+"""
+Перечисление кадров GIF и страниц TIFF без декодирования.
+
+walk_gif проходит блочную структуру GIF, перепрыгивая под-блоки LZW-данных;
+walk_tiff идёт по цепочке IFD, читая из каждого только ширину и высоту.
+Обе функции читают файл примерно один раз последовательно (GIF — через mmap),
+тогда как n_frames у Pillow перематывает и частично декодирует каждый кадр.
+Результат — словарь для additional (см. formats_info.get_additional_info) либо None,
+если структура повреждена.
+"""
+import mmap
+import struct
+from typing import Dict, Any, Optional
+
+# Защита от зацикленных и раздутых цепочек IFD
+MAX_TIFF_PAGES = 65536
+
+_GIF_LOOP_APPS = (b"NETSCAPE2.0", b"ANIMEXTS1.0")
+
+
+def _view(f):
+    """Содержимое файла: mmap, если у f есть дескриптор, иначе прочитанные байты."""
+    f.seek(0)
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        return f.read()
+    if getattr(f, "bytes_read", None) is not None:
+        f.bytes_read += len(data)  # scan_stats.CountingFile: mmap мимо read()
+    return data
+
+
+def walk_gif(f) -> Optional[Dict[str, Any]]:
+    """
+    Кадры GIF: число, размеры, задержки (мс), число повторов и общая длительность.
+    loop — значение из расширения NETSCAPE2.0 (0 — бесконечно), None — без него
+    (анимация проигрывается один раз); xmp — есть ли блок XMP.
+    """
+    data = _view(f)
+    try:
+        return _walk_gif(data)
+    except (IndexError, struct.error):
+        return None
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def _walk_gif(data) -> Optional[Dict[str, Any]]:
+    if data[:6] not in (b"GIF87a", b"GIF89a"):
+        return None
+    flags = data[10]
+    pos = 13
+    if flags & 128:
+        pos += 3 << ((flags & 7) + 1)
+    end = len(data)
+    sizes = []
+    delays = []
+    delay = 0
+    loop = None
+    xmp = False
+    while True:
+        if pos >= end:
+            return None  # нет завершающего ';' — файл обрезан
+        b = data[pos]
+        pos += 1
+        if b == 0x3B:  # ';'
+            break
+        if b == 0x21:  # '!' — расширение
+            label = data[pos]
+            pos += 1
+            n = data[pos]
+            if label == 0xF9 and n >= 4:  # Graphic Control Extension
+                delay = struct.unpack_from("<H", data, pos + 2)[0] * 10
+            elif label == 0xFF and n == 11 and data[pos + 1:pos + 12] in _GIF_LOOP_APPS:
+                sub = pos + 12
+                if data[sub] >= 3 and data[sub + 1] == 1:
+                    loop = struct.unpack_from("<H", data, sub + 2)[0]
+            elif label == 0xFF and n == 11 and data[pos + 1:pos + 9] == b"XMP Data":
+                xmp = True
+        elif b == 0x2C:  # ',' — дескриптор кадра
+            fw, fh = struct.unpack_from("<HH", data, pos + 4)
+            lflags = data[pos + 8]
+            pos += 9
+            if lflags & 128:
+                pos += 3 << ((lflags & 7) + 1)
+            pos += 1  # LZW minimum code size
+            sizes.append((fw, fh))
+            delays.append(delay)
+            delay = 0
+        else:
+            return None
+        # цепочка под-блоков: длина, данные, ..., 0
+        while True:
+            n = data[pos]
+            pos += n + 1
+            if n == 0:
+                break  # выход за конец файла ловится как IndexError
+    if not sizes:
+        return None
+    return {"frames": len(sizes), "frame_sizes": sizes, "delays_ms": delays,
+            "loop": loop, "duration_ms": sum(delays), "xmp": xmp}
+
+
+def walk_tiff(f) -> Optional[Dict[str, Any]]:
+    """Страницы TIFF (и BigTIFF): число и размеры по цепочке IFD."""
+    try:
+        f.seek(0)
+        head = f.read(16)
+        e = "<" if head[:2] == b"II" else ">"
+        version = struct.unpack_from(e + "H", head, 2)[0]
+        if version == 42:
+            offset = struct.unpack_from(e + "L", head, 4)[0]
+            count_fmt, entry_size, entry_fmt, next_fmt = "H", 12, "HHL4s", "L"
+        elif version == 43:
+            offset = struct.unpack_from(e + "Q", head, 8)[0]
+            count_fmt, entry_size, entry_fmt, next_fmt = "Q", 20, "HHQ8s", "Q"
+        else:
+            return None
+        count_size = struct.calcsize(count_fmt)
+        next_size = struct.calcsize(next_fmt)
+        sizes = []
+        seen = set()
+        while offset and offset not in seen and len(sizes) < MAX_TIFF_PAGES:
+            seen.add(offset)
+            f.seek(offset)
+            (count,) = struct.unpack(e + count_fmt, f.read(count_size))
+            entries = f.read(entry_size * count + next_size)
+            if len(entries) != entry_size * count + next_size:
+                return None
+            width = height = None
+            for i in range(count):
+                tag, typ, _, raw = struct.unpack_from(e + entry_fmt, entries, i * entry_size)
+                if tag in (256, 257) and typ in (3, 4):
+                    value = struct.unpack_from(e + ("H" if typ == 3 else "L"), raw)[0]
+                    if tag == 256:
+                        width = value
+                    else:
+                        height = value
+            sizes.append((width, height))
+            (offset,) = struct.unpack_from(e + next_fmt, entries, entry_size * count)
+    except (OSError, struct.error):
+        return None
+    if not sizes:
+        return None
+    return {"pages": len(sizes), "page_sizes": sizes}
+
+
+def walk_frames(f) -> Optional[Dict[str, Any]]:
+    """walk_gif или walk_tiff по сигнатуре файла; None для прочих форматов."""
+    f.seek(0)
+    head = f.read(6)
+    if head in (b"GIF87a", b"GIF89a"):
+        return walk_gif(f)
+    if head[:4] in (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+"):
+        return walk_tiff(f)
+    return None
@@ -1,21 +1,46 @@
+import os
 import sys
-import csv
+import json
+import time
+import importlib
 from pathlib import Path
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit,
     QLabel, QFileDialog, QTableView, QHeaderView, QAbstractItemView,
-    QProgressBar, QMessageBox, QFrame, QStyleFactory, QStatusBar
+    QProgressBar, QMessageBox, QFrame, QStyleFactory, QStatusBar, QComboBox, QCheckBox,
+    QToolButton, QPlainTextEdit, QSpinBox
 )
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QIcon, QPixmap, QImage
-from PySide6.QtCore import Qt, Signal, QObject, QSize, QTimer, QSortFilterProxyModel, QRegularExpression
-from scanner import ScanEmitter, scan_folder
-from PIL import Image
+from PySide6.QtGui import QIcon, QPixmap, QImage, QFontDatabase
+from PySide6.QtCore import Qt, Signal, QObject, QSize, QTimer, QEvent
+# Сканер, Pillow, миниатюры, экспорт и поиск дубликатов импортируются при первом
+# использовании (и заранее в фоне после первой отрисовки окна, PREWARM_MODULES),
+# чтобы не задерживать появление окна
+from results_model import ResultsModel, DUPLICATES_COLUMN
+from result_filter import build_spec, FilterError
+from scan_stats import format_stats
+from scan_summary import format_summary
+from scan_levels import level_covers, BASIC, STANDARD, DEEP
+from time import perf_counter_ns
 import threading
 
+PREFETCH_ROWS = 3
+PREWARM_MODULES = ("scanner", "scan_cache", "thumbnail_service", "deep_metadata", "result_writers")
+# Файл, в который записываются отметки времени старта (benchmarks.gui_startup); окно закрывается после первой отрисовки
+STARTUP_PROBE_ENV = "IMAGE_INSPECTOR_STARTUP_PROBE"
+SUMMARY_REFRESH_MS = 500
+META_VALUE_CHARS = 200  # длиннее — обрезаются в блоке метаданных
+
 class SignalForwarder(QObject):
-    item_signal = Signal(dict)
+    # записи и пути — object: при преобразовании в QString пропали бы суррогаты
+    # (имена файлов не из UTF-8), и путь в таблице не совпал бы с файлом
+    items_signal = Signal(object)
     progress_signal = Signal(int, int)
     finished_signal = Signal()
+    error_signal = Signal(str)
+    scan_error_signal = Signal(str)
+    stats_signal = Signal(dict)
+    watching_signal = Signal(str)
+    removed_signal = Signal(object)
 
     def __init__(self):
         super().__init__()
@@ -31,6 +56,24 @@ class MainWindow(QWidget):
 
         self.scanner_emitter = None
         self.scan_thread = None
+        self.scan_cache = None
+        self.cache_error = None  # кэш сканирования не открылся — сообщается в строке состояния
+        self.preview_path = None
+        self.scanning = False
+        self.export_emitter = None
+        self.export_error = None
+        self.live_writer = None
+        self.live_error = None
+        self.live_watching = False  # начальное сканирование закончено: в файл пишутся изменения
+        self.stats_enabled = False
+        self.scan_tuner = None
+        self.watching = False
+        self.loading = None  # файл результатов, который загружается вместо сканирования
+        self.dup_emitter = None
+        self.dup_error = None
+        self.dup_stats = None
+        self.gui_ns = 0
+        self.gui_calls = 0
 
     def _setup_style(self):
         QApplication.setStyle(QStyleFactory.create("Fusion"))
@@ -54,6 +97,30 @@ class MainWindow(QWidget):
         btn_browse.clicked.connect(self._browse_folder)
         top.addWidget(btn_browse)
 
+        self.engine_combo = QComboBox()
+        self.engine_combo.addItem("Потоки", "thread")
+        self.engine_combo.addItem("Процессы", "process")
+        self.engine_combo.setToolTip("Движок сканирования: потоки или пул процессов (обход GIL)")
+        top.addWidget(self.engine_combo)
+
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(0, 256)
+        self.workers_spin.setSpecialValueText("Авто")
+        self.workers_spin.setPrefix("Worker-ов: ")
+        self.workers_spin.setToolTip("Число worker-ов; «Авто» — подбирается по скорости во время сканирования")
+        top.addWidget(self.workers_spin)
+
+        self.level_combo = QComboBox()
+        self.level_combo.addItem("Базовый", BASIC)
+        self.level_combo.addItem("Стандартный", STANDARD)
+        self.level_combo.addItem("Полный", DEEP)
+        self.level_combo.setCurrentIndex(1)
+        self.level_combo.setToolTip("Уровень сканирования: базовый — формат, размер, глубина; "
+                                    "стандартный — + DPI и сжатие; полный — + EXIF, квантование, кадры.\n"
+                                    "Недостающие данные дочитываются в фоне при выборе строки "
+                                    "и при экспорте с полными метаданными")
+        top.addWidget(self.level_combo)
+
         self.btn_start = QPushButton("Запустить сканирование")
         top.addWidget(self.btn_start)
 
@@ -61,10 +128,39 @@ class MainWindow(QWidget):
         self.btn_cancel.setEnabled(False)
         top.addWidget(self.btn_cancel)
 
-        self.btn_export = QPushButton("Экспорт CSV")
+        self.btn_export = QPushButton("Экспорт...")
         self.btn_export.setEnabled(False)
         top.addWidget(self.btn_export)
 
+        self.btn_load = QPushButton("Открыть...")
+        self.btn_load.setToolTip("Загрузить в таблицу файл результатов (JSONL, .jsonl.gz, SQLite) без сканирования — "
+                                 "например, слитые выходы шардов (python -m result_merge)")
+        top.addWidget(self.btn_load)
+
+        # флажки сканирования и экспорта — отдельной строкой, чтобы не сжимать поле папки
+        options = QHBoxLayout()
+        root.addLayout(options)
+
+        self.live_export = QCheckBox("Писать в файл при сканировании")
+        self.live_export.setToolTip("Результаты дописываются в файл по мере сканирования")
+        options.addWidget(self.live_export)
+
+        self.export_deep = QCheckBox("Экспорт с полными метаданными")
+        self.export_deep.setToolTip("Перед экспортом дочитать EXIF, квантование и кадры для строк, просканированных "
+                                    "на базовом или стандартном уровне (каждый такой файл открывается заново)")
+        options.addWidget(self.export_deep)
+
+        self.archives_check = QCheckBox("Архивы")
+        self.archives_check.setToolTip("Сканировать изображения внутри ZIP/TAR-архивов без распаковки "
+                                       "(пути вида bundle.zip!/a/b.jpg)")
+        options.addWidget(self.archives_check)
+
+        self.watch_check = QCheckBox("Следить за изменениями")
+        self.watch_check.setToolTip("После сканирования таблица обновляется при создании, изменении "
+                                    "и удалении файлов в папке; «Отмена» прекращает слежение")
+        options.addWidget(self.watch_check)
+        options.addStretch(1)
+
         middle = QHBoxLayout()
         root.addLayout(middle, 1)
 
@@ -75,31 +171,47 @@ class MainWindow(QWidget):
         # Filter
         filter_layout = QHBoxLayout()
         self.filter_format = QLineEdit()
-        self.filter_format.setPlaceholderText("Фильтр: формат (jpg, png...)")
+        self.filter_format.setPlaceholderText("Формат (jpg, png...)")
         self.filter_depth = QLineEdit()
-        self.filter_depth.setPlaceholderText("Фильтр: глубина (бит)")
+        self.filter_depth.setPlaceholderText("Глубина (8, 16-32, >=24)")
+        self.filter_width = QLineEdit()
+        self.filter_width.setPlaceholderText("Ширина (>=1920)")
+        self.filter_height = QLineEdit()
+        self.filter_height.setPlaceholderText("Высота (<1000)")
+        self.filter_dpi = QLineEdit()
+        self.filter_dpi.setPlaceholderText("DPI (72, 300-600)")
         self.filter_error = QLineEdit()
-        self.filter_error.setPlaceholderText("Фильтр: ошибка")
-
-        filter_layout.addWidget(self.filter_format)
-        filter_layout.addWidget(self.filter_depth)
-        filter_layout.addWidget(self.filter_error)
+        self.filter_error.setPlaceholderText("Ошибка (* есть, - нет, текст)")
+        self.filter_edits = [self.filter_format, self.filter_depth, self.filter_width,
+                             self.filter_height, self.filter_dpi, self.filter_error]
+
+        for edit in self.filter_edits:
+            filter_layout.addWidget(edit)
+
+        self.dup_only = QCheckBox("Только дубликаты")
+        self.dup_only.setToolTip("Показать файлы из найденных групп дубликатов, группа за группой")
+        filter_layout.addWidget(self.dup_only)
+        self.dup_similar = QCheckBox("и похожие")
+        self.dup_similar.setToolTip("Искать также перекодированные и уменьшенные копии (перцептивный хэш); "
+                                    "изображения при этом декодируются")
+        filter_layout.addWidget(self.dup_similar)
+        self.btn_duplicates = QPushButton("Найти дубликаты")
+        self.btn_duplicates.setToolTip("Сравнение по размеру файла, формату и размерам изображения, "
+                                       "затем по хэшу начала и конца файла; целиком читаются только совпавшие")
+        self.btn_duplicates.setEnabled(False)
+        filter_layout.addWidget(self.btn_duplicates)
         root.addLayout(filter_layout)
 
         # Tabel
         self.table = QTableView()
-        self.model = QStandardItemModel(0, 8)
-        headers = ["Имя файла", "Формат", "Размер (px)", "DPI", "Глубина (bit)", "Сжатие", "Ошибка", "Дополнительно"]
-        self.model.setHorizontalHeaderLabels(headers)
-
-        # Proxy filter
-        self.proxy = QSortFilterProxyModel(self)
-        self.proxy.setSourceModel(self.model)
-        self.proxy.setFilterKeyColumn(-1)
-        self.table.setModel(self.proxy)
+        self.model = ResultsModel(self)
+        self.table.setModel(self.model)
 
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # сортирует сама модель (по колонкам хранилища)
+        self.table.horizontalHeader().setSortIndicatorShown(True)
+        self.table.horizontalHeader().sortIndicatorChanged.connect(self.model.sort)
         middle.addWidget(self.table, 3)
 
         # Preview & info
@@ -120,6 +232,43 @@ class MainWindow(QWidget):
         self.meta_label.setWordWrap(True)
         right.addWidget(self.meta_label)
 
+        # Статистика сканирования (сворачиваемая панель)
+        stats_bar = QHBoxLayout()
+        root.addLayout(stats_bar)
+        self.btn_stats = QToolButton()
+        self.btn_stats.setText("▸ Статистика")
+        self.btn_stats.setCheckable(True)
+        self.btn_stats.setToolButtonStyle(Qt.ToolButtonTextOnly)
+        self.btn_stats.setToolTip("Время по этапам, форматы и самые медленные файлы; "
+                                  "собирается, если панель открыта при запуске сканирования")
+        stats_bar.addWidget(self.btn_stats)
+        self.profile_check = QCheckBox("Профилировать (cProfile)")
+        self.profile_check.setToolTip("Сохранить профиль сканирования в .pstats-файл")
+        stats_bar.addWidget(self.profile_check)
+        self.btn_summary = QToolButton()
+        self.btn_summary.setText("▸ Сводка")
+        self.btn_summary.setCheckable(True)
+        self.btn_summary.setToolButtonStyle(Qt.ToolButtonTextOnly)
+        self.btn_summary.setToolTip("Форматы, объём, глубина, DPI, крупнейшие изображения и каталоги с ошибками "
+                                    "по строкам под текущим фильтром")
+        stats_bar.addWidget(self.btn_summary)
+        stats_bar.addStretch(1)
+
+        self.stats_view = QPlainTextEdit()
+        self.stats_view.setReadOnly(True)
+        self.stats_view.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.stats_view.setMaximumHeight(180)
+        self.stats_view.setPlaceholderText("Статистика появится при следующем сканировании")
+        self.stats_view.setVisible(False)
+        root.addWidget(self.stats_view)
+
+        self.summary_view = QPlainTextEdit()
+        self.summary_view.setReadOnly(True)
+        self.summary_view.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.summary_view.setMaximumHeight(180)
+        self.summary_view.setVisible(False)
+        root.addWidget(self.summary_view)
+
         # Progress + status
         bottom = QHBoxLayout()
         root.addLayout(bottom)
@@ -132,17 +281,52 @@ class MainWindow(QWidget):
         self.table.selectionModel().selectionChanged.connect(self._on_row_selected)
         self.btn_start.clicked.connect(self._start_scan)
         self.btn_cancel.clicked.connect(self._cancel_scan)
-        self.btn_export.clicked.connect(self._export_csv)
+        self.btn_export.clicked.connect(self._export_clicked)
+        self.btn_load.clicked.connect(self._load_clicked)
+        self.btn_stats.toggled.connect(self._toggle_stats)
+        self.btn_summary.toggled.connect(self._toggle_summary)
+        self.btn_duplicates.clicked.connect(self._duplicates_clicked)
+        self.dup_only.toggled.connect(lambda checked: self._apply_filter())
 
     def _connect_signals(self):
         self.forwarder = SignalForwarder()
-        self.forwarder.item_signal.connect(self._on_item_received)
+        self.forwarder.items_signal.connect(self._on_items_received)
         self.forwarder.progress_signal.connect(self._on_progress)
         self.forwarder.finished_signal.connect(self._on_finished)
-
-        self.filter_format.textChanged.connect(lambda text: self._apply_filter())
-        self.filter_depth.textChanged.connect(lambda text: self._apply_filter())
-        self.filter_error.textChanged.connect(lambda text: self._apply_filter())
+        self.forwarder.stats_signal.connect(self._on_stats)
+        self.forwarder.watching_signal.connect(self._on_watching)
+        self.forwarder.removed_signal.connect(self._on_removed)
+        self.forwarder.error_signal.connect(self._on_load_error)
+        self.forwarder.scan_error_signal.connect(self._on_scan_error)
+
+        self.export_forwarder = SignalForwarder()
+        self.export_forwarder.progress_signal.connect(self._on_export_progress)
+        self.export_forwarder.finished_signal.connect(self._on_export_finished)
+        self.export_forwarder.error_signal.connect(self._on_export_error)
+
+        self.export_forwarder.items_signal.connect(self._on_deep_items)
+
+        self.dup_forwarder = SignalForwarder()
+        self.dup_forwarder.progress_signal.connect(self._on_duplicates_progress)
+        self.dup_forwarder.items_signal.connect(self._on_duplicates_found)
+        self.dup_forwarder.error_signal.connect(self._on_duplicates_error)
+
+        # сервисы миниатюр и deep-метаданных создаются при первом выборе строки
+        self.deep = None
+        self.thumbs = None
+
+        # фильтр применяется после паузы в наборе, а не на каждое нажатие
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(self._apply_filter)
+        for edit in self.filter_edits:
+            edit.textChanged.connect(lambda text: self.filter_timer.start())
+
+        # сводка пополняется вместе с моделью; панель перерисовывается по таймеру, пока открыта
+        self.summary_timer = QTimer(self)
+        self.summary_timer.setInterval(SUMMARY_REFRESH_MS)
+        self.summary_timer.timeout.connect(self._refresh_summary)
 
     def _browse_folder(self):
         d = QFileDialog.getExistingDirectory(self, "Выберите папку для сканирования")
@@ -150,6 +334,11 @@ class MainWindow(QWidget):
             self.folder_edit.setText(d)
 
     def _start_scan(self):
+        from scanner import ScanEmitter, scan_folder
+        from scan_cache import ScanCache
+        from result_writers import open_writer, writer_format
+        from autotune import default_tuner
+        from folder_watch import watch_folder
         folder = self.folder_edit.text().strip()
         if not folder:
             QMessageBox.warning(self, "Папка не выбрана", "Выберите папку с изображениями.")
@@ -159,26 +348,172 @@ class MainWindow(QWidget):
             QMessageBox.warning(self, "Некорректная папка", "Указанная папка не существует.")
             return
 
+        # непрерывный экспорт: файл выбирается до запуска, пачки пишутся в потоке сканирования
+        live_writer = None
+        if self.live_export.isChecked():
+            fn = self._ask_export_path("Файл для записи во время сканирования")
+            if not fn:
+                return
+            if self.watch_check.isChecked() and writer_format(fn) == "csv":
+                QMessageBox.warning(self, "Формат не подходит",
+                                    "CSV не поддерживает удаление записей — при слежении выберите JSONL или SQLite.")
+                return
+            try:
+                live_writer = open_writer(fn, writer_format(fn))
+            except Exception as e:
+                QMessageBox.critical(self, "Ошибка", f"Не удалось открыть файл:\n{e}")
+                return
+        profile_path = None
+        if self.profile_check.isChecked():
+            profile_path, _ = QFileDialog.getSaveFileName(self, "Файл профиля", "scan.pstats",
+                                                          "pstats (*.pstats);;Все файлы (*)")
+            if not profile_path:
+                if live_writer is not None:
+                    live_writer.close()
+                return
+        self.live_writer = live_writer
+        self.live_error = None
+        self.live_watching = False
+
         # clear model
-        self.model.removeRows(0, self.model.rowCount())
+        self.model.clear()
+        if self.deep is not None:
+            self.deep.reset()
         self.progress.setValue(0)
+        self.scanning = True
+        self.watching = False
         self.btn_start.setEnabled(False)
         self.btn_cancel.setEnabled(True)
         self.btn_export.setEnabled(False)
+        self.btn_load.setEnabled(False)
+        self.btn_duplicates.setEnabled(False)
         self.status.showMessage("Запуск сканирования...")
 
         # setup emitter and forward callbacks to Qt signals
         emitter = ScanEmitter()
         self.scanner_emitter = emitter
-        emitter.on_item = lambda item: self.forwarder.item_signal.emit(item)
+        emitter.on_items = self._live_items if live_writer else (lambda items: self.forwarder.items_signal.emit(items))
         emitter.on_progress = lambda a, b: self.forwarder.progress_signal.emit(a, b)
         emitter.on_finished = lambda: self.forwarder.finished_signal.emit()
+        if live_writer:
+            emitter.on_watching = self._live_watching
+            emitter.on_removed = self._live_removed
+        else:
+            emitter.on_watching = lambda backend: self.forwarder.watching_signal.emit(backend)
+            emitter.on_removed = lambda paths: self.forwarder.removed_signal.emit(paths)
+        # замеры этапов включаются, только если панель статистики открыта
+        self.stats_enabled = self.btn_stats.isChecked()
+        self.gui_ns = self.gui_calls = 0
+        if self.stats_enabled:
+            self.stats_view.clear()
+            emitter.on_stats = lambda snap: self.forwarder.stats_signal.emit(snap)
+
+        self.cache_error = None
+        if self.scan_cache is None:
+            try:
+                self.scan_cache = ScanCache()
+            except Exception as e:
+                self.cache_error = str(e)
+
+        engine = self.engine_combo.currentData()
+        workers = self.workers_spin.value()
+        self.scan_tuner = default_tuner(engine) if workers == 0 else None
 
         # run scan in a thread to avoid blocking GUI
-        thread = threading.Thread(target=scan_folder, args=(folder, emitter, 8), daemon=True)
+        target = watch_folder if self.watch_check.isChecked() else scan_folder
+        kwargs = {"cache": self.scan_cache,
+                  "engine": engine,
+                  "profile_path": profile_path,
+                  "tuner": self.scan_tuner,
+                  "level": self.level_combo.currentData(),
+                  "archives": self.archives_check.isChecked()}
+
+        def run():
+            try:
+                target(folder, emitter, workers or 8, **kwargs)
+            except Exception as e:
+                # on_finished уже вызван из scan_folder / watch_folder
+                self.forwarder.scan_error_signal.emit(str(e))
+
+        thread = threading.Thread(target=run, daemon=True)
         self.scan_thread = thread
         thread.start()
 
+    def _load_clicked(self):
+        from scanner import ScanEmitter
+        from result_merge import load_results
+        if self.export_emitter is not None or self.dup_emitter is not None:
+            QMessageBox.information(self, "Подождите", "Дождитесь окончания экспорта или поиска дубликатов.")
+            return
+        fn, _ = QFileDialog.getOpenFileName(
+            self, "Открыть результаты", filter="Результаты (*.jsonl *.jsonl.gz *.gz *.sqlite *.sqlite3 *.db);;"
+                                               "Все файлы (*)")
+        if not fn:
+            return
+
+        self.model.clear()
+        if self.deep is not None:
+            self.deep.reset()
+        self.progress.setRange(0, 0)  # число записей в файле заранее неизвестно
+        self.scanning = True
+        self.watching = False
+        self.loading = fn
+        self.scan_tuner = None
+        self.cache_error = None
+        self.stats_enabled = False
+        self.btn_start.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.btn_export.setEnabled(False)
+        self.btn_load.setEnabled(False)
+        self.btn_duplicates.setEnabled(False)
+        self.status.showMessage(f"Загрузка {Path(fn).name}...")
+
+        emitter = ScanEmitter()
+        self.scanner_emitter = emitter
+        emitter.on_items = lambda items: self.forwarder.items_signal.emit(items)
+        emitter.on_progress = lambda a, b: self.forwarder.progress_signal.emit(a, b)
+        emitter.on_finished = lambda: self.forwarder.finished_signal.emit()
+        emitter.on_removed = lambda paths: self.forwarder.removed_signal.emit(paths)
+
+        def run():
+            try:
+                load_results(fn, emitter)
+            except Exception as e:
+                # on_finished уже вызван из load_results
+                self.forwarder.error_signal.emit(str(e))
+
+        self.scan_thread = threading.Thread(target=run, daemon=True)
+        self.scan_thread.start()
+
+    def _on_load_error(self, error: str):
+        QMessageBox.critical(self, "Ошибка", f"Не удалось прочитать файл результатов:\n{error}")
+        self.status.showMessage("Загрузка не выполнена.")
+
+    def _on_scan_error(self, error: str):
+        QMessageBox.critical(self, "Ошибка", f"Сканирование прервано:\n{error}")
+        self.status.showMessage(f"Сканирование прервано: {error}")
+
+    def _live_write(self, method, arg):
+        # вызывается в потоке сканирования — все записи в файл идут из него
+        if self.live_error is None:
+            try:
+                method(arg)
+            except Exception as e:
+                self.live_error = str(e)
+
+    def _live_items(self, items):
+        # после начального сканирования приходят изменения уже записанных файлов
+        self._live_write(self.live_writer.update if self.live_watching else self.live_writer.write, items)
+        self.forwarder.items_signal.emit(items)
+
+    def _live_watching(self, backend):
+        self.live_watching = True
+        self.forwarder.watching_signal.emit(backend)
+
+    def _live_removed(self, paths):
+        self._live_write(self.live_writer.remove, paths)
+        self.forwarder.removed_signal.emit(paths)
+
     def _cancel_scan(self):
         if self.scanner_emitter:
             self.scanner_emitter.cancel()
@@ -186,104 +521,173 @@ class MainWindow(QWidget):
             self.btn_cancel.setEnabled(False)
 
     def _apply_filter(self):
-        fmt = self.filter_format.text().strip()
-        depth = self.filter_depth.text().strip()
-        err = self.filter_error.text().strip()
-
-        regex_parts = []
-        if fmt:
-            regex_parts.append(f"(?=.*{fmt})")
-        if depth:
-            regex_parts.append(f"(?=.*{depth})")
-        if err:
-            regex_parts.append(f"(?=.*{err})")
-
-        if regex_parts:
-            regex = "".join(regex_parts)
-            self.proxy.setFilterRegularExpression(QRegularExpression(regex, QRegularExpression.CaseInsensitiveOption))
+        try:
+            spec = build_spec(*(edit.text() for edit in self.filter_edits), duplicates=self.dup_only.isChecked())
+        except FilterError as e:
+            self.status.showMessage(f"Некорректный фильтр: {e}")
+            return
+        self.model.set_filter(spec)
+        self._refresh_summary()
+        if not spec.is_empty():
+            self.status.showMessage(f"Показано {self.model.rowCount()} из {len(self.model.store) - len(self.model.store.removed)}")
+
+    def _on_items_received(self, items: list):
+        if self.watching or self.loading:
+            # в загружаемом файле путь может повторяться (запись слежения) — актуальна последняя запись
+            added, updated = self.model.upsert_items(items)
+            if self.watching:
+                self.status.showMessage(f"Слежение: добавлено {added}, обновлено {updated}")
+        elif self.stats_enabled:
+            t = perf_counter_ns()
+            self.model.append_items(items)
+            self.gui_ns += perf_counter_ns() - t
+            self.gui_calls += 1
         else:
-            self.proxy.setFilterRegularExpression(QRegularExpression())
-
-    def _on_item_received(self, item: dict):
-        row = []
-        fname = item.get("filename", item.get("path", ""))
-        row.append(QStandardItem(fname))
-        row.append(QStandardItem(safe_str(item.get("format"))))
-
-        w, h = item.get("width"), item.get("height")
-        size_text = f"{safe_str(w)}×{safe_str(h)}" if w and h else ""
-        row.append(QStandardItem(size_text))
-
-        dx, dy = item.get("dpi_x"), item.get("dpi_y")
-        dpi_text = f"{safe_float(dx)}×{safe_float(dy)}" if dx and dy else ""
-        row.append(QStandardItem(dpi_text))
-
-        row.append(QStandardItem(safe_str(item.get("depth"))))
-        row.append(QStandardItem(safe_str(item.get("compression"))))
-        row.append(QStandardItem(item.get("error", "")))
-        # additional summary
-        add = item.get("additional", {})
-        add_summary = ", ".join(f"{k}:{v}" for k, v in list(add.items())[:3]) if add else ""
-        row.append(QStandardItem(add_summary))
-
-        self.model.appendRow(row)
-        index = (self.model.rowCount() - 1, 0)
-        self.model.item(index[0], 0).setData(item, Qt.UserRole + 1)
+            self.model.append_items(items)
         self.btn_export.setEnabled(True)
 
-    def _on_progress(self, processed: int, total: int):
-        if total:
-            val = int(processed * 100 / total)
+    def _on_watching(self, backend: str):
+        # начальное сканирование закончено, дальше приходят только изменения
+        self.watching = True
+        self.progress.setValue(100)
+        self.btn_duplicates.setEnabled(self.dup_emitter is None)
+        msg = f"Сканирование завершено, слежение за изменениями ({backend})."
+        if self.scan_tuner is not None:
+            msg += f" {self.scan_tuner.summary().capitalize()}."
+        if self.cache_error:
+            msg += f" Кэш сканирования недоступен: {self.cache_error}"
+        self.status.showMessage(msg)
+
+    def _on_removed(self, paths: list):
+        removed = self.model.remove_paths(paths)
+        if self.watching:
+            self.status.showMessage(f"Слежение: удалено {removed}")
+
+    def _toggle_stats(self, checked: bool):
+        self.btn_stats.setText(("▾" if checked else "▸") + " Статистика")
+        self.stats_view.setVisible(checked)
+
+    def _toggle_summary(self, checked: bool):
+        self.btn_summary.setText(("▾" if checked else "▸") + " Сводка")
+        self.summary_view.setVisible(checked)
+        if checked:
+            self._refresh_summary()
+            self.summary_timer.start()
+        else:
+            self.summary_timer.stop()
+
+    def _refresh_summary(self):
+        if not self.summary_view.isVisible():
+            return
+        text = format_summary(self.model.summary().snapshot())
+        if text != self.summary_view.toPlainText():
+            self.summary_view.setPlainText(text)
+
+    def _on_stats(self, snap: dict):
+        # время приёма пачек таблицей меряется здесь, в GUI-потоке
+        if self.gui_calls:
+            snap["stages"]["gui"] = {"ms": self.gui_ns / 1e6, "calls": self.gui_calls}
+        self.stats_view.setPlainText(format_stats(snap))
+
+    def _on_progress(self, processed: int, discovered: int):
+        # discovered растёт, пока идёт обход папки
+        if self.loading:
+            self.status.showMessage(f"Загрузка {Path(self.loading).name}: прочитано {processed}")
+        elif discovered:
+            val = int(processed * 100 / discovered)
             self.progress.setValue(val)
-            self.status.showMessage(f"Обработано {processed}/{total}")
+            msg = f"Обработано {processed}, найдено {discovered}"
+            if self.scan_tuner is not None:
+                msg += f", worker-ов: {self.scan_tuner.level}"
+            self.status.showMessage(msg)
         else:
             self.progress.setValue(0)
 
     def _on_finished(self):
-        self.status.showMessage("Сканирование завершено.")
-        self.btn_start.setEnabled(True)
+        msg = "Сканирование завершено."
+        if self.watching:
+            msg = "Слежение остановлено."
+        elif self.loading:
+            msg = f"Загружено из {Path(self.loading).name}: {len(self.model.store) - len(self.model.store.removed)}."
+            self.progress.setRange(0, 100)
+            self.progress.setValue(100)
+            self.loading = None
+        elif self.scan_tuner is not None:
+            msg += f" {self.scan_tuner.summary().capitalize()}."
+        if self.cache_error and not self.watching:
+            msg += f" Кэш сканирования недоступен: {self.cache_error}"
+        if self.live_writer is not None:
+            try:
+                self.live_writer.close()
+            except Exception as e:
+                self.live_error = self.live_error or str(e)
+            if self.live_error:
+                msg += f" Ошибка записи в файл: {self.live_error}"
+            else:
+                msg += f" В файл записано: {self.live_writer.count}."
+            self.live_writer = None
+        self.status.showMessage(msg)
+        self.scanning = False
+        self.watching = False
+        self.btn_start.setEnabled(self.export_emitter is None and self.dup_emitter is None)
+        self.btn_duplicates.setEnabled(True)
+        self.btn_load.setEnabled(True)
         self.btn_cancel.setEnabled(False)
+        self._refresh_summary()
 
     def _on_row_selected(self, selected, deselected):
         indexes = self.table.selectionModel().selectedRows()
         if not indexes:
-            self.preview_label.setText("Нет предпросмотра")
-            self.preview_label.setPixmap(QPixmap())
+            self.preview_path = None
+            if self.thumbs is not None:
+                self.thumbs.cancel()
+            self._show_preview(None)
             self.meta_label.setText("Нет выбранного файла")
             return
 
-        idx = indexes[0].row()
-        src_idx = self.proxy.mapToSource(self.proxy.index(idx, 0))
-        item = self.model.item(src_idx.row(), 0).data(Qt.UserRole + 1)
+        row = indexes[0].row()
+        item = self.model.item_at(row)
         if not item:
             return
 
+        # миниатюра строится в фоне; заодно — для соседних строк
         path = item.get("path")
-        pix = None  
-        try:
-            with Image.open(path) as im:
-                im.thumbnail((300, 220))
-                im_rgba = im.convert("RGBA")
-                data = im_rgba.tobytes("raw", "RGBA")
-                qimg = QImage(data, im_rgba.width, im_rgba.height, QImage.Format_RGBA8888)
-                pix = QPixmap.fromImage(qimg)
-        except Exception as e:
-            print("Ошибка предпросмотра:", e)
-
-        if pix and not pix.isNull():
-            pix = pix.scaled(
-                self.preview_label.width(),
-                self.preview_label.height(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-            self.preview_label.setPixmap(pix)
-            self.preview_label.setText("")
-        else:
-            self.preview_label.setText("Нет предпросмотра")
-            self.preview_label.setPixmap(QPixmap())
-
-        # metadata
+        self.preview_path = path
+        last = self.model.rowCount() - 1
+        neighbours = [self.model.store.path(self.model.store_row(r))
+                      for d in range(1, PREFETCH_ROWS + 1) for r in (row + d, row - d) if 0 <= r <= last]
+        # «Загрузка...» — до запроса: failed/ready придут позже и заменят её
+        self.preview_label.setPixmap(QPixmap())
+        self.preview_label.setText("Загрузка...")
+        cached = self._thumbnail_service().request(path, neighbours)
+        if cached is not None:
+            self._show_preview(cached)
+
+        # deep-метаданные строк, просканированных на уровне ниже полного, дочитываются в фоне
+        store_row = self.model.store_row(row)
+        loading = not item.get("error") and not level_covers(item.get("level"), DEEP)
+        self._show_metadata(item, loading)
+        if loading:
+            self._deep_service().request(store_row, path)
+
+    def _thumbnail_service(self):
+        if self.thumbs is None:
+            from thumbnail_service import ThumbnailService
+            self.thumbs = ThumbnailService(self, size=(300, 220))
+            self.thumbs.ready.connect(self._on_thumbnail_ready)
+            self.thumbs.failed.connect(self._on_thumbnail_failed)
+            if self.thumbs.disk_error:
+                self.status.showMessage(f"Кэш миниатюр на диске недоступен: {self.thumbs.disk_error}")
+        return self.thumbs
+
+    def _deep_service(self):
+        if self.deep is None:
+            from deep_metadata import DeepMetadataService
+            self.deep = DeepMetadataService(self)
+            self.deep.ready.connect(self._on_deep_ready)
+        return self.deep
+
+    def _show_metadata(self, item: dict, loading: bool = False):
         lines = [f"Файл: {item.get('filename')}", f"Формат: {item.get('format')}"]
         w, h = item.get("width"), item.get("height")
         if w and h:
@@ -299,52 +703,258 @@ class MainWindow(QWidget):
         lines.append(f"Сжатие: {item.get('compression')}")
         if item.get("error"):
             lines.append(f"Ошибка: {item.get('error')}")
+        if item.get("duplicate_group"):
+            from duplicates import EXACT
+            kind = "точная копия" if item.get("duplicate_kind") == EXACT else "похожее изображение"
+            lines.append(f"Дубликаты: группа №{item['duplicate_group']} ({kind})")
         add = item.get("additional", {})
         if add:
             lines.append("Дополнительно:")
             for k, v in add.items():
-                lines.append(f"  {k}: {v}")
+                text = str(v)
+                if len(text) > META_VALUE_CHARS:  # списки по кадрам длинных анимаций
+                    text = text[:META_VALUE_CHARS] + "…"
+                lines.append(f"  {k}: {text}")
+        elif loading:
+            lines.append("Дополнительно: загрузка...")
         self.meta_label.setText("\n".join(lines))
 
+    def _on_deep_ready(self, store_row: int, record: dict):
+        self.model.update_records([(store_row, record)])
+        if self.preview_path == record.get("path"):
+            self._show_metadata(self.model.store.record(store_row))
 
-    def _export_csv(self):
-        if self.model.rowCount() == 0:
+    def _on_deep_items(self, items: list):
+        # записи, дочитанные экспортом до уровня deep: (строка хранилища, запись)
+        self.model.update_records(items)
+
+    def _show_preview(self, qimg):
+        pix = QPixmap.fromImage(qimg) if qimg is not None else None
+        if pix and not pix.isNull():
+            pix = pix.scaled(
+                self.preview_label.width(),
+                self.preview_label.height(),
+                Qt.KeepAspectRatio,
+                Qt.SmoothTransformation
+            )
+            self.preview_label.setPixmap(pix)
+            self.preview_label.setText("")
+        else:
+            # setPixmap стирает текст метки — сначала картинка, потом текст
+            self.preview_label.setPixmap(QPixmap())
+            self.preview_label.setText("Нет предпросмотра")
+
+    def _on_thumbnail_ready(self, path: str, qimg: QImage):
+        if path == self.preview_path:
+            self._show_preview(qimg)
+
+    def _on_thumbnail_failed(self, path: str, error: str):
+        if path == self.preview_path:
+            self.status.showMessage(f"Ошибка предпросмотра: {error}")
+            self._show_preview(None)
+
+    def _ask_export_path(self, title: str) -> str:
+        fn, selected = QFileDialog.getSaveFileName(
+            self, title, filter="CSV (*.csv);;JSON Lines (*.jsonl);;SQLite (*.sqlite *.db)")
+        if fn and "." not in Path(fn).name:
+            fn += {"CSV": ".csv", "JSON": ".jsonl", "SQLi": ".sqlite"}.get(selected[:4], ".jsonl")
+        return fn
+
+    def _export_clicked(self):
+        from scanner import ScanEmitter
+        from result_export import export_store
+        from result_writers import writer_format
+        if self.export_emitter is not None:
+            self.export_emitter.cancel()
+            self.btn_export.setEnabled(False)
+            return
+        if len(self.model.store) == len(self.model.store.removed):
             QMessageBox.information(self, "Нет данных", "Таблица пуста — нечего экспортировать.")
             return
-        fn, _ = QFileDialog.getSaveFileName(self, "Сохранить CSV", filter="CSV files (*.csv)")
+        fn = self._ask_export_path("Экспорт результатов")
         if not fn:
             return
+
+        # экспорт идёт в фоне из полных записей хранилища; пока он не закончен,
+        # новое сканирование (очищающее хранилище) запустить нельзя
+        emitter = ScanEmitter()
+        self.export_emitter = emitter
+        self.export_path = fn
+        self.export_error = None
+        emitter.on_progress = lambda a, b: self.export_forwarder.progress_signal.emit(a, b)
+        emitter.on_finished = lambda: self.export_forwarder.finished_signal.emit()
+        emitter.on_items = lambda items: self.export_forwarder.items_signal.emit(items)
+        # снимок колонок: пока идёт экспорт, таблица продолжает меняться (слежение, deep-метаданные, дубликаты)
+        store = self.model.store.snapshot()
+        rows = store.live_rows()
+        deep = self.export_deep.isChecked()
+
+        def run():
+            try:
+                export_store(store, fn, writer_format(fn), emitter, rows, deep=deep)
+            except Exception as e:
+                self.export_forwarder.error_signal.emit(str(e))
+                self.export_forwarder.finished_signal.emit()
+
+        self.btn_start.setEnabled(False)
+        self.btn_export.setText("Отменить экспорт")
+        self.status.showMessage("Экспорт...")
+        threading.Thread(target=run, daemon=True).start()
+
+    def _on_export_progress(self, done: int, total: int):
+        self.status.showMessage(f"Экспорт: {done} из {total}")
+
+    def _on_export_error(self, error: str):
+        self.export_error = error
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл:\n{error}")
+
+    def _on_export_finished(self):
+        emitter, self.export_emitter = self.export_emitter, None
+        self.btn_export.setText("Экспорт...")
+        self.btn_export.setEnabled(True)
+        self.btn_start.setEnabled(not self.scanning and self.dup_emitter is None)
+        if self.export_error:
+            self.status.showMessage("Экспорт не выполнен.")
+        elif emitter is not None and emitter.cancelled():
+            self.status.showMessage("Экспорт отменён.")
+        else:
+            self.status.showMessage(f"Экспорт завершён: {self.export_path}")
+
+    def _duplicates_clicked(self):
+        from scanner import ScanEmitter
+        from duplicates import find_duplicates
+        if self.dup_emitter is not None:
+            self.dup_emitter.cancel()
+            self.btn_duplicates.setEnabled(False)
+            return
+        store = self.model.store
+        rows = store.live_rows()
+        if not rows:
+            QMessageBox.information(self, "Нет данных", "Таблица пуста — искать нечего.")
+            return
+        # записи для поиска собираются в потоке GUI (хранилище меняется только здесь);
+        # формат сравнивается по коду InternPool, без строк; размер файла -1 — неизвестен (берётся stat)
+        entries = [(store.path(r), store.codes["format"][r], store.width[r], store.height[r], store.size[r])
+                   for r in rows]
+        emitter = ScanEmitter()
+        self.dup_emitter = emitter
+        self.dup_error = None
+        self.dup_stats = stats = {}
+        emitter.on_progress = lambda a, b: self.dup_forwarder.progress_signal.emit(a, b)
+        similar = self.dup_similar.isChecked()
+
+        def run():
+            groups = []
+            try:
+                groups = [(kind, [rows[i] for i in group])
+                          for kind, group in find_duplicates(entries, similar=similar, emitter=emitter, stats=stats)]
+            except Exception as e:
+                self.dup_forwarder.error_signal.emit(str(e))
+            self.dup_forwarder.items_signal.emit(groups)
+
+        self.btn_start.setEnabled(False)
+        self.btn_duplicates.setText("Отменить поиск")
+        self.status.showMessage("Поиск дубликатов...")
+        threading.Thread(target=run, daemon=True).start()
+
+    def _on_duplicates_progress(self, done: int, total: int):
+        self.status.showMessage(f"Поиск дубликатов: {done} из {total}")
+
+    def _on_duplicates_error(self, error: str):
+        self.dup_error = error
+        QMessageBox.critical(self, "Ошибка", f"Не удалось найти дубликаты:\n{error}")
+
+    def _on_duplicates_found(self, groups: list):
+        emitter, self.dup_emitter = self.dup_emitter, None
+        self.btn_duplicates.setText("Найти дубликаты")
+        self.btn_duplicates.setEnabled(True)
+        self.btn_start.setEnabled(not self.scanning and self.export_emitter is None)
+        if self.dup_error:
+            self.status.showMessage("Поиск дубликатов не выполнен.")
+            return
+        if emitter is not None and emitter.cancelled():
+            self.status.showMessage("Поиск дубликатов отменён.")
+            return
+        self.model.set_duplicates(groups)
+        if groups:
+            # группы подряд: сортировка по колонке «Дубликаты» и фильтр «Только дубликаты»
+            header = self.table.horizontalHeader()
+            if header.sortIndicatorSection() == DUPLICATES_COLUMN and header.sortIndicatorOrder() == Qt.AscendingOrder:
+                self.model.sort(DUPLICATES_COLUMN, Qt.AscendingOrder)
+            else:
+                header.setSortIndicator(DUPLICATES_COLUMN, Qt.AscendingOrder)
+            self.dup_only.setChecked(True)
+        st = self.dup_stats
+        self.status.showMessage(
+            f"Групп дубликатов: {len(groups)}, файлов в них: {sum(len(g) for _, g in groups)}. "
+            f"Прочитано: начало и конец — {st['partial']}, целиком — {st['full']}, "
+            f"декодировано — {st['perceptual']} из {st['files']}")
+
+    def closeEvent(self, event):
+        if self.scanner_emitter:
+            self.scanner_emitter.cancel()
+        if self.export_emitter:
+            self.export_emitter.cancel()
+        if self.dup_emitter:
+            self.dup_emitter.cancel()
+        if self.thumbs is not None:
+            self.thumbs.shutdown()
+        if self.deep is not None:
+            self.deep.shutdown()
+        super().closeEvent(event)
+
+
+class StartupProbe(QObject):
+    """
+    Замер холодного старта: после первой отрисовки окна записывает в JSON-файл
+    отметки time.time() (imported — модули загружены, app — создан QApplication,
+    window — построено окно, paint — окно отрисовано) и завершает приложение.
+    """
+    def __init__(self, path: str, marks: dict):
+        super().__init__()
+        self.path = path
+        self.marks = marks
+        self.painted = False
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not self.painted:
+            self.painted = True
+            # после того как отрисовка дочерних виджетов закончена
+            QTimer.singleShot(0, self._finish)
+        return False
+
+    def _finish(self):
+        self.marks["paint"] = time.time()
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.marks, f)
+        QApplication.quit()
+
+
+def _prewarm():
+    # импорт в фоне, пока пользователь выбирает папку; ошибки проявятся при использовании
+    for name in PREWARM_MODULES:
         try:
-            with open(fn, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                headers = [self.model.headerData(i, Qt.Horizontal) for i in range(self.model.columnCount())]
-                writer.writerow(headers)
-                for r in range(self.model.rowCount()):
-                    row = []
-                    for c in range(self.model.columnCount()):
-                        it = self.model.item(r, c)
-                        row.append(it.text() if it is not None else "")
-                    writer.writerow(row)
-            QMessageBox.information(self, "Экспорт завершён", f"CSV сохранён: {fn}")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить CSV:\n{e}")
-
-def safe_float(val, ndigits=1):
-    try:
-        return f"{float(val):.{ndigits}f}"
-    except Exception:
-        return str(val) if val is not None else ""
-
-def safe_str(val):
-    try:
-        return str(val) if val is not None else ""
-    except Exception:
-        return ""
-           
+            importlib.import_module(name)
+        except Exception:
+            pass
+
 
 def main():
+    marks = {"imported": time.time()}
+    if getattr(sys, "frozen", False):
+        # нужно для ProcessPoolExecutor в PyInstaller-сборке
+        import multiprocessing
+        multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    marks["app"] = time.time()
     w = MainWindow()
+    marks["window"] = time.time()
+    probe_path = os.environ.get(STARTUP_PROBE_ENV)
+    if probe_path:
+        probe = StartupProbe(probe_path, marks)
+        w.installEventFilter(probe)
+    else:
+        QTimer.singleShot(0, lambda: threading.Thread(target=_prewarm, daemon=True).start())
     w.show()
     sys.exit(app.exec())
 
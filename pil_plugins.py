@@ -0,0 +1,23 @@
+"""
+Pillow только с плагинами поддерживаемых форматов (JPEG, PNG, GIF, TIFF, BMP, PCX).
+
+Image.open без formats, не опознав файл по плагинам для его расширения и «частым»
+(битый файл, член архива без имени), вызывает Image.init() — импорт всех ~45 плагинов
+Pillow, около 60 мс на первом таком файле в каждом процессе. open_image перебирает
+только PIL_FORMATS; их плагины импортируются здесь явно, поэтому их находит и анализ
+PyInstaller, а остальные плагины FileMetadataScanner.spec исключает из сборки.
+Файл другого формата (например, WebP с расширением .png) даёт ту же ошибку
+«cannot identify image file», что и неизвестный формат.
+"""
+from PIL import Image
+from PIL import BmpImagePlugin, GifImagePlugin, JpegImagePlugin, PcxImagePlugin, PngImagePlugin, TiffImagePlugin
+
+PIL_FORMATS = ("JPEG", "PNG", "GIF", "TIFF", "BMP", "PCX")
+# Модули плагинов для сборки; MpoImagePlugin JpegImagePlugin импортирует сам для многокадровых JPEG
+PIL_PLUGINS = ("BmpImagePlugin", "GifImagePlugin", "JpegImagePlugin", "MpoImagePlugin",
+               "PcxImagePlugin", "PngImagePlugin", "TiffImagePlugin")
+
+
+def open_image(fp) -> Image.Image:
+    """Image.open(fp) только форматами PIL_FORMATS (fp — путь или файловый объект)."""
+    return Image.open(fp, formats=PIL_FORMATS)
@@ -0,0 +1,76 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+from formats_info import inspect_image, level_covers, DEEP
+from result_store import ResultStore, DUPLICATE_KEYS
+from result_writers import open_writer
+
+EXPORT_CHUNK = 1000
+DEEP_WORKERS = 8
+
+
+def _inspect_deep(path: str):
+    return inspect_image(path, level=DEEP)
+
+
+def export_store(store: ResultStore, target: str, fmt: Optional[str] = None, emitter=None,
+                 rows: Optional[Sequence[int]] = None, deep: bool = False) -> int:
+    """
+    Записать результаты из хранилища в файл target (CSV, JSONL или SQLite — см.
+    result_writers.open_writer) из полных записей store.record(), а не из текста таблицы.
+    rows — какие строки хранилища писать (по умолчанию все, в порядке поступления).
+    deep=True — строки, просканированные ниже уровня "deep", перед записью дочитываются
+    inspect_image(..., level="deep") в DEEP_WORKERS потоков; новые записи отдаются
+    в emitter.emit_item((строка хранилища, запись)), чтобы владелец хранилища сохранил
+    их (ResultsModel.update_records) — само хранилище из этого потока не меняется.
+    Предназначена для фонового потока: хранилище в это время не должно меняться —
+    владелец передаёт store.snapshot(). emitter (scanner.ScanEmitter) получает
+    on_progress(записано, всего), emitter.cancel() прерывает экспорт; при отмене
+    и при ошибке недописанный файл удаляется. Возвращает число записанных строк.
+    """
+    if rows is None:
+        rows = range(len(store))
+    total = len(rows)
+    writer = open_writer(target, fmt)
+    pool = ThreadPoolExecutor(max_workers=DEEP_WORKERS) if deep else None
+    done = 0
+    complete = False
+    try:
+        for start in range(0, total, EXPORT_CHUNK):
+            if emitter is not None and emitter.cancelled():
+                break
+            chunk = rows[start:start + EXPORT_CHUNK]
+            records = [store.record(r) for r in chunk]
+            if pool is not None:
+                shallow = [i for i, rec in enumerate(records)
+                           if not rec.get("error") and not level_covers(rec.get("level"), DEEP)]
+                fresh = pool.map(_inspect_deep, [records[i]["path"] for i in shallow])
+                for i, rec in zip(shallow, fresh):
+                    rec.update((k, records[i][k]) for k in DUPLICATE_KEYS if k in records[i])
+                    records[i] = rec
+                    if emitter is not None:
+                        emitter.emit_item((chunk[i], rec))
+            writer.write(records)
+            done = writer.count
+            if emitter is not None:
+                emitter.emit_progress(done, total)
+        else:
+            complete = True
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        try:
+            # буфер текстового файла дописывается при закрытии — ошибка здесь тоже оставляет файл неполным
+            writer.close()
+        except Exception:
+            complete = False
+            raise
+        finally:
+            if not complete and isinstance(target, str) and target != "-":
+                try:
+                    os.remove(target)
+                except OSError:
+                    pass
+    if emitter is not None:
+        emitter.emit_finished()
+    return done
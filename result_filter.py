@@ -0,0 +1,316 @@
+import re
+import operator
+from array import array
+from functools import partial
+from itertools import compress
+from typing import Dict, Optional, Tuple, FrozenSet
+from result_store import ResultStore
+
+# Маска строк — bytearray, по байту (0/1) на строку хранилища.
+# Пересечение/объединение масок считается через int.from_bytes, т.е. целиком в C.
+
+_INVERT = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+_MAX_CACHED_RANGES = 16
+
+FORMAT_ALIASES = {"JPG": "JPEG", "JPE": "JPEG", "TIF": "TIFF"}
+
+# Интервал: (lo, hi, lo_strict, hi_strict); None — граница не задана
+Interval = Tuple[Optional[float], Optional[float], bool, bool]
+
+_NUM = r"[-+]?\d+(?:\.\d+)?"
+_RANGE_RE = re.compile(rf"^({_NUM})\s*(?:-|\.\.|–)\s*({_NUM})$")
+_CMP_RE = re.compile(rf"^(<=|>=|<|>|=)?\s*({_NUM})$")
+
+
+class FilterError(ValueError):
+    """Некорректный текст фильтра."""
+
+
+class FilterSpec:
+    """
+    Структурный фильтр таблицы результатов. Пустое поле (None) не ограничивает.
+    formats — множество форматов (JPEG, PNG, ...), depth/width/height/dpi — объединение
+    числовых интервалов, error — "*" (есть ошибка), "-" (нет ошибки) или подстрока,
+    duplicates=True — только файлы из групп дубликатов (ResultStore.set_duplicates).
+    """
+    def __init__(self, formats: Optional[FrozenSet[str]] = None, depth=None, width=None,
+                 height=None, dpi=None, error: Optional[str] = None, duplicates: Optional[bool] = None):
+        self.formats = formats
+        self.depth = depth
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.error = error
+        self.duplicates = duplicates
+
+    def is_empty(self) -> bool:
+        return all(v is None for v in (self.formats, self.depth, self.width,
+                                        self.height, self.dpi, self.error, self.duplicates))
+
+    def __eq__(self, other):
+        return isinstance(other, FilterSpec) and vars(self) == vars(other)
+
+
+_NO_FILTER = FilterSpec()
+
+
+def parse_formats(text: str) -> Optional[FrozenSet[str]]:
+    """'jpg, png gif' -> {'JPEG', 'PNG', 'GIF'}."""
+    names = [t.strip(" .").upper() for t in re.split(r"[,;\s]+", text) if t.strip(" .")]
+    if not names:
+        return None
+    return frozenset(FORMAT_ALIASES.get(n, n) for n in names)
+
+
+def parse_ranges(text: str) -> Optional[Tuple[Interval, ...]]:
+    """
+    Числовой фильтр: термы через запятую/пробел, строка подходит под любой из них.
+    Терм — число ('24'), диапазон ('8-24', '8..24') или сравнение ('>=16', '<8').
+    """
+    terms = [t for t in re.split(r"[,;\s]+", text.strip()) if t]
+    if not terms:
+        return None
+    out = []
+    i = 0
+    while i < len(terms):
+        term = terms[i]
+        # '>= 16' — оператор отдельно от числа
+        if term in ("<", ">", "<=", ">=", "=") and i + 1 < len(terms):
+            term += terms[i + 1]
+            i += 1
+        i += 1
+        m = _RANGE_RE.match(term)
+        if m:
+            lo, hi = sorted((float(m.group(1)), float(m.group(2))))
+            out.append((lo, hi, False, False))
+            continue
+        m = _CMP_RE.match(term)
+        if not m:
+            raise FilterError(f"не число и не диапазон: {term!r}")
+        op, v = m.group(1) or "=", float(m.group(2))
+        out.append({
+            "=": (v, v, False, False),
+            "<": (None, v, False, True),
+            "<=": (None, v, False, False),
+            ">": (v, None, True, False),
+            ">=": (v, None, False, False),
+        }[op])
+    return tuple(out)
+
+
+def parse_error(text: str) -> Optional[str]:
+    text = text.strip()
+    if not text:
+        return None
+    return text if text in ("*", "-") else text.lower()
+
+
+def build_spec(format_text: str = "", depth_text: str = "", width_text: str = "",
+               height_text: str = "", dpi_text: str = "", error_text: str = "",
+               duplicates: bool = False) -> FilterSpec:
+    """Собрать FilterSpec из текста полей фильтра; при ошибке — FilterError."""
+    return FilterSpec(
+        formats=parse_formats(format_text),
+        depth=parse_ranges(depth_text),
+        width=parse_ranges(width_text),
+        height=parse_ranges(height_text),
+        dpi=parse_ranges(dpi_text),
+        error=parse_error(error_text),
+        duplicates=duplicates or None,
+    )
+
+
+def _matches(value, iv: Interval) -> bool:
+    lo, hi, lo_strict, hi_strict = iv
+    if lo is not None and not (lo < value if lo_strict else lo <= value):
+        return False
+    return hi is None or (value < hi if hi_strict else value <= hi)
+
+
+def _and(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, "little") & int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+
+def _or(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, "little") | int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+
+def _interval_mask(values, iv: Interval, missing_below: Optional[float]) -> bytes:
+    """
+    Маска values, попадающих в интервал; map с partial(operator.*) идёт целиком в C.
+    Значения ниже missing_below означают «нет данных» (-1 в целых колонках);
+    NaN в колонках DPI не проходит ни одно сравнение сам.
+    """
+    lo, hi, lo_strict, hi_strict = iv
+    if missing_below is not None and (lo is None or lo < missing_below):
+        lo, lo_strict = missing_below, False
+    mask = None
+    if lo is not None:
+        mask = bytes(map(partial(operator.lt if lo_strict else operator.le, lo), values))
+    if hi is not None:
+        upper = bytes(map(partial(operator.gt if hi_strict else operator.ge, hi), values))
+        mask = upper if mask is None else _and(mask, upper)
+    return mask
+
+
+class FilterIndex:
+    """
+    Индексы ResultStore для FilterSpec, пополняемые по мере поступления строк (update()).
+    Для формата, глубины и наличия ошибки хранится маска на каждое значение,
+    маски числовых диапазонов кэшируются и дописываются только для новых строк.
+    """
+    def __init__(self, store: ResultStore):
+        self.store = store
+        self.reset()
+
+    def reset(self):
+        self._n = 0
+        self._format: Dict[int, bytearray] = {}
+        self._depth: Dict[int, bytearray] = {}
+        self._has_error = bytearray()
+        self._alive = bytearray()
+        self._ranges: Dict[tuple, bytearray] = {}
+
+    def __len__(self):
+        return self._n
+
+    @staticmethod
+    def _extend_keyed(index: Dict[int, bytearray], n: int, values):
+        values = values.tolist()
+        for key in set(values):
+            if key not in index:
+                index[key] = bytearray(n)
+        for key, mask in index.items():
+            mask += bytes(map(key.__eq__, values))
+
+    def update(self):
+        """Проиндексировать строки, добавленные в хранилище с прошлого вызова."""
+        n, total = self._n, len(self.store)
+        if n == total:
+            return
+        if n > total:  # хранилище очищено
+            self.reset()
+            n = 0
+        self._extend_keyed(self._format, n, self.store.codes["format"][n:])
+        self._extend_keyed(self._depth, n, self.store.depth[n:])
+        tail = bytearray(total - n)
+        for r in self.store.errors:
+            if r >= n:
+                tail[r - n] = 1
+        self._has_error += tail
+        alive = bytearray(b"\x01") * (total - n)
+        for r in self.store.removed:
+            if r >= n:
+                alive[r - n] = 0
+        self._alive += alive
+        self._n = total
+
+    def refresh(self, rows):
+        """Переиндексировать уже проиндексированные строки, изменённые в хранилище (ResultStore.replace)."""
+        store = self.store
+        for r in rows:
+            if r >= self._n:
+                continue
+            for index, key in ((self._format, store.codes["format"][r]), (self._depth, store.depth[r])):
+                for k, mask in index.items():
+                    mask[r] = k == key
+                if key not in index:
+                    index[key] = bytearray(self._n)
+                    index[key][r] = 1
+            self._has_error[r] = r in store.errors
+            self._alive[r] = r not in store.removed
+            for (column, intervals), cached in self._ranges.items():
+                if r < len(cached):
+                    values = getattr(store, column)[r:r + 1]
+                    missing = 0 if column in ("width", "height") else None
+                    cached[r] = any(_interval_mask(values, iv, missing)[0] for iv in intervals)
+
+    def keyed_masks(self, column: str) -> Dict[int, bytearray]:
+        """
+        Маски строк по значению колонки: "format" — по коду формата (InternPool хранилища),
+        "depth" — по глубине. Маски живые — не изменять.
+        """
+        self.update()
+        return {"format": self._format, "depth": self._depth}[column]
+
+    def _keyed_mask(self, index: Dict[int, bytearray], keys, start: int) -> bytes:
+        mask = bytes(self._n - start)
+        for key in keys:
+            if key in index:
+                mask = _or(mask, index[key][start:])
+        return mask
+
+    def _range_mask(self, column: str, intervals, start: int) -> bytes:
+        key = (column, intervals)
+        cached = self._ranges.get(key)
+        if cached is None:
+            if len(self._ranges) >= _MAX_CACHED_RANGES:
+                self._ranges.pop(next(iter(self._ranges)))
+            cached = self._ranges[key] = bytearray()
+        if len(cached) < self._n:
+            values = getattr(self.store, column)[len(cached):self._n]
+            tail = None
+            for iv in intervals:
+                m = _interval_mask(values, iv, 0 if column in ("width", "height") else None)
+                tail = m if tail is None else _or(tail, m)
+            cached += tail
+        return bytes(cached[start:])
+
+    def _error_mask(self, error: str, start: int) -> bytes:
+        if error == "*":
+            return bytes(self._has_error[start:])
+        if error == "-":
+            return bytes(self._has_error[start:]).translate(_INVERT)
+        mask = bytearray(self._n - start)
+        for r, text in self.store.errors.items():
+            if start <= r < self._n and error in text.lower():
+                mask[r - start] = 1
+        return bytes(mask)
+
+    def mask(self, spec: Optional[FilterSpec], start: int = 0) -> Optional[bytes]:
+        """
+        Маска строк [start, len) хранилища, проходящих фильтр (spec=None — без фильтра)
+        и не помеченных удалёнными (ResultStore.remove), или None, если проходят все строки.
+        """
+        self.update()
+        if spec is None:
+            spec = _NO_FILTER
+        masks = []
+        if self.store.removed:
+            masks.append(bytes(self._alive[start:]))
+        if spec.formats is not None:
+            pool = self.store.pools["format"]
+            codes = [c for c, v in enumerate(pool.values)
+                     if c and v is not None and str(v).upper() in spec.formats]
+            masks.append(self._keyed_mask(self._format, codes, start))
+        if spec.depth is not None:
+            keys = [k for k in self._depth
+                    if k >= 0 and any(_matches(k, iv) for iv in spec.depth)]
+            masks.append(self._keyed_mask(self._depth, keys, start))
+        for column in ("width", "height"):
+            if getattr(spec, column) is not None:
+                masks.append(self._range_mask(column, getattr(spec, column), start))
+        if spec.dpi is not None:
+            # DPI проходит, если под фильтр попадает любое из значений по осям
+            masks.append(_or(self._range_mask("dpi_x", spec.dpi, start),
+                             self._range_mask("dpi_y", spec.dpi, start)))
+        if spec.error is not None:
+            masks.append(self._error_mask(spec.error, start))
+        if spec.duplicates:
+            masks.append(bytes(map(partial(operator.le, 0), self.store.duplicate_group[start:self._n])))
+        if not masks:
+            return None
+        result = masks[0]
+        for m in masks[1:]:
+            result = _and(result, m)
+        return result
+
+
+def visible_rows(mask: bytes, order=None, start: int = 0) -> array:
+    """
+    Вектор строк хранилища, проходящих маску: в порядке order (перестановка строк),
+    либо по возрастанию начиная со start.
+    """
+    if order is None:
+        return array("I", compress(range(start, start + len(mask)), mask))
+    return array("I", filter(mask.__getitem__, order))
@@ -0,0 +1,184 @@
+"""
+Чтение и слияние файлов результатов result_writers (JSONL, в т.ч. .jsonl.gz, и SQLite) —
+например, выходов шардов (python -m scanner --shard I/N, см. sharding.py):
+
+    python -m result_merge -o merged.sqlite shard-*.jsonl.gz
+
+Путь, встретившийся несколько раз (перекрытие шардов, повторный прогон, изменения
+из режима слежения), попадает в результат один раз — последней записью: файлы
+берутся в порядке аргументов, строки — в порядке записи; строка
+{"path": ..., "removed": true} удаляет путь. Записи копятся во временной SQLite-базе
+рядом с результатом, а не в памяти. CSV обратно не читается (additional в нём —
+строка, типы потеряны).
+"""
+import os
+import sys
+import gzip
+import json
+import sqlite3
+import argparse
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from result_writers import CSV_FIELDS, GZIP_EXT, WRITER_FORMATS, _sql_text, open_writer, writer_format
+from scan_cache import _json_default
+
+MERGE_BATCH = 10000
+LOAD_BATCH = 500
+
+
+def _iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    opener = gzip.open if path.lower().endswith(GZIP_EXT) else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{n}: invalid JSON line: {e}") from None
+
+
+def _iter_sqlite(path: str) -> Iterator[Dict[str, Any]]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        # файлы, записанные до появления колонок дубликатов, size и level, — читаются только имеющиеся колонки
+        present = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+        columns = [k for k in CSV_FIELDS if k in present]
+        if "path" not in present:
+            raise ValueError(f"{path}: no results table")
+        for row in conn.execute(f"SELECT {', '.join(columns)} FROM results ORDER BY id"):
+            # строки с суррогатами SqliteWriter хранит байтами
+            item = {k: v.decode("utf-8", "surrogateescape") if isinstance(v, bytes) else v
+                    for k, v in zip(columns, row) if v is not None}
+            if "additional" in item:
+                item["additional"] = json.loads(item["additional"])
+            yield item
+    finally:
+        conn.close()
+
+
+def iter_results(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Записи файла результатов в порядке записи — в том виде, что отдаёт inspect_image;
+    в JSONL встречаются и отметки удаления {"path": ..., "removed": true}.
+    """
+    fmt = writer_format(path)
+    if fmt == "sqlite":
+        return _iter_sqlite(path)
+    if fmt == "jsonl":
+        return _iter_jsonl(path)
+    raise ValueError(f"{path}: CSV results cannot be read back, use JSONL or SQLite")
+
+
+def merge_results(inputs: Sequence[str], target: str, fmt: Optional[str] = None,
+                  stats: Optional[Dict[str, int]] = None) -> int:
+    """
+    Слить файлы результатов inputs в target (формат — как у result_writers.open_writer).
+    Записи выходят в порядке первого появления пути, содержимое — последней записи.
+    Если передан словарь stats, в него пишутся read (прочитано записей), duplicates
+    (записей с уже встречавшимся путём), removed (отметок удаления) и written.
+    Возвращает число записанных строк.
+    """
+    if stats is None:
+        stats = {}
+    stats.update(read=0, duplicates=0, removed=0, written=0)
+    directory = os.path.dirname(os.path.abspath(target)) if target not in (None, "-") else None
+    fd, staging = tempfile.mkstemp(prefix=".merge-", suffix=".sqlite", dir=directory)
+    os.close(fd)
+    conn = sqlite3.connect(staging)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        # first — порядок первого появления пути, record — последняя запись (NULL — удалён);
+        # путь не из UTF-8 — ключом-байтами, запись — JSON с \udcXX (ensure_ascii)
+        conn.execute("CREATE TABLE staging (path TEXT PRIMARY KEY, first INTEGER NOT NULL, record TEXT)")
+        upsert = ("INSERT INTO staging (path, first, record) VALUES (?, ?, ?)"
+                  " ON CONFLICT(path) DO UPDATE SET record = excluded.record")
+        seq = 0
+        for path in inputs:
+            rows = []
+            for item in iter_results(path):
+                seq += 1
+                removed = bool(item.get("removed"))
+                stats["removed"] += removed
+                record = None if removed else json.dumps(item, default=_json_default)
+                rows.append((_sql_text(item["path"]), seq, record))
+                if len(rows) >= MERGE_BATCH:
+                    conn.executemany(upsert, rows)
+                    rows = []
+            conn.executemany(upsert, rows)
+        conn.commit()
+        unique = conn.execute("SELECT COUNT(*) FROM staging").fetchone()[0]
+        stats["read"] = seq
+        stats["duplicates"] = seq - unique
+
+        # файл результата открывается только теперь — им может быть и один из входов
+        writer = open_writer(target, fmt)
+        try:
+            cur = conn.execute("SELECT record FROM staging WHERE record IS NOT NULL ORDER BY first")
+            while True:
+                rows = cur.fetchmany(MERGE_BATCH)
+                if not rows:
+                    break
+                writer.write(json.loads(r[0]) for r in rows)
+        finally:
+            writer.close()
+    finally:
+        conn.close()
+        os.remove(staging)
+    stats["written"] = writer.count
+    return writer.count
+
+
+def load_results(path: str, emitter) -> int:
+    """
+    Отдать записи файла результатов в emitter (scanner.ScanEmitter) так же, как их отдаёт
+    сканирование: emit_item на запись, emit_removed на отметку удаления, on_progress
+    (прочитано, прочитано) и emit_finished в конце — чтобы показать готовые результаты
+    (например, слитые шарды) в таблице без повторного сканирования. Предназначена для
+    фонового потока; emitter.cancel() прерывает чтение. Возвращает число прочитанных записей.
+    """
+    done = 0
+    try:
+        for item in iter_results(path):
+            if emitter.cancelled():
+                break
+            if item.get("removed"):
+                emitter.emit_removed([item["path"]])
+            else:
+                emitter.emit_item(item)
+            done += 1
+            if done % LOAD_BATCH == 0:
+                emitter.emit_progress(done, done)
+        emitter.emit_progress(done, done)
+    finally:
+        emitter.emit_finished()
+    return done
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(
+        prog="python -m result_merge",
+        description="Слияние файлов результатов сканирования (JSONL, .jsonl.gz, SQLite) без повторного сканирования.")
+    p.add_argument("inputs", nargs="+", help="файлы результатов; при повторе пути побеждает более поздний файл")
+    p.add_argument("-o", "--output", required=True, help="файл результата (- — stdout)")
+    p.add_argument("-f", "--format", choices=WRITER_FORMATS,
+                   help="формат вывода (по умолчанию по расширению -o)")
+    args = p.parse_args(argv)
+    missing = [path for path in args.inputs if not os.path.isfile(path)]
+    if missing:
+        p.error("файл не найден: " + ", ".join(missing))
+    stats: Dict[str, int] = {}
+    try:
+        merge_results(args.inputs, args.output, args.format, stats)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"{p.prog}: ошибка: {e}", file=sys.stderr)
+        return 1
+    print(f"Файлов: {len(args.inputs)}, записей: {stats['read']}, повторов: {stats['duplicates']}, "
+          f"удалено: {stats['removed']}, записано: {stats['written']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import os
+import math
+import pickle
+from array import array
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+# Поля результата inspect_image, которые хранятся в отдельных колонках
+_NUMERIC_INT = ("width", "height", "depth", "size")
+_NUMERIC_FLOAT = ("dpi_x", "dpi_y")
+_INTERNED = ("format", "compression", "mode", "level")
+# Группа дубликатов (duplicates.find_duplicates): номер с 1 и вид группы
+DUPLICATE_KEYS = ("duplicate_group", "duplicate_kind")
+_DUPLICATE_KINDS = (None, "exact", "similar")
+_KIND_CODES = {kind: code for code, kind in enumerate(_DUPLICATE_KINDS)}
+_COLUMN_KEYS = ({"path", "filename", "error"} | set(_NUMERIC_INT) | set(_NUMERIC_FLOAT) | set(_INTERNED)
+                | set(DUPLICATE_KEYS))
+_NONE_INT = -1
+# Поля-колонки, которых может не быть в результате (уровни basic и standard их не заполняют):
+# бит на поле в ResultStore.present, чтобы record() не добавлял ключей, которых не было.
+# Порядок — порядок ключей в результате inspect_image
+_OPTIONAL_KEYS = ("size", "format", "width", "height", "dpi_x", "dpi_y", "depth", "mode", "compression",
+                  "additional", "level")
+_PRESENT_BITS = {k: 1 << i for i, k in enumerate(_OPTIONAL_KEYS)}
+
+
+def _present_mask(item: Dict[str, Any]) -> int:
+    return sum(bit for k, bit in _PRESENT_BITS.items() if k in item)
+
+
+def _int_value(item: Dict[str, Any], key: str) -> int:
+    v = item.get(key)
+    return _NONE_INT if v is None else int(v)
+
+
+def _float_value(item: Dict[str, Any], key: str) -> float:
+    v = item.get(key)
+    try:
+        return math.nan if v is None else float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _blob(item: Dict[str, Any]) -> Optional[bytes]:
+    rest = {k: v for k, v in item.items() if k not in _COLUMN_KEYS and v not in (None, {})}
+    return pickle.dumps(rest, pickle.HIGHEST_PROTOCOL) if rest else None
+
+
+class InternPool:
+    """Словарь повторяющихся значений (формат, сжатие, режим, уровень): значение <-> код."""
+    def __init__(self):
+        self.values: List[Any] = [None]  # код 0 — поле отсутствует в результате
+        self._codes: Dict[Any, int] = {}
+
+    def code(self, value) -> int:
+        try:
+            return self._codes[value]
+        except KeyError:
+            c = self._codes[value] = len(self.values)
+            self.values.append(value)
+            return c
+
+    def __len__(self):
+        return len(self.values)
+
+    def copy(self) -> "InternPool":
+        pool = InternPool()
+        pool.values = list(self.values)
+        pool._codes = dict(self._codes)
+        return pool
+
+
+class ResultStore:
+    """
+    Компактное колоночное хранилище результатов сканирования.
+    Числа лежат в array, повторяющиеся строки — кодами InternPool, пути — в одном
+    буфере со таблицей смещений, ошибки — в разреженном словаре, а additional и
+    прочие редкие поля — в pickle-блоке на строку. record(i) собирает словарь
+    в том же виде, что возвращает inspect_image.
+    """
+    def __init__(self):
+        self.width = array("q")
+        self.height = array("q")
+        self.depth = array("i")
+        self.size = array("q")  # размер файла в байтах
+        self.dpi_x = array("d")
+        self.dpi_y = array("d")
+        self.pools = {k: InternPool() for k in _INTERNED}
+        self.codes = {k: array("I") for k in _INTERNED}
+        self._path_buf = bytearray()
+        self._path_offsets = array("Q", [0])
+        self.errors: Dict[int, str] = {}
+        self._blobs: List[Optional[bytes]] = []
+        self.removed: Set[int] = set()  # строки удалённых файлов (режим слежения); номера строк не сдвигаются
+        self.duplicate_group = array("q")  # -1 — файл не в группе дубликатов
+        self.duplicate_kind = bytearray()  # коды _DUPLICATE_KINDS
+        self.dirs = InternPool()            # каталоги файлов (сводка scan_summary — ошибки по каталогам)
+        self.dir_codes = array("I")
+        self.present = array("H")  # биты _PRESENT_BITS: какие из _OPTIONAL_KEYS были в результате
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def append(self, item: Dict[str, Any]) -> int:
+        row = len(self._blobs)
+        for k in _NUMERIC_INT:
+            getattr(self, k).append(_int_value(item, k))
+        for k in _NUMERIC_FLOAT:
+            getattr(self, k).append(_float_value(item, k))
+        for k in _INTERNED:
+            self.codes[k].append(self.pools[k].code(item[k]) if k in item else 0)
+        self._path_buf += item.get("path", "").encode("utf-8", "surrogateescape")
+        self._path_offsets.append(len(self._path_buf))
+        if item.get("error"):
+            self.errors[row] = item["error"]
+        self._blobs.append(_blob(item))
+        self.duplicate_group.append(_int_value(item, "duplicate_group"))
+        self.duplicate_kind.append(_KIND_CODES.get(item.get("duplicate_kind"), 0))
+        self.dir_codes.append(self.dirs.code(os.path.dirname(item.get("path", ""))))
+        self.present.append(_present_mask(item))
+        return row
+
+    def replace(self, row: int, item: Dict[str, Any]):
+        """
+        Заменить поля строки новым результатом для того же файла (путь не меняется);
+        группа дубликатов строки сохраняется.
+        """
+        for k in _NUMERIC_INT:
+            getattr(self, k)[row] = _int_value(item, k)
+        for k in _NUMERIC_FLOAT:
+            getattr(self, k)[row] = _float_value(item, k)
+        for k in _INTERNED:
+            self.codes[k][row] = self.pools[k].code(item[k]) if k in item else 0
+        if item.get("error"):
+            self.errors[row] = item["error"]
+        else:
+            self.errors.pop(row, None)
+        self._blobs[row] = _blob(item)
+        self.present[row] = _present_mask(item)
+
+    def remove(self, row: int):
+        """Пометить строку удалённой: данные остаются, строка пропадает из live_rows()."""
+        self.removed.add(row)
+
+    def live_rows(self):
+        """Строки, не помеченные удалёнными, по возрастанию."""
+        if not self.removed:
+            return range(len(self))
+        return [r for r in range(len(self)) if r not in self.removed]
+
+    def set_duplicates(self, groups: Iterable[Tuple[str, Iterable[int]]]):
+        """
+        Записать группы дубликатов — пары (вид, строки хранилища), как их возвращает
+        duplicates.find_duplicates; группы нумеруются с 1, прежние сбрасываются.
+        """
+        self.duplicate_group = array("q", [_NONE_INT]) * len(self)
+        self.duplicate_kind = bytearray(len(self))
+        for n, (kind, rows) in enumerate(groups, 1):
+            code = _KIND_CODES[kind]
+            for r in rows:
+                self.duplicate_group[r] = n
+                self.duplicate_kind[r] = code
+
+    def snapshot(self) -> "ResultStore":
+        """
+        Независимая копия хранилища — для чтения в фоновом потоке (экспорт), пока
+        владелец продолжает его менять. Копируются колонки, а не записи: массивы
+        и буфер путей целиком, pickle-блоки — ссылками (bytes не меняются).
+        """
+        copy = ResultStore.__new__(ResultStore)
+        for k in _NUMERIC_INT + _NUMERIC_FLOAT + ("duplicate_group", "dir_codes", "present", "_path_offsets"):
+            setattr(copy, k, array(getattr(self, k).typecode, getattr(self, k)))
+        copy.pools = {k: pool.copy() for k, pool in self.pools.items()}
+        copy.codes = {k: array("I", codes) for k, codes in self.codes.items()}
+        copy._path_buf = bytearray(self._path_buf)
+        copy.errors = dict(self.errors)
+        copy._blobs = list(self._blobs)
+        copy.removed = set(self.removed)
+        copy.duplicate_kind = bytearray(self.duplicate_kind)
+        copy.dirs = self.dirs.copy()
+        return copy
+
+    def extend(self, items: List[Dict[str, Any]]):
+        for item in items:
+            self.append(item)
+
+    def clear(self):
+        self.__init__()
+
+    def path(self, row: int) -> str:
+        start, end = self._path_offsets[row], self._path_offsets[row + 1]
+        return self._path_buf[start:end].decode("utf-8", "surrogateescape")
+
+    def filename(self, row: int) -> str:
+        return self.path(row).split("/")[-1]
+
+    def value(self, row: int, key: str):
+        """Значение одного поля без сборки всего словаря."""
+        if key in _NUMERIC_INT:
+            v = getattr(self, key)[row]
+            return None if v == _NONE_INT else v
+        if key in _NUMERIC_FLOAT:
+            v = getattr(self, key)[row]
+            return None if math.isnan(v) else v
+        if key in _INTERNED:
+            return self.pools[key].values[self.codes[key][row]]
+        if key == "path":
+            return self.path(row)
+        if key == "filename":
+            return self.filename(row)
+        if key == "error":
+            return self.errors.get(row)
+        if key == "duplicate_group":
+            v = self.duplicate_group[row]
+            return None if v == _NONE_INT else v
+        if key == "duplicate_kind":
+            return _DUPLICATE_KINDS[self.duplicate_kind[row]]
+        blob = self._blobs[row]
+        rest = pickle.loads(blob) if blob else {}
+        if key == "additional":
+            return rest.get("additional", {})
+        return rest.get(key)
+
+    def has_metadata(self, row: int) -> bool:
+        return self.codes["format"][row] != 0
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Результат строки с теми же ключами, что были у записи при append/replace."""
+        out = {"path": self.path(row), "filename": self.filename(row)}
+        mask = self.present[row]
+        for k in _OPTIONAL_KEYS:
+            if mask & _PRESENT_BITS[k]:
+                # непустой additional — в pickle-блоке, ниже
+                out[k] = {} if k == "additional" else self.value(row, k)
+        blob = self._blobs[row]
+        if blob:
+            out.update(pickle.loads(blob))
+        if row in self.errors:
+            out["error"] = self.errors[row]
+        if self.duplicate_group[row] != _NONE_INT:
+            out["duplicate_group"] = self.duplicate_group[row]
+            out["duplicate_kind"] = _DUPLICATE_KINDS[self.duplicate_kind[row]]
+        return out
+
+    def nbytes(self) -> int:
+        """Приблизительный объём памяти колонок (без pickle-блоков и словарей)."""
+        arrays = [self.width, self.height, self.depth, self.size, self.dpi_x, self.dpi_y, self._path_offsets,
+                  self.duplicate_group, self.dir_codes, self.present]
+        arrays += list(self.codes.values())
+        return sum(a.itemsize * len(a) for a in arrays) + len(self._path_buf) + len(self.duplicate_kind)
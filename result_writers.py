@@ -0,0 +1,225 @@
+import io
+import os
+import csv
+import sys
+import gzip
+import json
+import sqlite3
+from typing import Dict, Any, Iterable, List
+from scan_cache import _json_default
+
+WRITER_FORMATS = ("jsonl", "csv", "sqlite")
+SQLITE_EXTS = (".sqlite", ".sqlite3", ".db")
+GZIP_EXT = ".gz"
+# Имя файла не из UTF-8 приходит из os.scandir с суррогатами (surrogateescape). В текстовых
+# файлах они пишутся как \udcXX — в JSON это та же escape-последовательность, путь читается
+# обратно без потерь; в SQLite такие строки хранятся байтами (BLOB), см. SqliteWriter
+TEXT_ERRORS = "backslashreplace"
+
+# Колонки CSV: «сырые» поля inspect_image, additional — JSON-строкой;
+# duplicate_group/duplicate_kind заполнены после поиска дубликатов (duplicates.py), size — размер файла в байтах,
+# level — уровень inspect_image (без него загруженная запись считалась бы полной)
+CSV_FIELDS = ["path", "filename", "format", "width", "height", "dpi_x", "dpi_y",
+              "depth", "mode", "compression", "error", "additional", "duplicate_group", "duplicate_kind", "size",
+              "level"]
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _sql_text(value):
+    """Значение для SQLite: строка с суррогатами — байты UTF-8/surrogateescape (BLOB), остальное как есть."""
+    if isinstance(value, str):
+        try:
+            value.encode("utf-8")
+        except UnicodeEncodeError:
+            return value.encode("utf-8", "surrogateescape")
+    return value
+
+
+class ResultWriter:
+    """
+    Потоковая запись результатов сканирования: write() пачками по мере поступления,
+    в памяти ничего не копится. Поток "-" / None — stdout (он не закрывается).
+    Файл с расширением .gz сжимается gzip (каждая пачка сбрасывается в сжатый поток).
+    """
+    def __init__(self, target=None):
+        if target is None or target == "-":
+            self._f, self._own = sys.stdout, False
+        elif isinstance(target, io.IOBase):
+            self._f, self._own = target, False
+        elif target.lower().endswith(GZIP_EXT):
+            self._f, self._own = gzip.open(target, "wt", newline="", encoding="utf-8", errors=TEXT_ERRORS), True
+        else:
+            self._f, self._own = open(target, "w", newline="", encoding="utf-8", errors=TEXT_ERRORS), True
+        self.count = 0
+        self.errors = 0
+
+    def write(self, items: Iterable[Dict[str, Any]]):
+        """Записать пачку и сбросить её на диск (обрыв процесса не теряет записанное)."""
+        items = list(items)
+        self._write_batch(items)
+        self.count += len(items)
+        self.errors += sum(1 for item in items if item.get("error"))
+
+    def update(self, items: Iterable[Dict[str, Any]]):
+        """
+        Новые результаты для уже записанных файлов (режим слежения). В потоковых
+        форматах дописываются как обычно — актуальна последняя запись пути.
+        """
+        self.write(items)
+
+    def remove(self, paths: Iterable[str]):
+        """Отметить удаление файлов (режим слежения)."""
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает удаление записей")
+
+    def _write_batch(self, items: List[Dict[str, Any]]):
+        for item in items:
+            self._write_one(item)
+        self._f.flush()
+
+    def _write_one(self, item: Dict[str, Any]):
+        raise NotImplementedError
+
+    def close(self):
+        if self._own:
+            self._f.close()
+        else:
+            self._f.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonlWriter(ResultWriter):
+    """
+    Одна строка JSON на файл (результат inspect_image как есть);
+    удаление файла — строка {"path": ..., "removed": true}.
+    """
+    def _write_one(self, item):
+        self._f.write(_dumps(item))
+        self._f.write("\n")
+
+    def remove(self, paths):
+        for p in paths:
+            self._write_one({"path": p, "removed": True})
+        self._f.flush()
+
+
+class CsvWriter(ResultWriter):
+    """CSV с заголовком CSV_FIELDS."""
+    def __init__(self, target=None):
+        super().__init__(target)
+        self._csv = csv.writer(self._f)
+        self._csv.writerow(CSV_FIELDS)
+
+    def _write_one(self, item):
+        row = []
+        for k in CSV_FIELDS:
+            v = item.get(k)
+            if k == "additional":
+                row.append(_dumps(v) if v else "")
+            elif k in ("dpi_x", "dpi_y") and v is not None:
+                row.append(_json_default(v))
+            else:
+                row.append("" if v is None else v)
+        self._csv.writerow(row)
+
+
+class SqliteWriter(ResultWriter):
+    """
+    Таблица results с типизированными колонками CSV_FIELDS (additional — JSON)
+    и индексами по формату, глубине, размеру, ошибке и группе дубликатов. Каждая пачка — отдельная
+    транзакция. Существующий файл перезаписывается. Строки с суррогатами (путь не из UTF-8)
+    хранятся байтами — result_merge декодирует их обратно.
+    """
+    def __init__(self, target: str):
+        if not isinstance(target, str) or target == "-":
+            raise ValueError("SQLite export needs a file path")
+        if os.path.exists(target):
+            os.remove(target)
+        self._conn = sqlite3.connect(target, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE results ("
+            " id INTEGER PRIMARY KEY, path TEXT NOT NULL, filename TEXT, format TEXT,"
+            " width INTEGER, height INTEGER, dpi_x REAL, dpi_y REAL, depth INTEGER,"
+            " mode TEXT, compression TEXT, error TEXT, additional TEXT,"
+            " duplicate_group INTEGER, duplicate_kind TEXT, size INTEGER, level TEXT)"
+        )
+        for col in ("path", "format", "depth", "width, height", "error", "duplicate_group"):
+            name = col.replace(", ", "_")
+            self._conn.execute(f"CREATE INDEX results_{name} ON results({col})")
+        self._conn.commit()
+        self.count = 0
+        self.errors = 0
+
+    @staticmethod
+    def _row(item):
+        row = []
+        for k in CSV_FIELDS:
+            v = item.get(k)
+            if k == "additional":
+                v = _dumps(v) if v else None
+            elif k in ("dpi_x", "dpi_y") and v is not None:
+                v = _json_default(v)
+            elif v is not None and not isinstance(v, (int, float, str)):
+                v = str(v)
+            row.append(_sql_text(v))
+        return row
+
+    def update(self, items):
+        """Заменить строки уже записанных файлов (таблица остаётся снимком папки)."""
+        items = list(items)
+        self._conn.executemany("DELETE FROM results WHERE path = ?", ((_sql_text(item.get("path")),) for item in items))
+        self.write(items)
+
+    def remove(self, paths):
+        self._conn.executemany("DELETE FROM results WHERE path = ?", ((_sql_text(p),) for p in paths))
+        self._conn.commit()
+
+    def _write_batch(self, items):
+        self._conn.executemany(
+            f"INSERT INTO results ({', '.join(CSV_FIELDS)}) VALUES ({', '.join('?' * len(CSV_FIELDS))})",
+            [self._row(item) for item in items])
+        self._conn.commit()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+
+def writer_format(target) -> str:
+    """
+    Формат по расширению файла: .csv, .sqlite/.sqlite3/.db, иначе jsonl;
+    сжатые .csv.gz — csv, прочие .gz — jsonl.
+    """
+    name = target.lower() if isinstance(target, str) else ""
+    if name.endswith(GZIP_EXT):
+        return "csv" if name.endswith(".csv" + GZIP_EXT) else "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith(SQLITE_EXTS):
+        return "sqlite"
+    return "jsonl"
+
+
+def open_writer(target=None, fmt: str = None) -> ResultWriter:
+    """
+    Writer для формата fmt ("jsonl" | "csv" | "sqlite"); если fmt не задан —
+    по расширению target (по умолчанию jsonl).
+    """
+    if fmt is None:
+        fmt = writer_format(target)
+    if fmt == "jsonl":
+        return JsonlWriter(target)
+    if fmt == "csv":
+        return CsvWriter(target)
+    if fmt == "sqlite":
+        return SqliteWriter(target)
+    raise ValueError(f"Unknown output format: {fmt!r}, expected one of {WRITER_FORMATS}")
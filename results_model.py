@@ -0,0 +1,334 @@
+import sys
+from array import array
+from typing import Dict, Any, List, Tuple, Optional, Iterable
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from result_store import ResultStore
+from result_filter import FilterIndex, FilterSpec, visible_rows
+from scan_summary import ScanSummary, summarize_store
+
+COLUMNS = ["Имя файла", "Формат", "Размер (px)", "DPI", "Глубина (bit)", "Сжатие", "Ошибка", "Дополнительно",
+           "Дубликаты"]
+DUPLICATES_COLUMN = 8
+ITEM_ROLE = Qt.UserRole + 1
+
+
+def safe_float(val, ndigits=1):
+    try:
+        return f"{float(val):.{ndigits}f}"
+    except Exception:
+        return str(val) if val is not None else ""
+
+def safe_str(val):
+    try:
+        return str(val) if val is not None else ""
+    except Exception:
+        return ""
+
+def cell_text(store: ResultStore, row: int, column: int) -> str:
+    """Текст ячейки таблицы для строки хранилища (формируется по запросу)."""
+    if column == 0:
+        return store.filename(row)
+    if column == 1:
+        return safe_str(store.value(row, "format"))
+    if column == 2:
+        w, h = store.width[row], store.height[row]
+        return f"{w}×{h}" if w > 0 and h > 0 else ""
+    if column == 3:
+        dx, dy = store.dpi_x[row], store.dpi_y[row]
+        return f"{safe_float(dx)}×{safe_float(dy)}" if dx and dy and dx == dx and dy == dy else ""
+    if column == 4:
+        return safe_str(store.value(row, "depth"))
+    if column == 5:
+        return safe_str(store.value(row, "compression"))
+    if column == 6:
+        return store.errors.get(row, "")
+    if column == 7:
+        add = store.value(row, "additional")
+        return ", ".join(f"{k}:{v}" for k, v in list(add.items())[:3]) if add else ""
+    if column == DUPLICATES_COLUMN:
+        group = store.duplicate_group[row]
+        if group < 0:
+            return ""
+        return f"№{group}" if store.value(row, "duplicate_kind") == "exact" else f"№{group} ≈"
+    return ""
+
+
+def _sort_key(store: ResultStore, column: int):
+    if column == 2:
+        return lambda r: (store.width[r], store.height[r])
+    if column == 3:
+        return lambda r: (store.dpi_x[r] if store.dpi_x[r] == store.dpi_x[r] else -1.0)
+    if column == 4:
+        return store.depth.__getitem__
+    if column in (1, 5):
+        key = "format" if column == 1 else "compression"
+        codes, values = store.codes[key], store.pools[key].values
+        texts = [safe_str(v) for v in values]
+        return lambda r: texts[codes[r]]
+    if column == DUPLICATES_COLUMN:
+        # строки одной группы идут подряд, файлы без группы — в конце
+        groups = store.duplicate_group
+        return lambda r: groups[r] if groups[r] >= 0 else sys.maxsize
+    return lambda r: cell_text(store, r, column)
+
+
+def _runs(positions: List[int]) -> List[List[int]]:
+    """Подряд идущие позиции (по возрастанию) — отрезками [первая, последняя]."""
+    runs = []
+    for p in positions:
+        if runs and runs[-1][1] == p - 1:
+            runs[-1][1] = p
+        else:
+            runs.append([p, p])
+    return runs
+
+
+class ResultsModel(QAbstractTableModel):
+    """
+    Табличная модель результатов сканирования поверх колоночного ResultStore.
+    Текст ячеек формируется в data() по запросу; пачка результатов
+    добавляется одной парой beginInsertRows/endInsertRows. Сортировка и
+    фильтр (FilterSpec) меняют только вектор индексов видимых строк.
+    В режиме слежения (folder_watch) upsert_items заменяет записи уже известных
+    файлов на месте, remove_paths убирает строки удалённых. set_duplicates
+    заполняет колонку «Дубликаты» (duplicates.find_duplicates). summary() — сводка
+    (scan_summary) по строкам под текущим фильтром.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = ResultStore()
+        self.filter_index = FilterIndex(self.store)
+        self._spec = None
+        self._sorted = None  # перестановка строк хранилища после sort()
+        self._mask = None    # bytearray по байту на строку хранилища, если фильтр задан или есть удалённые строки
+        self._order = None   # None — все строки в порядке поступления; иначе array видимых строк
+        self._rows_by_path: Optional[Dict[str, int]] = None  # путь -> строка хранилища, строится по требованию
+        self._summary: Optional[ScanSummary] = None  # сводка видимых строк, строится по требованию
+        self._positions = None  # строка хранилища -> позиция в _order (-1 — скрыта), строится по требованию
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.store) if self._order is None else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return cell_text(self.store, self.store_row(index.row()), index.column())
+        if role == ITEM_ROLE:
+            return self.store.record(self.store_row(index.row()))
+        return None
+
+    def store_row(self, row: int) -> int:
+        return row if self._order is None else self._order[row]
+
+    def _view_positions(self, rows: Iterable[int]) -> List[int]:
+        """Позиции видимых строк хранилища rows в таблице, по возрастанию."""
+        if self._order is None:
+            return sorted(rows)
+        if self._positions is None:
+            self._positions = array("q", [-1]) * len(self.store)
+            for i, r in enumerate(self._order):
+                self._positions[r] = i
+        return sorted(p for p in (self._positions[r] for r in rows) if p >= 0)
+
+    def _rebuild_order(self):
+        self._positions = None
+        if self._mask is None:
+            self._order = self._sorted
+        else:
+            self._order = visible_rows(self._mask, self._sorted)
+
+    def append_items(self, items: List[Dict[str, Any]]):
+        if not items:
+            return
+        first = len(self.store)
+        if self._rows_by_path is not None:
+            for i, item in enumerate(items):
+                self._rows_by_path[item.get("path", "")] = first + i
+        if self._order is None:
+            self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+            self.store.extend(items)
+            self.filter_index.update()
+            self.endInsertRows()
+            self._extend_summary(items, first)
+            return
+        self.store.extend(items)
+        self.filter_index.update()
+        self._positions = None
+        if self._mask is None:
+            # _order — это _sorted: новые строки просто дописываются в конец
+            added = array("I", range(first, len(self.store)))
+        else:
+            tail = self.filter_index.mask(self._spec, first)
+            self._mask += tail
+            added = visible_rows(tail, start=first)
+            if self._sorted is not None:
+                self._sorted.extend(range(first, len(self.store)))
+        self._extend_summary(items, first)
+        if added:
+            shown = len(self._order)
+            self.beginInsertRows(QModelIndex(), shown, shown + len(added) - 1)
+            self._order.extend(added)
+            self.endInsertRows()
+
+    def _extend_summary(self, items: List[Dict[str, Any]], first: int):
+        if self._summary is None:
+            return
+        for i, item in enumerate(items, first):
+            if self._mask is None or self._mask[i]:
+                self._summary.add(item)
+
+    def summary(self) -> ScanSummary:
+        """
+        Сводка по строкам под текущим фильтром. Считается по колонкам хранилища
+        при первом запросе после смены фильтра, дальше пополняется добавляемыми строками.
+        """
+        if self._summary is None:
+            self._summary = summarize_store(self.store, self._mask, self.filter_index)
+        return self._summary
+
+    def update_records(self, updates: List[Tuple[int, Dict[str, Any]]]):
+        """
+        Заменить записи строк хранилища новыми результатами для тех же файлов
+        (пары (строка хранилища, результат)), например дополненными deep-метаданными.
+        Пары, чей путь не совпадает со строкой (хранилище уже очищено), пропускаются.
+        """
+        rows = []
+        for r, item in updates:
+            if r < len(self.store) and self.store.path(r) == item.get("path"):
+                self.store.replace(r, item)
+                rows.append(r)
+        if not rows:
+            return
+        self._summary = None
+        self.filter_index.refresh(rows)
+        if self._mask is not None:
+            mask = self.filter_index.mask(self._spec)
+            if mask != self._mask:
+                # строки появились или пропали из-под фильтра
+                self.beginResetModel()
+                self._mask = bytearray(mask)
+                self._rebuild_order()
+                self.endResetModel()
+                return
+        for first, last in _runs(self._view_positions(rows)):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(COLUMNS) - 1))
+
+    def _path_index(self) -> Dict[str, int]:
+        if self._rows_by_path is None:
+            removed = self.store.removed
+            self._rows_by_path = {self.store.path(r): r for r in range(len(self.store)) if r not in removed}
+        return self._rows_by_path
+
+    def upsert_items(self, items: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Результаты повторной инспекции: записи уже известных файлов заменяются
+        на месте (update_records), новые файлы дописываются. Возвращает (добавлено, обновлено).
+        """
+        index = self._path_index()
+        updates, new = [], []
+        for item in items:
+            r = index.get(item.get("path"))
+            if r is None:
+                new.append(item)
+            else:
+                updates.append((r, item))
+        if updates:
+            self.update_records(updates)
+        self.append_items(new)
+        return len(new), len(updates)
+
+    def remove_paths(self, paths: Iterable[str]) -> int:
+        """Убрать из таблицы строки удалённых файлов; возвращает число убранных строк."""
+        index = self._path_index()
+        rows = sorted(r for r in (index.pop(p, None) for p in paths) if r is not None)
+        if not rows:
+            return 0
+        if self._order is None:
+            positions = rows
+            self._order = array("I", range(len(self.store)))
+        else:
+            if self._order is self._sorted:
+                self._order = array("I", self._order)  # дальше _order и _sorted пополняются по отдельности
+            gone = set(rows)
+            positions = [i for i, r in enumerate(self._order) if r in gone]
+        for r in rows:
+            self.store.remove(r)
+        self._summary = None
+        self.filter_index.refresh(rows)
+        self._mask = bytearray(self.filter_index.mask(self._spec))
+        self._positions = None
+        # подряд идущие позиции — одной парой beginRemoveRows/endRemoveRows, с конца
+        for first, last in reversed(_runs(positions)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._order[first:last + 1]
+            self.endRemoveRows()
+        return len(rows)
+
+    def set_duplicates(self, groups: List[Tuple[str, List[int]]]):
+        """Группы дубликатов — пары (вид, строки хранилища); прежние группы заменяются."""
+        self.store.set_duplicates(groups)
+        if self._spec is not None and self._spec.duplicates:
+            self._summary = None
+            self.beginResetModel()
+            self._mask = bytearray(self.filter_index.mask(self._spec))
+            self._rebuild_order()
+            self.endResetModel()
+        elif self.rowCount():
+            self.dataChanged.emit(self.index(0, DUPLICATES_COLUMN), self.index(self.rowCount() - 1, DUPLICATES_COLUMN))
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self._rows_by_path = None
+        self._summary = None
+        self._positions = None
+        self.filter_index.reset()
+        self._sorted = None
+        self._mask = None if self._spec is None else bytearray()
+        self._order = None if self._spec is None else array("I")
+        self.endResetModel()
+
+    def set_filter(self, spec: FilterSpec):
+        """Применить фильтр; пустой FilterSpec (или None) показывает все строки."""
+        if spec is not None and spec.is_empty():
+            spec = None
+        if spec == self._spec:
+            return
+        self.beginResetModel()
+        self._spec = spec
+        self._summary = None
+        mask = self.filter_index.mask(spec)
+        self._mask = None if mask is None else bytearray(mask)
+        self._rebuild_order()
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if not 0 <= column < len(COLUMNS):
+            return
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        kept = [self.store_row(i.row()) for i in persistent]
+        self._sorted = array("I", sorted(range(len(self.store)), key=_sort_key(self.store, column),
+                                         reverse=order == Qt.DescendingOrder))
+        self._rebuild_order()
+        if persistent:
+            position = array("I", bytes(4 * len(self.store)))
+            for i, r in enumerate(self._order):
+                position[r] = i
+            self.changePersistentIndexList(
+                persistent, [self.index(position[r], i.column()) for r, i in zip(kept, persistent)])
+        self.layoutChanged.emit()
+
+    def item_at(self, row: int) -> Dict[str, Any]:
+        return self.store.record(self.store_row(row))
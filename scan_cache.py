@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+from typing import Dict, Any, Optional
+
+from scan_levels import DEEP, level_covers
+
+DEFAULT_MAX_ENTRIES = 5_000_000
+_COMMIT_EVERY = 1000
+# PRAGMA user_version файла кэша; при несовпадении кэш создаётся заново
+SCHEMA_VERSION = 1
+
+
+def default_cache_path() -> str:
+    """Путь к файлу кэша в пользовательской cache-директории."""
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "image-inspector", "scan_cache.sqlite3")
+
+
+def _json_default(v):
+    # IFDRational и прочие числовые типы Pillow -> float, остальное -> str
+    try:
+        return float(v)
+    except Exception:
+        return str(v)
+
+
+def _key(path: str) -> bytes:
+    # путь с байтами не из UTF-8 приходит из os.scandir с суррогатами (surrogateescape) —
+    # sqlite3 такую строку не примет, поэтому ключ — байты имени в файловой системе
+    return os.fsencode(path)
+
+
+def _dumps(result: Dict[str, Any]) -> str:
+    # ensure_ascii: суррогаты в путях записываются как \udcXX и читаются обратно без потерь
+    return json.dumps(result, default=_json_default)
+
+
+def _loads(text: str, size: int) -> Dict[str, Any]:
+    result = json.loads(text)
+    # записи, сохранённые до появления поля size
+    result.setdefault("size", size)
+    return result
+
+
+class ScanCache:
+    """
+    Персистентный кэш результатов inspect_image в SQLite.
+    Запись считается актуальной, если совпадают путь, размер, mtime и inode.
+    Все методы должны вызываться из одного потока (потока сканирования).
+    """
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path or default_cache_path()
+        self.max_entries = max_entries
+        parent = os.path.dirname(self.db_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            # версия 0 хранила путь текстом
+            self._conn.execute("DROP TABLE IF EXISTS entries")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " path BLOB PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " inode INTEGER NOT NULL,"
+            " seen REAL NOT NULL,"
+            " result TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_seen ON entries(seen)")
+        self._conn.commit()
+        self._pending = 0
+        self._touched = []
+        self.hits = 0
+        self.misses = 0
+
+    def begin_scan(self) -> float:
+        """Отметка начала сканирования; возвращает метку времени для purge()."""
+        self.hits = 0
+        self.misses = 0
+        return time.time()
+
+    def lookup(self, path: str, st: os.stat_result, level: str = DEEP) -> Optional[Dict[str, Any]]:
+        """
+        Вернуть сохранённый результат, если файл не менялся и запись сделана
+        на уровне не ниже `level`, иначе None (промах).
+        """
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, inode, result FROM entries WHERE path = ?", (_key(path),)
+        ).fetchone()
+        if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns or row[2] != st.st_ino:
+            self.misses += 1
+            return None
+        result = _loads(row[3], row[0])
+        if not level_covers(result.get("level"), level):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touched.append(_key(path))
+        if len(self._touched) >= _COMMIT_EVERY:
+            self._flush_touched()
+        return result
+
+    def store(self, path: str, st: os.stat_result, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Сохранить результат для файла с данным stat. Возвращает результат в том виде,
+        в каком его вернёт lookup (после JSON: ключи словарей — строки, кортежи — списки,
+        IFDRational — float) — его и нужно отдавать дальше, чтобы свежий и взятый
+        из кэша результаты не различались.
+        """
+        text = _dumps(result)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries (path, size, mtime_ns, inode, seen, result)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (_key(path), st.st_size, st.st_mtime_ns, st.st_ino, time.time(), text),
+        )
+        self._pending += 1
+        if self._pending >= _COMMIT_EVERY:
+            self.commit()
+        return _loads(text, st.st_size)
+
+    def _flush_touched(self):
+        if self._touched:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE entries SET seen = ? WHERE path = ?", ((now, p) for p in self._touched)
+            )
+            self._touched = []
+
+    def commit(self):
+        self._flush_touched()
+        self._conn.commit()
+        self._pending = 0
+
+    def purge(self, root: str, started: float) -> int:
+        """
+        Удалить записи под `root`, которые не встречались с момента `started`
+        (файлы удалены или больше не подходят по расширению).
+        """
+        self._flush_touched()
+        prefix = _key(os.path.join(root, ""))
+        cur = self._conn.execute(
+            "DELETE FROM entries WHERE seen < ? AND substr(path, 1, ?) = ?",
+            (started, len(prefix), prefix),
+        )
+        self._conn.commit()
+        self._pending = 0
+        return cur.rowcount
+
+    def forget(self, paths) -> int:
+        """Удалить записи файлов paths (удалены во время слежения за папкой)."""
+        self._flush_touched()
+        cur = self._conn.executemany("DELETE FROM entries WHERE path = ?", ((_key(p),) for p in paths))
+        self._conn.commit()
+        self._pending = 0
+        return cur.rowcount
+
+    def evict(self) -> int:
+        """Ограничить размер кэша max_entries, удаляя давно не встречавшиеся записи."""
+        self._flush_touched()
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        extra = count - self.max_entries
+        if extra <= 0:
+            return 0
+        cur = self._conn.execute(
+            "DELETE FROM entries WHERE path IN"
+            " (SELECT path FROM entries ORDER BY seen ASC LIMIT ?)", (extra,)
+        )
+        self._conn.commit()
+        self._pending = 0
+        return cur.rowcount
+
+    def close(self):
+        try:
+            self.commit()
+        finally:
+            self._conn.close()
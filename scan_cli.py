@@ -0,0 +1,255 @@
+"""
+Консольный режим сканирования без GUI (PySide6 не импортируется):
+
+    python -m scanner ~/Pictures -o result.jsonl
+    python -m scanner /data/scans --format csv --ext tif,tiff --workers 16 --cache > scans.csv
+    python -m scanner /data/incoming --watch -o incoming.sqlite
+    python -m scanner /data/bundles --archives -o bundles.jsonl
+    python -m scanner /data/photos --shard 3/16 -o shard-03.jsonl.gz   # затем python -m result_merge
+
+Результаты пишутся по мере обработки (JSONL, CSV или SQLite), в памяти не копятся.
+Коды выхода: 0 — успешно, 1 — были ошибки чтения и задан --fail-on-error,
+2 — неверные аргументы, 130 — прервано (Ctrl+C; при --watch это обычное завершение — 0), 141 — читатель stdout закрыл канал
+(например, `| head`).
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from scanner import ScanEmitter, scan_folder, ENGINES, IMAGE_EXTS
+from autotune import default_tuner
+from formats_info import LEVELS, DEEP
+from folder_watch import WATCH_BACKENDS, DEBOUNCE, watch_folder
+from result_writers import WRITER_FORMATS, open_writer, writer_format
+from sharding import ShardSpec
+
+EXIT_OK = 0
+EXIT_FILE_ERRORS = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+EXIT_BROKEN_PIPE = 141
+
+
+def _parse_exts(values):
+    exts = set()
+    for value in values:
+        for e in value.split(","):
+            e = e.strip().lower()
+            if e:
+                exts.add(e if e.startswith(".") else "." + e)
+    return exts
+
+
+def _workers(value):
+    if value == "auto":
+        return 0
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается число или auto: {value!r}")
+    if n < 1:
+        raise argparse.ArgumentTypeError("должно быть >= 1 или auto")
+    return n
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="python -m scanner",
+        description="Сканирование папки с изображениями без GUI, вывод в JSONL, CSV или SQLite.")
+    p.add_argument("folder", help="папка для рекурсивного сканирования")
+    p.add_argument("-o", "--output", default="-",
+                   help="файл результата (по умолчанию stdout)")
+    p.add_argument("-f", "--format", choices=WRITER_FORMATS,
+                   help="формат вывода (по умолчанию по расширению -o: .csv, .sqlite/.db, иначе jsonl)")
+    p.add_argument("-w", "--workers", type=_workers, default=0, metavar="N|auto",
+                   help="число потоков/процессов; auto (по умолчанию) — подбирать по скорости во время сканирования")
+    p.add_argument("--min-workers", type=int, default=1, metavar="N",
+                   help="нижний предел автоподбора")
+    p.add_argument("--max-workers", type=int, metavar="N",
+                   help="верхний предел автоподбора (по умолчанию 128 потоков или число CPU для процессов)")
+    p.add_argument("--level", choices=LEVELS, default=DEEP,
+                   help="уровень сканирования: basic — формат, размер, глубина; standard — + DPI и сжатие; "
+                        "deep — + EXIF, квантование, кадры GIF (по умолчанию)")
+    p.add_argument("--engine", choices=ENGINES, default="thread",
+                   help="движок: потоки или пул процессов")
+    p.add_argument("--ext", action="append", default=[], metavar="EXT[,EXT...]",
+                   help="расширения файлов (по умолчанию: %s)" % ",".join(sorted(IMAGE_EXTS)))
+    p.add_argument("--archives", action="store_true",
+                   help="сканировать изображения внутри ZIP/TAR-архивов без распаковки "
+                        "(пути вида bundle.zip!/a/b.jpg)")
+    p.add_argument("--shard", metavar="I/N",
+                   help="сканировать только шард I из N (по хэшу подпапок верхнего уровня) — для запуска "
+                        "нескольких процессов или машин; выходы сливает python -m result_merge")
+    p.add_argument("--shard-depth", type=int, default=1, metavar="D",
+                   help="шарды делятся по первым D уровням подпапок (по умолчанию %(default)s; больше — "
+                        "ровнее, если подпапок верхнего уровня мало)")
+    p.add_argument("--cache", action="store_true",
+                   help="использовать кэш результатов в пользовательской cache-директории")
+    p.add_argument("--cache-path", metavar="PATH",
+                   help="использовать кэш результатов в файле PATH")
+    p.add_argument("--watch", action="store_true",
+                   help="после сканирования следить за папкой и дописывать изменения (до Ctrl+C); "
+                        "в JSONL удаление файла — строка {\"path\": ..., \"removed\": true}, "
+                        "SQLite остаётся снимком папки; CSV не поддерживается")
+    p.add_argument("--watch-backend", choices=WATCH_BACKENDS, default="auto",
+                   help="источник изменений: inotify (Linux) или периодический обход; auto — inotify, если доступен")
+    p.add_argument("--debounce", type=float, default=DEBOUNCE, metavar="SEC",
+                   help="пауза без событий перед обработкой пачки изменений (по умолчанию %(default)s с)")
+    p.add_argument("--fail-on-error", action="store_true",
+                   help="код выхода 1, если хотя бы один файл не удалось прочитать")
+    p.add_argument("--progress", action="store_true",
+                   help="печатать прогресс в stderr")
+    p.add_argument("--stats", action="store_true",
+                   help="замерить этапы и напечатать статистику в stderr")
+    p.add_argument("--summary", action="store_true",
+                   help="напечатать в stderr сводку по результатам: форматы и объём, глубина, DPI, "
+                        "мегапиксели, крупнейшие изображения, каталоги с ошибками")
+    p.add_argument("--profile", metavar="PATH",
+                   help="сохранить профиль cProfile (pstats) в PATH")
+    return p
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.folder):
+        parser.print_usage(sys.stderr)
+        print(f"{parser.prog}: ошибка: папка не найдена: {args.folder}", file=sys.stderr)
+        return EXIT_USAGE
+    tuner = None
+    if not args.workers:
+        try:
+            tuner = default_tuner(args.engine, args.max_workers, args.min_workers)
+        except ValueError as e:
+            parser.error(str(e))
+    exts = _parse_exts(args.ext) or IMAGE_EXTS
+    if args.watch and (args.format or writer_format(args.output)) == "csv":
+        parser.error("--watch: CSV не поддерживает удаление записей, используйте jsonl или sqlite")
+    shard = None
+    if args.shard:
+        if args.watch:
+            parser.error("--watch и --shard несовместимы")
+        try:
+            shard = ShardSpec.parse(args.shard, args.shard_depth)
+        except ValueError as e:
+            parser.error(f"--shard: {e}")
+
+    cache = None
+    if args.cache or args.cache_path:
+        from scan_cache import ScanCache
+        try:
+            cache = ScanCache(args.cache_path)
+        except Exception as e:
+            print("Кэш сканирования недоступен:", e, file=sys.stderr)
+
+    try:
+        writer = open_writer(args.output, args.format)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"{parser.prog}: ошибка: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    started = time.monotonic()
+    emitter = ScanEmitter()
+    broken_pipe = []
+
+    watching = []
+
+    def guarded(method, *a):
+        if broken_pipe:
+            return
+        try:
+            method(*a)
+        except BrokenPipeError:
+            broken_pipe.append(True)
+            emitter.cancel()
+
+    def write(items):
+        # после начального сканирования приходят изменения уже записанных файлов
+        guarded(writer.update if watching else writer.write, items)
+
+    def on_watching(backend):
+        watching.append(backend)
+        if args.progress:
+            print(file=sys.stderr)
+        print(f"Слежение за изменениями ({backend}), Ctrl+C — остановить", file=sys.stderr, flush=True)
+
+    emitter.on_items = write
+    emitter.on_removed = lambda paths: guarded(writer.remove, paths)
+    emitter.on_watching = on_watching
+    if args.progress:
+        emitter.on_progress = lambda done, found: print(
+            f"\rОбработано {done}, найдено {found}", end="", file=sys.stderr, flush=True)
+
+    stats = None
+    if args.stats:
+        from scan_stats import ScanStats
+        stats = ScanStats()
+    summary = None
+    if args.summary:
+        from scan_summary import ScanSummary
+        summary = ScanSummary()
+
+    # сканирование — в отдельном потоке, чтобы Ctrl+C в главном потоке отменял его
+    failure = []
+
+    def run():
+        try:
+            kwargs = dict(cache=cache, engine=args.engine, exts=exts, stats=stats,
+                          profile_path=args.profile, tuner=tuner, level=args.level, archives=args.archives,
+                          summary=summary)
+            if shard is not None:
+                kwargs["shard"] = shard
+            if args.watch:
+                watch_folder(args.folder, emitter, args.workers, backend=args.watch_backend,
+                             debounce=args.debounce, **kwargs)
+            else:
+                scan_folder(args.folder, emitter, args.workers, **kwargs)
+        except BaseException as e:
+            failure.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    interrupted = False
+    try:
+        while thread.is_alive():
+            thread.join(0.2)
+    except KeyboardInterrupt:
+        interrupted = True
+        emitter.cancel()
+        thread.join()
+    finally:
+        if cache is not None:
+            cache.close()
+        if broken_pipe:
+            # stdout больше никто не читает: дальнейший flush тоже упал бы с BrokenPipeError
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+        writer.close()
+
+    if args.progress:
+        print(file=sys.stderr)
+    if failure:
+        raise failure[0]
+    print((f"Шард {shard}: " if shard is not None else "") + f"Файлов: {writer.count}, ошибок: {writer.errors}, "
+          f"время: {time.monotonic() - started:.2f} с"
+          + (f", {tuner.summary()}" if tuner is not None else ""), file=sys.stderr)
+    if stats is not None:
+        from scan_stats import format_stats
+        print(format_stats(stats.snapshot(final=True)), file=sys.stderr)
+    if summary is not None:
+        from scan_summary import format_summary
+        print(format_summary(summary.snapshot(final=True)), file=sys.stderr)
+    if broken_pipe:
+        return EXIT_BROKEN_PIPE
+    if interrupted and not watching:
+        # слежение останавливается только Ctrl+C — это обычное завершение
+        return EXIT_INTERRUPTED
+    if args.fail_on_error and writer.errors:
+        return EXIT_FILE_ERRORS
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
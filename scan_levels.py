@@ -0,0 +1,15 @@
+"""
+Уровни inspect_image (formats_info) отдельно от него: модуль без Pillow, чтобы
+GUI мог построить окно, не дожидаясь импорта PIL и сканера.
+"""
+from typing import Optional
+
+# Каждый следующий уровень включает предыдущий
+BASIC, STANDARD, DEEP = "basic", "standard", "deep"
+LEVELS = (BASIC, STANDARD, DEEP)
+_LEVEL_RANK = {level: i for i, level in enumerate(LEVELS)}
+
+
+def level_covers(have: Optional[str], want: str) -> bool:
+    """Достаточно ли записи уровня have для уровня want (None — запись без уровня, т.е. полная)."""
+    return _LEVEL_RANK[have or DEEP] >= _LEVEL_RANK[want]
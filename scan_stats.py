@@ -0,0 +1,161 @@
+import heapq
+import time
+from typing import Dict, Any, List, Optional
+
+# Этапы в порядке вывода: обход каталогов, кэш, затем этапы inspect_image
+STAGES = ("walk", "cache", "open", "dpi", "compression", "additional", "exif", "inspect")
+STAGE_TITLES = {
+    "walk": "обход каталогов",
+    "cache": "кэш (поиск/запись)",
+    "open": "открытие/заголовок",
+    "dpi": "get_dpi",
+    "compression": "get_compression_info",
+    "additional": "get_additional_info",
+    "exif": "  в т.ч. getexif",
+    "inspect": "inspect_image всего",
+    "gui": "GUI (добавление в таблицу)",
+}
+SLOWEST_N = 10
+
+
+class CountingFile:
+    """Обёртка файла, считающая прочитанные байты (для статистики inspect_image)."""
+    def __init__(self, f):
+        self._f = f
+        self.bytes_read = 0
+
+    def read(self, n=-1):
+        data = self._f.read(n)
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, b):
+        n = self._f.readinto(b)
+        self.bytes_read += n or 0
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+class ScanStats:
+    """
+    Сводная статистика сканирования: суммарное время и число вызовов по этапам,
+    прочитанные байты, число файлов и ошибок по форматам, самые медленные файлы.
+    Наполняется в потоке сканирования; snapshot() отдаёт копию в виде словаря.
+    """
+    def __init__(self, slowest_n: int = SLOWEST_N):
+        self.started = time.monotonic()
+        self.stage_ns: Dict[str, int] = {}
+        self.stage_calls: Dict[str, int] = {}
+        self.bytes_read = 0
+        self.files = 0
+        self.fast_path = 0
+        self.cache_hits = 0
+        self.workers = None  # число worker-ов (при автоподборе — выбранное)
+        self.formats: Dict[str, int] = {}
+        self.format_errors: Dict[str, int] = {}
+        self.slowest_n = slowest_n
+        self._slowest: List[tuple] = []  # min-heap (inspect_ns, path)
+
+    def add_stage(self, stage: str, ns: int, calls: int = 1):
+        self.stage_ns[stage] = self.stage_ns.get(stage, 0) + ns
+        self.stage_calls[stage] = self.stage_calls.get(stage, 0) + calls
+
+    def add_file(self, result: Dict[str, Any], timings: Optional[Dict[str, Any]] = None):
+        """Учесть результат inspect_image (timings — этапы из inspect_image(..., timings=))."""
+        self.files += 1
+        fmt = result.get("format")
+        if not fmt:
+            path = result.get("path", "")
+            fmt = path.rsplit(".", 1)[-1].upper() if "." in path else "?"
+        self.formats[fmt] = self.formats.get(fmt, 0) + 1
+        if result.get("error"):
+            self.format_errors[fmt] = self.format_errors.get(fmt, 0) + 1
+        if timings is None:
+            self.cache_hits += 1
+            return
+        for stage, ns in timings.items():
+            if stage in STAGE_TITLES:
+                self.add_stage(stage, ns)
+        self.bytes_read += timings.get("bytes", 0)
+        self.fast_path += 1 if timings.get("fast") else 0
+        entry = (timings.get("inspect", 0), result.get("path", ""))
+        if len(self._slowest) < self.slowest_n:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def snapshot(self, final: bool = False) -> Dict[str, Any]:
+        return {
+            "final": final,
+            "elapsed_s": time.monotonic() - self.started,
+            "files": self.files,
+            "cache_hits": self.cache_hits,
+            "fast_path": self.fast_path,
+            "bytes_read": self.bytes_read,
+            "workers": self.workers,
+            "stages": {k: {"ms": self.stage_ns[k] / 1e6, "calls": self.stage_calls.get(k, 0)}
+                       for k in self.stage_ns},
+            "formats": dict(self.formats),
+            "format_errors": dict(self.format_errors),
+            "slowest": [{"path": p, "ms": ns / 1e6} for ns, p in sorted(self._slowest, reverse=True)],
+        }
+
+
+def format_stats(snap: Dict[str, Any]) -> str:
+    """Текстовая сводка snapshot() для панели GUI и консоли."""
+    lines = [f"Файлов: {snap['files']} за {snap['elapsed_s']:.2f} с "
+             f"({snap['files'] / max(snap['elapsed_s'], 1e-9):.0f}/с), "
+             f"из кэша: {snap['cache_hits']}, быстрый разбор заголовка: {snap['fast_path']}, "
+             f"прочитано: {snap['bytes_read'] / 2**20:.1f} MiB"]
+    if snap.get("workers"):
+        lines[0] += f", worker-ов: {snap['workers']}"
+    lines.append("Этапы (суммарно по всем worker-ам):")
+    for stage in STAGES + ("gui",):
+        s = snap["stages"].get(stage)
+        if s:
+            per = s["ms"] * 1000 / max(s["calls"], 1)
+            lines.append(f"  {STAGE_TITLES[stage]:<28} {s['ms']:10.1f} мс  {per:8.0f} мкс/вызов")
+    lines.append("Форматы (файлов / ошибок):")
+    for fmt, n in sorted(snap["formats"].items(), key=lambda kv: -kv[1]):
+        err = snap["format_errors"].get(fmt, 0)
+        lines.append(f"  {fmt:<6} {n:8d} / {err:<6d} ({err * 100 / n:.1f}% ошибок)")
+    if snap["slowest"]:
+        lines.append("Самые медленные файлы:")
+        for s in snap["slowest"]:
+            lines.append(f"  {s['ms']:8.1f} мс  {s['path']}")
+    return "\n".join(lines)
+
+
+class _ProfileData:
+    """Готовые данные cProfile (словарь Profile.stats) для pstats.Stats.add()."""
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProfileAccumulator:
+    """Сумма профилей cProfile (поток сканирования + пачки worker-ов) для одного pstats-файла."""
+    def __init__(self):
+        self._stats = None
+
+    def add(self, stats: dict):
+        import pstats  # только при профилировании: модуль заметно замедляет старт CLI
+        data = _ProfileData(stats)
+        if self._stats is None:
+            self._stats = pstats.Stats(data)
+        else:
+            self._stats.add(data)
+
+    def dump(self, path: str):
+        if self._stats is not None:
+            self._stats.dump_stats(path)
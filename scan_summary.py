@@ -0,0 +1,219 @@
+"""
+Сводка по результатам сканирования вместо выгрузки в CSV и подсчёта в pandas:
+число файлов и байт по форматам, распределение глубины цвета, гистограмма DPI,
+сумма мегапикселей, крупнейшие изображения и ошибки по каталогам.
+
+ScanSummary пополняется по одному результату за O(1) (крупнейшие — куча из top_k,
+каталогов — не больше max_dirs, остальные копятся под OTHER_DIRS), так что память
+ограничена; его ведёт scan_folder (emitter.on_summary, scan_folder(..., summary=)).
+summarize_store собирает такой же ScanSummary по строкам ResultStore под маской
+фильтра — по колонкам хранилища через itertools.compress / collections.Counter, т.е.
+в основном в C, без сборки записей; дальше новые строки добавляются add() по одной
+(ResultsModel.summary).
+"""
+import os
+import heapq
+import math
+import operator
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import compress
+from typing import Any, Dict, List, Optional
+
+TOP_K = 10
+TOP_DIRS = 10
+MAX_DIRS = 10000
+OTHER_DIRS = "(остальные каталоги)"
+# Границы корзин гистограммы DPI (по оси X): <72, 72–95, 96–149, ..., ≥1200, и «нет DPI»
+DPI_EDGES = (72, 96, 150, 200, 300, 600, 1200)
+NO_DPI = len(DPI_EDGES) + 1
+
+
+def dpi_labels() -> List[str]:
+    labels = [f"<{DPI_EDGES[0]}"]
+    labels += [f"{lo}–{hi - 1}" for lo, hi in zip(DPI_EDGES, DPI_EDGES[1:])]
+    labels += [f"≥{DPI_EDGES[-1]}", "нет"]
+    return labels
+
+
+def _dpi_bucket(value) -> int:
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return NO_DPI
+    return NO_DPI if math.isnan(v) else bisect_right(DPI_EDGES, v)
+
+
+class ScanSummary:
+    """
+    Сводка, пополняемая результатами inspect_image по мере их поступления (add()).
+    Наполняется в одном потоке (потоке сканирования); snapshot() отдаёт копию в виде словаря.
+    """
+    def __init__(self, top_k: int = TOP_K, max_dirs: int = MAX_DIRS):
+        self.top_k = top_k
+        self.max_dirs = max_dirs
+        self.files = 0
+        self.errors = 0
+        self.bytes = 0
+        self.pixels = 0
+        self.formats: Dict[Any, List[int]] = {}  # формат -> [файлов, байт]
+        self.depths: Dict[int, int] = {}
+        self.dpi = [0] * (NO_DPI + 1)
+        self.dirs: Dict[str, List[int]] = {}     # каталог -> [файлов, ошибок]
+        self._largest: List[tuple] = []          # min-heap (пикселей, путь, ширина, высота)
+
+    def add(self, result: Dict[str, Any]):
+        """Учесть результат inspect_image."""
+        self.files += 1
+        size = result.get("size") or 0
+        self.bytes += size
+        path = result.get("path", "")
+        d = os.path.dirname(path)
+        counts = self.dirs.get(d)
+        if counts is None:
+            if len(self.dirs) < self.max_dirs:
+                counts = self.dirs[d] = [0, 0]
+            else:
+                counts = self.dirs.setdefault(OTHER_DIRS, [0, 0])
+        counts[0] += 1
+        if result.get("error"):
+            self.errors += 1
+            counts[1] += 1
+            return
+        fmt = self.formats.get(result.get("format"))
+        if fmt is None:
+            fmt = self.formats[result.get("format")] = [0, 0]
+        fmt[0] += 1
+        fmt[1] += size
+        depth = result.get("depth")
+        if depth is not None:
+            self.depths[depth] = self.depths.get(depth, 0) + 1
+        self.dpi[_dpi_bucket(result.get("dpi_x"))] += 1
+        w, h = result.get("width"), result.get("height")
+        if w and h and w > 0 and h > 0:
+            pixels = w * h
+            self.pixels += pixels
+            entry = (pixels, path, w, h)
+            if len(self._largest) < self.top_k:
+                heapq.heappush(self._largest, entry)
+            elif entry > self._largest[0]:
+                heapq.heapreplace(self._largest, entry)
+
+    def snapshot(self, final: bool = False) -> Dict[str, Any]:
+        error_dirs = ((d, f, e) for d, (f, e) in self.dirs.items() if e)
+        return {
+            "final": final,
+            "files": self.files,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "megapixels": self.pixels / 1e6,
+            "formats": {str(fmt): {"files": n, "bytes": b}
+                        for fmt, (n, b) in sorted(self.formats.items(), key=lambda kv: (-kv[1][0], str(kv[0])))},
+            "depths": dict(sorted((d, n) for d, n in self.depths.items() if d >= 0 and n)),
+            "dpi": {label: n for label, n in zip(dpi_labels(), self.dpi) if n},
+            "largest": [{"path": p, "width": w, "height": h, "megapixels": px / 1e6}
+                        for px, p, w, h in sorted(self._largest, reverse=True)],
+            # сначала больше ошибок, при равенстве — больше их доля
+            "error_dirs": [{"dir": d, "files": f, "errors": e}
+                           for d, f, e in heapq.nlargest(TOP_DIRS, error_dirs, key=lambda t: (t[2], t[2] / t[1]))],
+        }
+
+
+def _and(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, "little") & int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+
+def _sum_present(values) -> int:
+    """Сумма без значений -1 («нет данных» в колонках хранилища)."""
+    values = array("q", values)
+    return sum(values) + operator.countOf(values, -1)
+
+
+def summarize_store(store, mask: Optional[bytes] = None, index=None, top_k: int = TOP_K) -> ScanSummary:
+    """
+    ScanSummary по строкам result_store.ResultStore, отмеченным в mask (байт 0/1
+    на строку, как FilterIndex.mask; None — все строки без удалённых); дальше его
+    можно пополнять add() новыми строками. index — FilterIndex этого хранилища:
+    его маски по формату и глубине избавляют от подсчёта по колонкам.
+    """
+    n = len(store)
+    if mask is None:
+        mask = bytearray(b"\x01") * n
+        for r in store.removed:
+            mask[r] = 0
+    mask = bytes(mask[:n])
+    errors_mask = bytearray(n)
+    for r in store.errors:
+        errors_mask[r] = 1
+    # строки с метаданными: есть формат и нет ошибки
+    has_format = bytes(map(bool, store.codes["format"]))
+    ok = _and(_and(mask, has_format), bytes(errors_mask).translate(bytes.maketrans(b"\x00\x01", b"\x01\x00")))
+
+    summary = ScanSummary(top_k, max(MAX_DIRS, len(store.dirs)))
+    summary.files = mask.count(1)
+    summary.bytes = _sum_present(compress(store.size, mask))
+    pool = store.pools["format"]
+    if index is not None:
+        by_format = index.keyed_masks("format")
+        summary.depths = {d: _and(ok, bytes(m)).count(1) for d, m in index.keyed_masks("depth").items()}
+    else:
+        codes = store.codes["format"]
+        by_format = {code: bytes(map(code.__eq__, codes)) for code in range(1, len(pool))}
+        summary.depths = dict(Counter(compress(store.depth, ok)))
+    for code, in_format in by_format.items():
+        in_format = _and(ok, bytes(in_format))
+        count = in_format.count(1)
+        if count:
+            summary.formats[pool.values[code]] = [count, _sum_present(compress(store.size, in_format))]
+
+    dpi_values = array("d", compress(store.dpi_x, ok))
+    # без NaN («нет DPI»: NaN != NaN), по возрастанию — границы корзин находятся бинарным поиском
+    present = sorted(compress(dpi_values, map(operator.eq, dpi_values, dpi_values)))
+    bounds = [0] + [bisect_left(present, edge) for edge in DPI_EDGES] + [len(present)]
+    summary.dpi = [hi - lo for lo, hi in zip(bounds, bounds[1:])] + [len(dpi_values) - len(present)]
+
+    pixels = array("q", map(operator.mul, compress(store.width, ok), compress(store.height, ok)))
+    summary.pixels = sum(pixels)
+    summary._largest = [(px, store.path(r), store.width[r], store.height[r])
+                        for px, r in heapq.nlargest(top_k, zip(pixels, compress(range(n), ok)))]
+    heapq.heapify(summary._largest)
+
+    # ошибки разрежены (ResultStore.errors) — их можно перебрать
+    dir_errors = Counter(store.dir_codes[r] for r in store.errors if mask[r])
+    summary.errors = sum(dir_errors.values())
+    summary.dirs = {store.dirs.values[code]: [files, dir_errors.get(code, 0)]
+                    for code, files in Counter(compress(store.dir_codes, mask)).items()}
+    return summary
+
+
+def _human_bytes(n: int) -> str:
+    for unit in ("Б", "КБ", "МБ", "ГБ"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "Б" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} ТБ"
+
+
+def format_summary(snap: Dict[str, Any]) -> str:
+    """Текстовая сводка snapshot() / summarize_store() для панели GUI и консоли."""
+    files = snap["files"]
+    lines = [f"Файлов: {files}, {_human_bytes(snap['bytes'])}, {snap['megapixels']:.1f} Мпикс, "
+             f"ошибок: {snap['errors']} ({snap['errors'] * 100 / max(files, 1):.1f}%)"]
+    if snap["formats"]:
+        lines.append("Форматы (файлов / объём):")
+        for fmt, v in snap["formats"].items():
+            lines.append(f"  {fmt:<6} {v['files']:8d} / {_human_bytes(v['bytes'])}")
+    if snap["depths"]:
+        lines.append("Глубина: " + ", ".join(f"{d} бит — {n}" for d, n in snap["depths"].items()))
+    if snap["dpi"]:
+        lines.append("DPI: " + ", ".join(f"{label} — {n}" for label, n in snap["dpi"].items()))
+    if snap["largest"]:
+        lines.append("Крупнейшие изображения:")
+        for item in snap["largest"]:
+            lines.append(f"  {item['megapixels']:8.2f} Мпикс  {item['width']}×{item['height']}  {item['path']}")
+    if snap["error_dirs"]:
+        lines.append("Каталоги с ошибками (ошибок / файлов):")
+        for d in snap["error_dirs"]:
+            lines.append(f"  {d['errors']:6d} / {d['files']:<6d} ({d['errors'] * 100 / d['files']:.0f}%)  {d['dir']}")
+    return "\n".join(lines)
@@ -1,17 +1,50 @@
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from formats_info import inspect_image
+import time
+import queue
+import cProfile
+import multiprocessing
+from time import perf_counter_ns
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from formats_info import inspect_image, LEVELS, DEEP
+from scan_stats import ScanStats, ProfileAccumulator
+from scan_summary import ScanSummary
+from autotune import ConcurrencyTuner
+from archives import is_archive, iter_members, ARCHIVE_ERRORS
+from io import BytesIO
 import threading
 
+ENGINES = ("thread", "process")
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.gif', '.tif', '.tiff', '.bmp', '.pcx'}
+PROCESS_CHUNK_SIZE = 32
+DISCOVERY_QUEUE_SIZE = 10000
+_POLL_INTERVAL = 0.05
+STATS_INTERVAL = 0.5
+_WALK_DONE = object()
+_TIFF_MAGIC = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")
+_GIF_MAGIC = (b"GIF87a", b"GIF89a")
+
 class ScanEmitter:
     """
     Простейший emitter API: заполняется callback-ами извне.
     Используется для передачи результатов обратно в GUI thread.
+    Если задан on_items, результаты копятся и отдаются пачками — при накоплении
+    batch_size элементов или раз в batch_interval секунд; on_progress в этом режиме
+    вызывается тогда же, с последним значением (а on_item не вызывается).
     """
-    def __init__(self):
+    def __init__(self, batch_size: int = 500, batch_interval: float = 0.05):
         self.on_item = None      # callback(item_dict)
-        self.on_progress = None  # callback(processed, total)
+        self.on_items = None     # callback(list_of_item_dicts)
+        self.on_progress = None  # callback(processed, discovered) — discovered растёт, пока идёт обход
         self.on_finished = None  # callback()
+        self.on_stats = None     # callback(snapshot) — статистика этапов (scan_stats), последний вызов с final=True
+        self.on_watching = None  # callback(backend) — начальное сканирование завершено, идёт слежение (folder_watch)
+        self.on_removed = None   # callback(list_of_paths) — файлы удалены (режим слежения)
+        self.on_summary = None   # callback(snapshot) — сводка по результатам (scan_summary), последний вызов с final=True
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._batch = []
+        self._progress = None
+        self._last_flush = time.monotonic()
         self._cancel_event = threading.Event()
 
     def cancel(self):
@@ -20,37 +53,441 @@ class ScanEmitter:
     def cancelled(self):
         return self._cancel_event.is_set()
 
-def scan_folder(path: str, emitter: ScanEmitter, max_workers: int = 6):
-    """
-    Сканирует рекурсивно папку `path` и вызывает emitter.on_item для каждого обработанного файла.
-    Поддерживает простую отмену через emitter.cancel().
-    """
-    exts = {'.jpg', '.jpeg', '.png', '.gif', '.tif', '.tiff', '.bmp', '.pcx'}
-    file_list = []
-    for root, dirs, files in os.walk(path):
-        for f in files:
-            _, e = os.path.splitext(f)
-            if e.lower() in exts:
-                file_list.append(os.path.join(root, f))
-    total = len(file_list)
-    if emitter.on_progress:
-        emitter.on_progress(0, total)
-
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        future_to_path = {ex.submit(inspect_image, p): p for p in file_list}
-        processed = 0
-        for future in as_completed(future_to_path):
-            if emitter.cancelled():
-                break
-            p = future_to_path[future]
+    # Методы ниже вызываются сканером из одного (его) потока
+
+    def emit_item(self, item):
+        if self.on_items is None:
+            if self.on_item:
+                self.on_item(item)
+            return
+        self._batch.append(item)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def emit_progress(self, processed, discovered):
+        if self.on_items is None:
+            if self.on_progress:
+                self.on_progress(processed, discovered)
+            return
+        self._progress = (processed, discovered)
+        self.poll()
+
+    def poll(self):
+        """Сбросить накопленное, если с прошлой отправки прошло batch_interval."""
+        if time.monotonic() - self._last_flush >= self.batch_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self.on_items(batch)
+        if self._progress is not None:
+            progress, self._progress = self._progress, None
+            if self.on_progress:
+                self.on_progress(*progress)
+
+    def emit_stats(self, snapshot):
+        if self.on_stats:
+            self.on_stats(snapshot)
+
+    def emit_summary(self, snapshot):
+        if self.on_summary:
+            self.on_summary(snapshot)
+
+    def emit_watching(self, backend):
+        self.flush()
+        if self.on_watching:
+            self.on_watching(backend)
+
+    def emit_removed(self, paths):
+        # результаты, полученные раньше удаления, уходят первыми
+        self.flush()
+        if self.on_removed:
+            self.on_removed(paths)
+
+    def emit_finished(self):
+        self.flush()
+        if self.on_finished:
+            self.on_finished()
+
+def inspect_chunk(paths, timed=False, profile=False, level=DEEP, archive_exts=None):
+    """
+    Выполняется в пуле (в т.ч. в дочернем процессе): inspect_image уровня level для пачки файлов.
+    timed=True — вместо результатов пары (результат, timings); profile=True — кортеж
+    (результаты, данные cProfile или None, если профилировщик уже занят).
+    archive_exts — архивы среди paths разворачиваются в результаты своих членов
+    с этими расширениями (inspect_archive).
+    """
+    if profile:
+        pr = cProfile.Profile()
+        try:
+            pr.enable()
+        except ValueError:
+            # в 3.12+ профилировщик один на процесс и уже включён в потоке сканирования
+            return inspect_chunk(paths, timed, level=level, archive_exts=archive_exts), None
+        try:
+            results = inspect_chunk(paths, timed, level=level, archive_exts=archive_exts)
+        finally:
+            pr.disable()
+        pr.create_stats()
+        return results, pr.stats
+    out = []
+    for p in paths:
+        if archive_exts is not None and is_archive(p):
+            out.extend(inspect_archive(p, archive_exts, timed, level))
+        elif timed:
+            timings = {}
+            out.append((inspect_image(p, timings=timings, level=level), timings))
+        else:
+            out.append(inspect_image(p, level=level))
+    return out
+
+def _gated_chunk(gate, paths, timed=False, profile=False, level=DEEP, archive_exts=None):
+    """inspect_chunk под ConcurrencyGate автоподбора (движок потоков); возвращает (результаты, время в работе)."""
+    with gate:
+        t = time.monotonic()
+        results = inspect_chunk(paths, timed, profile, level, archive_exts)
+        return results, time.monotonic() - t
+
+def _inspect_member(member, timed, level):
+    timings = {} if timed else None
+    if member.error:
+        result = {"path": member.path, "filename": member.path.split("/")[-1], "error": member.error}
+        return (result, {}) if timed else result
+    try:
+        data = member.read_head()
+        # страницы TIFF и кадры GIF (deep) разбросаны по всему файлу — такой член читается целиком
+        if not member.complete and (data[:4] in _TIFF_MAGIC or (level == DEEP and data[:6] in _GIF_MAGIC)):
+            data = member.read_all()
+        result = inspect_image(member.path, timings=timings, level=level, fp=BytesIO(data))
+        if result.get("error") and not member.complete:
+            # заголовок не уместился в прочитанное начало
+            timings = {} if timed else None
+            result = inspect_image(member.path, timings=timings, level=level, fp=BytesIO(member.read_all()))
+        result["size"] = member.size
+    except ARCHIVE_ERRORS as e:
+        result = {"path": member.path, "filename": member.path.split("/")[-1], "error": str(e)}
+        timings = {} if timed else None
+    return (result, timings) if timed else result
+
+def inspect_archive(archive: str, exts=IMAGE_EXTS, timed=False, level=DEEP):
+    """
+    inspect_image для членов архива (archives.iter_members) в порядке хранения:
+    у каждого читается только начало (archives.HEADER_BYTES), целиком — если заголовка
+    не хватило, а также TIFF и GIF на уровне deep. Результаты — с виртуальными путями
+    «архив!/член»; повреждённый архив даёт в конце запись с ошибкой для самого архива.
+    timed=True — пары (результат, timings), как у inspect_chunk.
+    """
+    out = []
+    try:
+        for member in iter_members(archive, exts):
+            out.append(_inspect_member(member, timed, level))
+    except ARCHIVE_ERRORS as e:
+        result = {"path": archive, "filename": os.path.basename(archive), "error": str(e)}
+        out.append((result, {}) if timed else result)
+    return out
+
+def iter_image_files(path: str, exts=IMAGE_EXTS, with_stat: bool = False, stop=None, archives: bool = False,
+                     shard=None):
+    """
+    Рекурсивный обход через os.scandir; отдаёт (путь, stat или None) по мере нахождения.
+    Недоступные каталоги пропускаются, как в os.walk. archives=True — отдавать и
+    архивы ZIP/TAR (archives.ARCHIVE_SUFFIXES).
+    shard (sharding.ShardSpec) — только файлы этого шарда; каталоги чужих шардов не открываются.
+    """
+    # (каталог, глубина от path, относительный путь — только пока глубина меньше shard.depth)
+    stack = [(path, 0, "")]
+    while stack:
+        if stop is not None and stop():
+            return
+        d, level, rel = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        subdirs = []
+        keyed = shard is not None and level < shard.depth
+        with it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                key = ""
+                if keyed:
+                    key = f"{rel}/{entry.name}" if rel else entry.name
+                    # ключ шарда — каталог на глубине shard.depth или файл выше неё
+                    if (not is_dir or level + 1 == shard.depth) and not shard.owns(key):
+                        continue
+                if is_dir:
+                    subdirs.append((entry.path, level + 1, key))
+                    continue
+                _, e = os.path.splitext(entry.name)
+                if e.lower() not in exts and not (archives and is_archive(entry.name)):
+                    continue
+                st = None
+                if with_stat:
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        pass
+                yield entry.path, st
+        # обратный порядок, чтобы каталоги обходились в порядке scandir
+        stack.extend(reversed(subdirs))
+
+def _walk_into_queue(path, q, with_stat, stop, exts=IMAGE_EXTS, stats=None, archives=False, shard=None):
+    t = perf_counter_ns() if stats is not None else 0
+    try:
+        for item in iter_image_files(path, exts, with_stat=with_stat, stop=stop, archives=archives, shard=shard):
+            if stats is not None:
+                # время обхода без ожидания места в очереди
+                stats.add_stage("walk", perf_counter_ns() - t)
+            while True:
+                try:
+                    q.put(item, timeout=_POLL_INTERVAL)
+                    break
+                except queue.Full:
+                    if stop():
+                        return
+            if stats is not None:
+                t = perf_counter_ns()
+    finally:
+        while not stop():
             try:
-                result = future.result()
-            except Exception as e:
-                result = {"path": p, "error": str(e)}
-            processed += 1
-            if emitter.on_item:
-                emitter.on_item(result)
-            if emitter.on_progress:
-                emitter.on_progress(processed, total)
-    if emitter.on_finished:
-        emitter.on_finished()
+                q.put(_WALK_DONE, timeout=_POLL_INTERVAL)
+                break
+            except queue.Full:
+                pass
+
+def _make_executor(engine, max_workers):
+    if engine == "process":
+        # spawn: без fork из процесса с Qt-потоками, одинаково на всех ОС и в PyInstaller-сборке
+        ctx = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx)
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+def scan_folder(path: str, emitter: ScanEmitter, max_workers: int = 6, cache=None, engine: str = "thread",
+                chunk_size: int = PROCESS_CHUNK_SIZE, max_in_flight: int = None, exts=IMAGE_EXTS,
+                stats: ScanStats = None, profile_path: str = None, tuner: ConcurrencyTuner = None,
+                level: str = DEEP, finish: bool = True, archives: bool = False, shard=None,
+                summary: ScanSummary = None):
+    """
+    Сканирует рекурсивно папку `path` и вызывает emitter.on_item (или on_items пачками)
+    для каждого обработанного файла.
+    Обход каталогов (os.scandir) идёт в отдельном потоке через ограниченную очередь,
+    поэтому обработка начинается сразу; одновременно в работе не больше max_in_flight задач
+    (по умолчанию 4 на worker). emitter.on_progress получает (обработано, найдено на данный момент).
+    emitter.cancel() сразу отбрасывает ожидающие задачи и не ждёт выполняющиеся.
+    Если передан `cache` (scan_cache.ScanCache), неизменённые файлы берутся из кэша
+    без открытия через Pillow, а записи удалённых файлов удаляются из кэша.
+    engine="process" отправляет файлы пачками по chunk_size в ProcessPoolExecutor
+    (обход GIL для разбора EXIF/TIFF-тегов), engine="thread" — ThreadPoolExecutor.
+    exts — расширения файлов (в нижнем регистре, с точкой), по умолчанию IMAGE_EXTS.
+    Статистика этапов (scan_stats.ScanStats) собирается, если передан `stats` или задан
+    emitter.on_stats; снимки уходят в on_stats раз в STATS_INTERVAL и в конце (final=True).
+    profile_path — сохранить профиль cProfile этого сканирования (поток сканирования
+    и worker-ы вместе) в pstats-файл.
+    tuner (autotune.ConcurrencyTuner) — подбирать число worker-ов по ходу сканирования:
+    пул создаётся на tuner.max_workers, одновременно выполняется tuner.level задач
+    (max_workers и max_in_flight не используются); выбранный уровень — tuner.best_level.
+    level — уровень inspect_image (formats_info.LEVELS); записи кэша более низкого
+    уровня считаются промахом.
+    finish=False — не вызывать emitter.on_finished в конце (сканирование — часть
+    folder_watch.watch_folder), только отдать накопленное. on_finished вызывается
+    и при ошибке посреди сканирования, после чего исключение уходит вызывающему.
+    archives=True — заглядывать в архивы ZIP/TAR без распаковки: каждый архив — отдельная
+    задача пула (inspect_archive), так что разные архивы читаются параллельно, а члены
+    одного — подряд; результаты членов приходят с путями «архив!/член» и не кэшируются.
+    shard (sharding.ShardSpec) — сканировать только свою часть дерева (см. sharding.py);
+    записи кэша при этом не удаляются: чужие шарды в этом сканировании не встречаются.
+    Сводка по результатам (scan_summary.ScanSummary: форматы, объём, глубина, DPI,
+    крупнейшие изображения, ошибки по каталогам) ведётся, если передан `summary` или задан
+    emitter.on_summary; снимки уходят в on_summary раз в STATS_INTERVAL и в конце (final=True).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r}, expected one of {ENGINES}")
+    if level not in LEVELS:
+        raise ValueError(f"Unknown inspection level: {level!r}, expected one of {LEVELS}")
+    if stats is None and emitter.on_stats is not None:
+        stats = ScanStats()
+    if summary is None and emitter.on_summary is not None:
+        summary = ScanSummary()
+    timed = stats is not None
+    profile = profile_path is not None
+    # при профилировании и потоки получают файлы пачками: один профиль на пачку
+    batch = chunk_size if engine == "process" or profile else 1
+    # у потоков уровень автоподбора держит tuner.gate, а окно задач — 4 на уровень, как без автоподбора
+    gated = tuner is not None and engine == "thread"
+    if tuner is not None:
+        max_workers = tuner.max_workers
+        limit = tuner.level * 4 if gated else tuner.level
+    else:
+        limit = max_in_flight or max_workers * 4
+    if stats is not None:
+        stats.workers = tuner.level if tuner is not None else max_workers
+
+    profiles = ProfileAccumulator()
+    if profile:
+        main_profile = cProfile.Profile()
+        main_profile.enable()
+    stop_event = threading.Event()
+    stop = lambda: stop_event.is_set() or emitter.cancelled()
+    q = queue.Queue(maxsize=DISCOVERY_QUEUE_SIZE)
+    walker = threading.Thread(target=_walk_into_queue,
+                              args=(path, q, cache is not None, stop, exts, stats, archives, shard), daemon=True)
+    walker.start()
+    emitter.emit_progress(0, 0)
+
+    if cache is not None:
+        started = cache.begin_scan()
+    executor = _make_executor(engine, max_workers)
+    in_flight = {}
+    submitted = {}
+    pending = []
+    discovered = processed = 0
+    walking = True
+    next_stats = time.monotonic() + STATS_INTERVAL
+
+    def emit(result):
+        nonlocal processed
+        processed += 1
+        if summary is not None:
+            summary.add(result)
+        emitter.emit_item(result)
+        emitter.emit_progress(processed, discovered)
+
+    archive_exts = exts if archives else None
+
+    def submit(chunk=None):
+        if chunk is None:
+            chunk = pending[:]
+            del pending[:]
+        paths = [p for p, _ in chunk]
+        if gated:
+            future = executor.submit(_gated_chunk, tuner.gate, paths, timed, profile, level, archive_exts)
+        else:
+            future = executor.submit(inspect_chunk, paths, timed, profile, level, archive_exts)
+        in_flight[future] = chunk
+        if tuner is not None:
+            submitted[future] = time.monotonic()
+
+    completed = False
+    try:
+        while not emitter.cancelled():
+            emitter.poll()
+            if (timed or summary is not None) and time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + STATS_INTERVAL
+                if timed:
+                    emitter.emit_stats(stats.snapshot())
+                if summary is not None:
+                    emitter.emit_summary(summary.snapshot())
+            # забираем найденные файлы, пока есть место в окне задач
+            while walking and len(in_flight) < limit and not emitter.cancelled():
+                try:
+                    item = q.get(timeout=0 if in_flight else _POLL_INTERVAL)
+                except queue.Empty:
+                    if pending:
+                        submit()
+                    break
+                if item is _WALK_DONE:
+                    walking = False
+                    break
+                discovered += 1
+                p, st = item
+                if archives and is_archive(p):
+                    submit([item])  # архив — отдельной задачей
+                    continue
+                if st is not None:
+                    t = perf_counter_ns() if timed else 0
+                    result = cache.lookup(p, st, level)
+                    if timed:
+                        stats.add_stage("cache", perf_counter_ns() - t)
+                    if result is not None:
+                        if timed:
+                            stats.add_file(result)
+                        emit(result)
+                        continue
+                pending.append(item)
+                if len(pending) >= batch:
+                    submit()
+            if not walking and pending:
+                submit()
+            if not in_flight:
+                if not walking:
+                    break
+                continue
+
+            done, _ = wait(in_flight, timeout=_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = in_flight.pop(future)
+                latency = time.monotonic() - submitted.pop(future) if tuner is not None else 0
+                try:
+                    results = future.result()
+                    if gated:
+                        # без ожидания в очереди перед gate
+                        results, latency = results
+                    if profile:
+                        results, prof = results
+                        if prof is not None:
+                            profiles.add(prof)
+                    if timed:
+                        results, timings = zip(*results) if results else ((), ())
+                    else:
+                        timings = (None,) * len(results)
+                except Exception as e:
+                    results = [{"path": p, "error": str(e)} for p, _ in chunk]
+                    timings = (None,) * len(results)
+                if archives and len(chunk) == 1 and is_archive(chunk[0][0]):
+                    # архив развернулся в свои члены
+                    discovered += len(results) - 1
+                    chunk = [(r.get("path"), None) for r in results]
+                if tuner is not None:
+                    tuner.record(len(chunk), latency)
+                for (p, st), result, tm in zip(chunk, results, timings):
+                    if emitter.cancelled():
+                        break
+                    if st is not None:
+                        t = perf_counter_ns() if timed else 0
+                        result = cache.store(p, st, result)
+                        if timed:
+                            stats.add_stage("cache", perf_counter_ns() - t)
+                    if timed:
+                        stats.add_file(result, tm or {})
+                    emit(result)
+            if tuner is not None:
+                limit = tuner.update() * (4 if gated else 1)
+                if stats is not None:
+                    stats.workers = tuner.best_level
+        completed = True
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=not emitter.cancelled(), cancel_futures=True)
+        try:
+            if profile:
+                main_profile.disable()
+                main_profile.create_stats()
+                profiles.add(main_profile.stats)
+                profiles.dump(profile_path)
+            if cache is not None:
+                # после прерванного обхода не все файлы отмечены — purge удалил бы живые записи
+                if not completed or emitter.cancelled() or shard is not None:
+                    cache.commit()
+                else:
+                    cache.purge(path, started)
+                    cache.evict()
+            if timed:
+                emitter.emit_stats(stats.snapshot(final=True))
+            if summary is not None:
+                emitter.emit_summary(summary.snapshot(final=True))
+        finally:
+            if finish:
+                emitter.emit_finished()
+            else:
+                emitter.flush()
+
+if __name__ == "__main__":
+    # python -m scanner — консольный режим без GUI (см. scan_cli.py)
+    import sys
+    from scan_cli import main
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Детерминированное разбиение дерева папок на шарды — чтобы сканировать одно дерево
+несколькими независимыми процессами или машинами (python -m scanner --shard 3/16)
+и потом слить их файлы результатов (result_merge).
+
+Шард файла определяется crc32 его «ключа» — первых depth компонентов пути
+относительно корня сканирования (по умолчанию depth=1: подпапка верхнего уровня;
+файл, лежащий выше этой глубины, — своим относительным путём). Ключ не зависит
+от того, куда дерево смонтировано, так что на разных машинах разбиение одинаковое,
+а поддерево чужого ключа обходчик не открывает вовсе. Если папок верхнего уровня
+мало или они сильно разного размера, шарды выравнивает depth=2 и больше.
+"""
+import zlib
+
+
+class ShardSpec:
+    """Шард index из count (нумерация с 1), ключ — первые depth компонентов пути."""
+    def __init__(self, index: int, count: int, depth: int = 1):
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"shard {index}/{count}: expected 1 <= index <= count")
+        if depth < 1:
+            raise ValueError(f"shard depth must be >= 1, got {depth}")
+        self.index = index
+        self.count = count
+        self.depth = depth
+
+    @classmethod
+    def parse(cls, text: str, depth: int = 1) -> "ShardSpec":
+        """'3/16' -> ShardSpec(3, 16, depth)."""
+        index, sep, count = text.partition("/")
+        try:
+            if not sep:
+                raise ValueError
+            index, count = int(index), int(count)
+        except ValueError:
+            raise ValueError(f"expected INDEX/COUNT, e.g. 3/16, got {text!r}") from None
+        return cls(index, count, depth)
+
+    def owns(self, key: str) -> bool:
+        """Принадлежит ли шарду ключ — относительный путь с разделителем "/"."""
+        return zlib.crc32(key.encode("utf-8", "surrogateescape")) % self.count == self.index - 1
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+    def __repr__(self):
+        return f"ShardSpec({self.index}, {self.count}, depth={self.depth})"
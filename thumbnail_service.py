@@ -0,0 +1,175 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtGui import QImage
+from thumbnails import THUMB_SIZE, ThumbnailDiskCache, render_thumbnail
+from archives import stat_path
+
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+
+
+class QImageLRU:
+    """LRU-кэш QImage, ограниченный суммарным размером картинок в байтах."""
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._items: "OrderedDict[tuple, QImage]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[QImage]:
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def put(self, key, img: QImage):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.sizeInBytes()
+            self._items[key] = img
+            self.nbytes += img.sizeInBytes()
+            while self.nbytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self.nbytes -= evicted.sizeInBytes()
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+
+def _stat_key(path: str) -> Optional[tuple]:
+    try:
+        st = stat_path(path)
+    except OSError:
+        return None
+    return (path, st.st_size, st.st_mtime_ns)
+
+
+class ThumbnailService(QObject):
+    """
+    Фоновая загрузка миниатюр для предпросмотра.
+    request() ставит выбранный файл первым в очередь, за ним — соседние строки
+    (предзагрузка); очередь при этом заменяется целиком, так что запросы для
+    строк, от которых выделение уже ушло, отбрасываются, не начавшись.
+    Готовая миниатюра приходит сигналом ready(path, QImage) в поток GUI, ошибка —
+    сигналом failed(path, текст). stat файлов (ключ кэша — путь, размер, mtime)
+    делают worker-ы: в потоке GUI медленная или сетевая папка не ждётся.
+    """
+    # путь — object: QString потерял бы суррогаты имён не из UTF-8, и ready не совпал бы с выбранной строкой
+    ready = Signal(object, QImage)
+    failed = Signal(object, str)
+
+    def __init__(self, parent=None, size: Tuple[int, int] = THUMB_SIZE, workers: int = 2,
+                 memory_bytes: int = DEFAULT_MEMORY_BYTES, disk_cache: Optional[ThumbnailDiskCache] = None):
+        super().__init__(parent)
+        self.size = size
+        self.memory = QImageLRU(memory_bytes)
+        self.disk_error = None  # кэш на диске не открылся — миниатюры только в памяти
+        if disk_cache is None:
+            try:
+                disk_cache = ThumbnailDiskCache()
+            except OSError as e:
+                self.disk_error = str(e)
+        self.disk = disk_cache
+        self._pending: "OrderedDict[str, bool]" = OrderedDict()  # путь -> нужен ли сигнал
+        self._running = {}  # путь -> нужен ли сигнал, для миниатюр в работе
+        self._latest = {}  # путь -> ключ последней построенной миниатюры
+        self._shown = None  # ключ миниатюры, которую request() отдал сразу
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def cached(self, path: str) -> Optional[QImage]:
+        """Последняя построенная миниатюра path, если она ещё в памяти (без stat)."""
+        with self._cond:
+            key = self._latest.get(path)
+            hit = None if key is None else self.memory.get(key)
+            if key is not None and hit is None:
+                del self._latest[path]  # вытеснена из памяти
+        return hit
+
+    def request(self, path: str, prefetch: Iterable[str] = ()) -> Optional[QImage]:
+        """
+        Запросить миниатюру path и предзагрузку prefetch. Если миниатюра path уже
+        в памяти, она возвращается сразу; worker всё равно сверяет её с файлом и присылает
+        ready с новой миниатюрой, если файл изменился, или failed, если он недоступен.
+        Иначе результат придёт через ready / failed.
+        """
+        hit = self.cached(path)
+        with self._cond:
+            self._shown = self._latest.get(path) if hit is not None else None
+            # миниатюры в работе досчитываются в кэш, но сигнал нужен только для path
+            # (если он уже строится как предзагрузка — новый запрос не ставится)
+            for p in self._running:
+                self._running[p] = p == path
+            wanted = OrderedDict()
+            if path not in self._running:
+                wanted[path] = True
+            for p in prefetch:
+                if p not in wanted and p not in self._running:
+                    wanted[p] = False
+            self._pending = wanted
+            self._cond.notify_all()
+        return hit
+
+    def cancel(self):
+        """Отменить все ещё не начатые запросы."""
+        with self._cond:
+            self._pending.clear()
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path, notify = self._pending.popitem(last=False)
+                self._running[path] = notify
+            key = _stat_key(path)
+            qimg, error = None, None
+            if key is None:
+                error = "файл недоступен"
+            else:
+                qimg = self.memory.get(key)
+            if key is not None and qimg is None:
+                try:
+                    img = self._load(path)
+                    data = img.tobytes("raw", "RGBA")
+                    qimg = QImage(data, img.width, img.height, img.width * 4, QImage.Format_RGBA8888).copy()
+                    self.memory.put(key, qimg)
+                except Exception as e:
+                    error = str(e)
+            with self._cond:
+                notify = self._running.pop(path)
+                if qimg is not None:
+                    self._latest[path] = key
+                else:
+                    self._latest.pop(path, None)
+                shown = self._shown
+            # миниатюра, уже показанная из памяти, не изменилась — сигнал не нужен
+            if notify and qimg is not None and key != shown:
+                self.ready.emit(path, qimg)
+            elif notify and qimg is None:
+                self.failed.emit(path, error)
+
+    def _load(self, path: str):
+        if self.disk is not None:
+            return self.disk.load_or_render(path, self.size)
+        return render_thumbnail(path, self.size)
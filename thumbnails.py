@@ -0,0 +1,111 @@
+import os
+import hashlib
+from typing import Optional, Tuple
+from PIL import Image
+from pil_plugins import open_image
+from scan_cache import default_cache_path
+from archives import is_virtual, open_member, stat_path
+
+THUMB_SIZE = (300, 220)
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+_EVICT_EVERY = 200
+
+
+def default_thumb_dir() -> str:
+    """Каталог дискового кэша миниатюр рядом с кэшем сканирования."""
+    return os.path.join(os.path.dirname(default_cache_path()), "thumbnails")
+
+
+def render_thumbnail(path: str, size: Tuple[int, int] = THUMB_SIZE) -> Image.Image:
+    """
+    Миниатюра RGBA не больше size. Для JPEG декодер сразу уменьшает картинку
+    (Image.draft, масштаб 1/2–1/8), так что большой файл не раскодируется целиком.
+    Член архива («архив!/файл») читается из архива.
+    """
+    with open_image(open_member(path) if is_virtual(path) else path) as im:
+        if im.format == "JPEG":
+            im.draft("RGB", size)
+        im.thumbnail(size, reducing_gap=2.0)
+        return im.convert("RGBA")
+
+
+class ThumbnailDiskCache:
+    """
+    Миниатюры в PNG-файлах, ключ — путь + размер + mtime исходника и размер миниатюры.
+    Объём ограничен max_bytes: при превышении удаляются давно не читавшиеся файлы.
+    Методы потокобезопасны (каждый файл пишется атомарно через os.replace).
+    """
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_DISK_BYTES):
+        self.directory = directory or default_thumb_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._puts = 0
+
+    def _file(self, path: str, st: os.stat_result, size: Tuple[int, int]) -> str:
+        key = f"{path}\0{st.st_size}\0{st.st_mtime_ns}\0{size[0]}x{size[1]}"
+        digest = hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + ".png")
+
+    def get(self, path: str, st: os.stat_result, size: Tuple[int, int] = THUMB_SIZE) -> Optional[Image.Image]:
+        fn = self._file(path, st, size)
+        try:
+            with open_image(fn) as im:
+                im.load()
+                img = im.convert("RGBA")
+            os.utime(fn)  # отметка «недавно использован» для вытеснения
+            return img
+        except Exception:
+            return None
+
+    def put(self, path: str, st: os.stat_result, img: Image.Image, size: Tuple[int, int] = THUMB_SIZE):
+        fn = self._file(path, st, size)
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        tmp = f"{fn}.{os.getpid()}.{id(img)}.tmp"
+        try:
+            img.save(tmp, "PNG", compress_level=1)
+            os.replace(tmp, fn)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._puts += 1
+        if self._puts % _EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Удалить самые старые миниатюры, пока кэш больше max_bytes."""
+        files = []
+        total = 0
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        removed = 0
+        files.sort()
+        for _, nbytes, fn in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(fn)
+            except OSError:
+                continue
+            total -= nbytes
+            removed += 1
+        return removed
+
+    def load_or_render(self, path: str, size: Tuple[int, int] = THUMB_SIZE) -> Image.Image:
+        """Миниатюра из дискового кэша или, при промахе, построенная и сохранённая."""
+        st = stat_path(path)
+        img = self.get(path, st, size)
+        if img is None:
+            img = render_thumbnail(path, size)
+            self.put(path, st, img, size)
+        return img